@@ -0,0 +1,111 @@
+# CTkSearchPicker.py
+import tkinter
+import customtkinter as ctk
+
+class CTkSearchPicker(ctk.CTkFrame):
+    """
+    An entry with a drop-down list of matches that is refreshed on every keystroke.
+
+    search(text) returns the matches for the typed text as (label, value) pairs; it runs on
+    each key press, so it should be an in-memory lookup. Up/Down move through the list,
+    Return or a click picks the highlighted match and calls on_pick(value). The picked value
+    is kept in .value until the text is edited again, which calls on_clear() if given.
+    """
+    def __init__(self, master, search, on_pick=None, on_clear=None, placeholder_text=None, visible_rows=8, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.search = search
+        self.on_pick = on_pick
+        self.on_clear = on_clear
+        self.visible_rows = visible_rows
+        self.value = None
+        self._matches = []
+        self._popup = None
+        self._listbox = None
+
+        self.grid_columnconfigure(0, weight=1)
+        self.entry = ctk.CTkEntry(self, placeholder_text=placeholder_text); self.entry.grid(row=0, column=0, sticky="ew")
+        self.entry.bind("<KeyRelease>", self._on_key_release, add="+")
+        self.entry.bind("<Down>", lambda event: self._move_selection(1), add="+")
+        self.entry.bind("<Up>", lambda event: self._move_selection(-1), add="+")
+        self.entry.bind("<Return>", self._pick_selected, add="+")
+        self.entry.bind("<Escape>", lambda event: self.hide(), add="+")
+        self.entry.bind("<FocusIn>", lambda event: self.show_matches() if self.value is None else None, add="+")
+        # The click on a match moves the focus first; wait for it before deciding to close
+        self.entry.bind("<FocusOut>", lambda event: self.after(150, self._hide_unless_focused), add="+")
+        self.bind("<Destroy>", lambda event: self.hide() if event.widget is self else None, add="+")
+
+    def get(self):
+        return self.entry.get()
+
+    def set(self, text, value=None):
+        """Shows `text` in the entry without searching; value is what .value reports until the next edit."""
+        self.entry.delete(0, 'end')
+        if text: self.entry.insert(0, text)
+        self.value = value; self.hide()
+
+    def clear(self):
+        self.set("")
+
+    def refresh(self):
+        """Re-runs the search for the current text if the list is open, e.g. after the data changed."""
+        if self._popup is not None: self.show_matches()
+
+    def _on_key_release(self, event):
+        if event.keysym in ("Up", "Down", "Return", "KP_Enter", "Escape", "Tab", "Left", "Right", "Home", "End") or event.keysym.startswith(("Shift", "Control", "Alt")): return
+        if self.value is not None:
+            self.value = None
+            if self.on_clear: self.on_clear()
+        self.show_matches()
+
+    def show_matches(self):
+        self._matches = self.search(self.entry.get())
+        if not self._matches: self.hide(); return
+        if self._popup is None: self._create_popup()
+        listbox = self._listbox; listbox.delete(0, 'end')
+        for label, _ in self._matches: listbox.insert('end', label)
+        listbox.configure(height=min(len(self._matches), self.visible_rows)); listbox.selection_set(0); listbox.see(0)
+        self._place_popup()
+
+    def _create_popup(self):
+        self._popup = tkinter.Toplevel(self); self._popup.wm_overrideredirect(True)
+        try: self._popup.wm_attributes("-topmost", True)
+        except tkinter.TclError: pass
+        background = self.entry._apply_appearance_mode(self.entry.cget("fg_color"))
+        foreground = self.entry._apply_appearance_mode(self.entry.cget("text_color"))
+        highlight = self.entry._apply_appearance_mode(ctk.ThemeManager.theme["CTkButton"]["fg_color"])
+        border = self.entry._apply_appearance_mode(self.entry.cget("border_color"))
+        self._listbox = tkinter.Listbox(self._popup, activestyle="none", exportselection=False, relief="flat", borderwidth=0, highlightthickness=1,
+                                        background=background, foreground=foreground, selectbackground=highlight, selectforeground="white", highlightbackground=border, highlightcolor=border)
+        self._listbox.pack(fill="both", expand=True)
+        self._listbox.bind("<ButtonRelease-1>", self._pick_selected)
+
+    def _place_popup(self):
+        x = self.entry.winfo_rootx(); y = self.entry.winfo_rooty() + self.entry.winfo_height() + 2
+        self._popup.wm_geometry(f"{self.entry.winfo_width()}x{self._listbox.winfo_reqheight()}+{x}+{y}")
+        self._popup.deiconify(); self._popup.lift()
+
+    def hide(self):
+        if self._popup is not None: self._popup.destroy(); self._popup = None; self._listbox = None
+
+    def _hide_unless_focused(self):
+        if not self.winfo_exists() or self._popup is None: return
+        focused = self.focus_get()
+        if focused is not None and str(focused).startswith(str(self) + "."): return
+        if self._popup.winfo_containing(*self.winfo_pointerxy()) is self._listbox: return # Mid-click on a match
+        self.hide()
+
+    def _move_selection(self, step):
+        if self._popup is None: self.show_matches(); return "break"
+        listbox = self._listbox; selection = listbox.curselection()
+        index = max(0, min((selection[0] if selection else -1) + step, len(self._matches) - 1))
+        listbox.selection_clear(0, 'end'); listbox.selection_set(index); listbox.see(index)
+        return "break"
+
+    def _pick_selected(self, event=None):
+        if self._popup is None: return None
+        selection = self._listbox.curselection()
+        if not selection: return "break"
+        label, value = self._matches[selection[0]]
+        self.set(label, value); self.entry.focus_set()
+        if self.on_pick: self.on_pick(value)
+        return "break"
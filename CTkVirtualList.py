@@ -0,0 +1,176 @@
+# CTkVirtualList.py
+import platform
+import tkinter
+import customtkinter as ctk
+
+class CTkVirtualList(ctk.CTkFrame):
+    """
+    A scrollable list that only creates enough row widgets to fill the viewport
+    and recycles them while scrolling, so rendering cost stays flat as the data grows.
+
+    create_row(parent) builds one empty row widget. bind_row(row, item, index)
+    fills an existing row in for the given item; it is called again whenever
+    the row is recycled for a different item. If given, on_end_reached() is called
+    when the viewport comes within end_threshold rows of the last item, so owners
+    can lazily append further pages. scroll_step is the distance of one wheel or
+    arrow step in pixels (one row by default).
+
+    If on_reorder(from_index, to_index) is given, rows that have a `drag_handle` widget can be
+    dragged by it to a new place; to_index is the item's index once moved. The list itself is
+    not changed, the owner updates it (e.g. with set_items(..., keep_position=True)). A row
+    whose `draggable` attribute is False, as set by bind_row, can't be dragged.
+    """
+    def __init__(self, master, create_row, bind_row, row_height=36, row_gap=4, label_text=None, on_end_reached=None, end_threshold=10, scroll_step=None, on_reorder=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.create_row = create_row
+        self.bind_row = bind_row
+        self.row_height = row_height
+        self.row_gap = row_gap
+        self.on_end_reached = on_end_reached
+        self.end_threshold = end_threshold
+        self.scroll_step = scroll_step
+        self.on_reorder = on_reorder
+        self.items = []
+        self._rows = []
+        self._bound = []
+        self._offset = 0
+        self._drag_from = None
+        self._drop_marker = None
+
+        self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(1, weight=1)
+        if label_text:
+            self._label = ctk.CTkLabel(self, text=label_text, corner_radius=self.cget("corner_radius"),
+                                       fg_color=ctk.ThemeManager.theme["CTkScrollableFrame"]["label_fg_color"])
+            self._label.grid(row=0, column=0, columnspan=2, sticky="ew", padx=self.cget("border_width") + 3, pady=(self.cget("border_width") + 3, 0))
+        # The body takes the outer frame's colour so rows pick the contrasting "top" colour, as in CTkScrollableFrame.
+        self._body = ctk.CTkFrame(self, fg_color=self.cget("fg_color"), corner_radius=0)
+        self._body.grid(row=1, column=0, sticky="nsew", padx=(5, 0), pady=5)
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self._scrollbar.grid(row=1, column=1, sticky="ns", padx=(0, 3), pady=5)
+        self._body.bind("<Configure>", lambda event: self._redraw())
+        self._bind_wheel(self._body)
+
+    # --- Public API ---
+    def set_items(self, items, keep_position=False):
+        """Replaces the list contents. Only the visible rows are (re)bound."""
+        self.items = list(items)
+        if not keep_position: self._offset = 0
+        self._bound = [None] * len(self._rows)
+        self._redraw()
+
+    def append_items(self, items):
+        """Adds items to the end of the list without disturbing the scroll position."""
+        self.items.extend(items)
+        self._redraw()
+
+    def refresh(self):
+        """Re-binds the visible rows, e.g. after items were changed in place."""
+        self._bound = [None] * len(self._rows)
+        self._redraw()
+
+    def scroll_to(self, index):
+        """Scrolls just far enough to bring the item at `index` into view."""
+        view = self._body.winfo_height(); top = index * self.row_height
+        if top < self._offset: self._offset = top
+        elif top + self.row_height > self._offset + view: self._offset = top + self.row_height - view
+        self._redraw()
+
+    def set_row_height(self, row_height):
+        """Changes the row height (e.g. on zoom), keeping the same part of the list in view."""
+        if row_height == self.row_height: return
+        self._offset = self._offset * row_height / self.row_height
+        self.row_height = row_height
+        self.refresh()
+
+    def visible_range(self):
+        """Returns the (first, last) item indices currently on screen."""
+        first = int(self._offset // self.row_height)
+        last = min(len(self.items), first + self._body.winfo_height() // self.row_height + 1)
+        return first, last
+
+    # --- Rendering ---
+    def _redraw(self):
+        view = self._body.winfo_height()
+        if view <= 1: return
+        total = len(self.items) * self.row_height
+        self._offset = max(0, min(self._offset, total - view))
+        first = int(self._offset // self.row_height); shift = self._offset - first * self.row_height
+        needed = max(0, min(len(self.items) - first, view // self.row_height + 2))
+        while len(self._rows) < needed:
+            row = self.create_row(self._body); self._bind_wheel(row)
+            if self.on_reorder and hasattr(row, "drag_handle"): self._bind_drag(row)
+            self._rows.append(row); self._bound.append(None)
+        for slot, row in enumerate(self._rows):
+            if slot >= needed:
+                if self._bound[slot] is not None: row.place_forget(); self._bound[slot] = None
+                continue
+            index = first + slot; item = self.items[index]
+            if self._bound[slot] != (index, id(item)):
+                self.bind_row(row, item, index); self._bound[slot] = (index, id(item))
+            row.place(x=0, y=int(slot * self.row_height - shift), relwidth=1.0, width=-5, height=self.row_height - self.row_gap)
+        if total <= view: self._scrollbar.set(0, 1)
+        else: self._scrollbar.set(self._offset / total, (self._offset + view) / total)
+        if self.on_end_reached and first + needed >= len(self.items) - self.end_threshold: self.after_idle(self.on_end_reached)
+
+    def _scroll_by(self, pixels):
+        self._offset += pixels; self._redraw()
+
+    def _on_scrollbar(self, action, *args):
+        view = self._body.winfo_height()
+        if action == "moveto": self._offset = float(args[0]) * len(self.items) * self.row_height; self._redraw()
+        elif action == "scroll":
+            amount = int(args[0])
+            self._scroll_by(amount * (view if args[1] == "pages" else self._step()))
+
+    def _on_mousewheel(self, event):
+        if event.num == 4: steps = -3
+        elif event.num == 5: steps = 3
+        elif platform.system() == "Darwin": steps = -event.delta
+        else: steps = -3 * event.delta / 120
+        self._scroll_by(steps * self._step())
+        return "break"
+
+    def _step(self):
+        return self.scroll_step or self.row_height
+
+    # --- Drag-and-drop reordering ---
+    def _bind_drag(self, row):
+        def bind_all(widget):
+            tkinter.Misc.bind(widget, "<ButtonPress-1>", lambda event: self._on_drag_start(row), "+")
+            tkinter.Misc.bind(widget, "<B1-Motion>", self._on_drag_motion, "+")
+            tkinter.Misc.bind(widget, "<ButtonRelease-1>", self._on_drag_end, "+")
+            for child in widget.winfo_children(): bind_all(child)
+        bind_all(row.drag_handle)
+
+    def _on_drag_start(self, row):
+        bound = self._bound[self._rows.index(row)]
+        if bound is None or not getattr(row, "draggable", True): return
+        self._drag_from = bound[0]
+        if self._drop_marker is None:
+            self._drop_marker = ctk.CTkFrame(self._body, height=3, corner_radius=0, fg_color=ctk.ThemeManager.theme["CTkButton"]["fg_color"])
+
+    def _drop_gap(self, event):
+        """The gap (0..len(items)) under the pointer, i.e. the index the item would be inserted before."""
+        y = event.y_root - self._body.winfo_rooty() + self._offset
+        return max(0, min(len(self.items), int(round(y / self.row_height))))
+
+    def _on_drag_motion(self, event):
+        if self._drag_from is None: return
+        y = event.y_root - self._body.winfo_rooty(); view = self._body.winfo_height()
+        # Scroll while the pointer is held near either edge
+        if y < self.row_height / 2: self._scroll_by(-self._step())
+        elif y > view - self.row_height / 2: self._scroll_by(self._step())
+        marker_y = int(self._drop_gap(event) * self.row_height - self._offset - self.row_gap / 2)
+        self._drop_marker.place(x=0, y=max(0, min(marker_y, view - 3)), relwidth=1.0, width=-5); self._drop_marker.lift()
+
+    def _on_drag_end(self, event):
+        if self._drag_from is None: return
+        from_index = self._drag_from; self._drag_from = None; self._drop_marker.place_forget()
+        gap = self._drop_gap(event); to_index = gap if gap <= from_index else gap - 1
+        if to_index != from_index: self.on_reorder(from_index, to_index)
+
+    def _bind_wheel(self, widget):
+        # Bind on every underlying Tk widget directly; CTk's own bind() would forward to the same canvases twice.
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tkinter.Misc.bind(widget, sequence, self._on_mousewheel, "+")
+        for child in widget.winfo_children(): self._bind_wheel(child)
@@ -0,0 +1,48 @@
+# analytics.py
+
+# Sales summaries kept up to date by triggers, so reports read a few small tables instead of scanning
+# every estimate and line item. analytics_monthly and analytics_customers hold estimate counts and totals
+# per month (of estimate_date) and per customer; analytics_categories holds line item counts, quantities
+# and totals per category name. "Won" means an estimate with the WON_STATUS status. Every change to
+# estimate_jobs or estimate_line_items, including deleting and re-inserting an estimate's lines, applies
+# its difference in the same transaction. Line items only count while their estimate exists, so an
+# estimate and its lines may be deleted in either order. The tables and triggers are created by migration 8
+# (migrations.py); a change to what they hold needs a new migration, and rebuild_analytics() to match it.
+
+WON_STATUS = "closed"
+TOP_CUSTOMERS = 200
+WRITE_IN = "Write-in"
+
+_MONTH_SQL = "IFNULL(substr({row}.estimate_date, 1, 7), '')"
+_WON_SQL = f"({{row}}.status = '{WON_STATUS}')"
+
+def rebuild_analytics(cursor):
+    """Recomputes every summary from estimate_jobs and estimate_line_items, e.g. to correct drift."""
+    for table in ("analytics_monthly", "analytics_customers", "analytics_categories"): cursor.execute(f"DELETE FROM {table}")
+    won = _WON_SQL.format(row="j")
+    cursor.execute(f"""INSERT INTO analytics_monthly (month, estimates, quoted_total, won, won_total)
+        SELECT {_MONTH_SQL.format(row="j")}, COUNT(*), TOTAL(j.total_amount), SUM({won}), TOTAL(IIF({won}, j.total_amount, 0)) FROM estimate_jobs j GROUP BY 1""")
+    cursor.execute(f"""INSERT INTO analytics_customers (customer_id, estimates, quoted_total, won, won_total)
+        SELECT IFNULL(j.customer_id, 0), COUNT(*), TOTAL(j.total_amount), SUM({won}), TOTAL(IIF({won}, j.total_amount, 0)) FROM estimate_jobs j GROUP BY 1""")
+    cursor.execute(f"""INSERT INTO analytics_categories (category_name, line_items, quantity, quoted_total, won_total)
+        SELECT IFNULL(l.category_name, '{WRITE_IN}'), COUNT(*), TOTAL(l.quantity), TOTAL(l.line_total), TOTAL(IIF({won}, l.line_total, 0))
+        FROM estimate_line_items l JOIN estimate_jobs j ON j.job_id = l.job_id GROUP BY 1""")
+
+# --- Reads ---
+def overall_totals(db):
+    """(estimates, quoted_total, won, won_total) across all estimates."""
+    return db.query_one("SELECT IFNULL(SUM(estimates), 0), TOTAL(quoted_total), IFNULL(SUM(won), 0), TOTAL(won_total) FROM analytics_monthly")
+
+def monthly_summary(db):
+    """(month, estimates, quoted_total, won, won_total) rows, newest month first; month is 'YYYY-MM' ('' for undated estimates)."""
+    return db.query("SELECT month, estimates, quoted_total, won, won_total FROM analytics_monthly ORDER BY month DESC")
+
+def customer_summary(db, limit=TOP_CUSTOMERS):
+    """(customer name, estimates, quoted_total, won, won_total) for the customers with the most won revenue."""
+    return db.query("""SELECT IFNULL(c.name, '(deleted customer)'), a.estimates, a.quoted_total, a.won, a.won_total
+                       FROM analytics_customers a LEFT JOIN customers c ON c.id = a.customer_id
+                       ORDER BY a.won_total DESC, a.quoted_total DESC LIMIT ?""", (limit,))
+
+def category_summary(db):
+    """(category name, line_items, quantity, quoted_total, won_total) rows, largest quoted total first."""
+    return db.query("SELECT category_name, line_items, quantity, quoted_total, won_total FROM analytics_categories ORDER BY quoted_total DESC")
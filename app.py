@@ -1,21 +1,39 @@
 # app.py
+from startup_timing import StartupTimer, read_startup_log
+STARTUP_TIMER = StartupTimer() # Before every other import, so their cost shows up in the first mark
 import customtkinter as ctk
 import sqlite3
-from fpdf import FPDF
-from fpdf.enums import XPos, YPos
 from datetime import datetime
 import os
 import platform
 import subprocess
 import sys
 import tempfile
-import fitz  # PyMuPDF
-from PIL import Image
 import tkinter
 import tkinter.filedialog
-import shutil
-import csv
+import itertools
 from CTkToolTip import CTkToolTip
+from CTkVirtualList import CTkVirtualList
+from CTkSearchPicker import CTkSearchPicker
+from database import get_db, close_db, get_app_data_path, PROFILES, DEFAULT_PROFILE
+from settings_store import get_settings
+from search_index import search_customers, search_pricelist
+from migrations import migrate, get_schema_version
+from estimate_store import load_line_items, save_line_items, load_estimate_job, save_estimate_job, ESTIMATE_STATUSES
+from estimate_queries import build_estimate_filter, fetch_estimate_page, page_cursor, ESTIMATE_PAGE_SIZE
+from background import BackgroundTask
+from pricelist_import import import_pricelist
+from exporter import export_data, export_file, record_export, LAST_EXPORT_SETTING
+from estimate_pdf import make_snapshot, render_estimate_pdf
+from pdf_pages import PageRenderer, PREVIEW_SCALE, load_backend
+from pricing import compute_totals, parse_amount, line_total
+from repricing import preview_reprice, apply_reprice
+from catalog import get_catalog, UNCATEGORIZED
+from catalog_index import get_item_index, get_customer_index, ITEM_SEARCH_LIMIT, CUSTOMER_SEARCH_LIMIT
+from query_profiler import get_profiler, bucket_label, SLOW_QUERY_MS
+from stall_watchdog import StallWatchdog, STALL_THRESHOLD_MS, RECENT_STALLS
+from analytics import overall_totals, monthly_summary, customer_summary, category_summary, TOP_CUSTOMERS, WON_STATUS
+STARTUP_TIMER.mark("imports")
 
 def resource_path(relative_path):
     """ Get absolute path to read-only resources, works for dev and for PyInstaller """
@@ -25,96 +43,31 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-# --- MODIFICATION START ---
-def get_app_data_path():
-    """Gets the path to a writable application data directory for the database."""
-    home = os.path.expanduser("~")
-    app_data_dir = os.path.join(home, ".CC-Estimator")
-    os.makedirs(app_data_dir, exist_ok=True) # Ensure the directory exists
-    return app_data_dir
-
-def db_connect():
-    """Connects to the database in the user's writable app data folder."""
-    db_path = os.path.join(get_app_data_path(), 'database.db')
-    return sqlite3.connect(db_path)
-# --- MODIFICATION END ---
-
-
-# --- NEW: Helper function for database migration ---
-def _add_column_if_not_exists(cursor, table_name, column_name, column_type):
-    """Adds a column to a table if it doesn't already exist."""
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = [info[1] for info in cursor.fetchall()]
-    if column_name not in columns:
-        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
-
 def setup_database():
-    """Ensures all necessary tables exist and migrates old schemas."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    # Create main tables if they don't exist
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS customers (
-            id INTEGER PRIMARY KEY, name TEXT NOT NULL, address TEXT, phone TEXT, email TEXT
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, sort_order INTEGER
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS pricelist (
-            id INTEGER PRIMARY KEY, item_name TEXT NOT NULL, unit_price REAL NOT NULL, sort_order INTEGER,
-            category_id INTEGER, FOREIGN KEY (category_id) REFERENCES categories(id)
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS estimate_jobs (
-            job_id INTEGER PRIMARY KEY, customer_id INTEGER, job_name TEXT, estimate_date TEXT, total_amount REAL,
-            install_total REAL, markup_percent REAL, misc_charge REAL,
-            FOREIGN KEY (customer_id) REFERENCES customers (id)
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS estimate_line_items (
-            item_id INTEGER PRIMARY KEY, job_id INTEGER, item_name TEXT, category_name TEXT, quantity INTEGER,
-            unit_price REAL, line_total REAL,
-            FOREIGN KEY (job_id) REFERENCES estimate_jobs (job_id)
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY, value TEXT
-        )
-    """)
-    
-    # Ensure 'Uncategorized' category exists
-    cursor.execute("INSERT OR IGNORE INTO categories (name, sort_order) VALUES ('Uncategorized', 9999)")
-    
-    # Add columns for saving individual install qty and price (schema migration)
-    _add_column_if_not_exists(cursor, "estimate_jobs", "install_qty", "REAL")
-    _add_column_if_not_exists(cursor, "estimate_jobs", "install_unit_price", "REAL")
-    
-    conn.commit()
-    conn.close()
+    """Ensures the database schema is current; a no-op beyond one PRAGMA check once migrated."""
+    migrate(get_db())
 
 def save_setting(key, value):
-    """Saves a setting to the database."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, str(value)))
-    conn.commit()
-    conn.close()
+    """Saves a setting to the database (write-through to the in-memory settings store)."""
+    get_settings().set(key, value)
 
 def load_setting(key, default_value=None):
-    """Loads a setting from the database."""
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
-    result = cursor.fetchone()
-    conn.close()
-    return result[0] if result else default_value
+    """Loads a setting from the in-memory settings store."""
+    return get_settings().get(key, default_value)
+
+SEARCH_DEBOUNCE_MS = 200
+ALL_CATEGORIES = "All Categories"
+
+class Debouncer:
+    """Calls `callback` once keystrokes have paused for `delay_ms`, instead of on every key release."""
+    def __init__(self, widget, callback, delay_ms=SEARCH_DEBOUNCE_MS):
+        self.widget = widget; self.callback = callback; self.delay_ms = delay_ms; self._job = None
+    def __call__(self, event=None):
+        if self._job is not None: self.widget.after_cancel(self._job)
+        self._job = self.widget.after(self.delay_ms, self._fire)
+    def _fire(self):
+        self._job = None
+        if self.widget.winfo_exists(): self.callback()
 
 class CustomMessageBox(ctk.CTkToplevel):
     def __init__(self, master=None, title="Dialog", message="Message", buttons=["OK"]):
@@ -146,105 +99,238 @@ class CustomMessageBox(ctk.CTkToplevel):
     def cancel(self): self._result = False; self.destroy()
     def get_result(self): self.master.wait_window(self); return self._result
 
+class ProgressDialog(ctk.CTkToplevel):
+    """Modal progress window for a BackgroundTask; show_result() turns it into a summary with optional details."""
+    def __init__(self, master, title="Working", message="Working...", on_cancel=None):
+        super().__init__(master)
+        self.title(title); self.geometry("480x170"); self.lift(); self.attributes("-topmost", True); self.grab_set(); self.resizable(False, False)
+        self.on_cancel = on_cancel; self.protocol("WM_DELETE_WINDOW", self.cancel); self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(2, weight=1)
+        self._message_label = ctk.CTkLabel(self, text=message, wraplength=440, justify="left"); self._message_label.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="ew")
+        self._progress_bar = ctk.CTkProgressBar(self); self._progress_bar.set(0); self._progress_bar.grid(row=1, column=0, padx=20, pady=(0, 10), sticky="ew")
+        self._button_frame = ctk.CTkFrame(self, fg_color="transparent"); self._button_frame.grid(row=3, column=0, padx=20, pady=(0, 20), sticky="e")
+        self._button = ctk.CTkButton(self._button_frame, text="Cancel", width=100, fg_color="#D32F2F", hover_color="#C62828", command=self.cancel); self._button.pack(side="right")
+        self._finished = False
+    def update_progress(self, fraction, message=None):
+        if not self.winfo_exists(): return
+        self._progress_bar.set(max(0.0, min(fraction, 1.0)))
+        if message: self._message_label.configure(text=message)
+    def cancel(self):
+        if self._finished: self.destroy(); return
+        if self.on_cancel: self.on_cancel()
+        self._message_label.configure(text="Cancelling..."); self._button.configure(state="disabled")
+    def show_result(self, message, details=None, save_title="Save Report As...", save_name=None):
+        """Replaces the progress bar with `message`, plus a scrollable `details` text that can be saved to a file when save_name is given."""
+        self._finished = True; self._progress_bar.grid_forget(); self._message_label.configure(text=message)
+        self._button.configure(text="Close", state="normal", fg_color=ctk.ThemeManager.theme["CTkButton"]["fg_color"], hover_color=ctk.ThemeManager.theme["CTkButton"]["hover_color"], command=self.destroy)
+        if details:
+            self.resizable(True, True); self.geometry("560x380")
+            textbox = ctk.CTkTextbox(self, wrap="none"); textbox.insert("1.0", details); textbox.configure(state="disabled"); textbox.grid(row=2, column=0, padx=20, pady=(0, 10), sticky="nsew")
+        if details and save_name:
+            save_button = ctk.CTkButton(self._button_frame, text="Save Report...", width=120, command=lambda: self._save_details(details, save_title, save_name)); save_button.pack(side="right", padx=(0, 10))
+    def _save_details(self, details, title, initialfile):
+        file_path = tkinter.filedialog.asksaveasfilename(parent=self, defaultextension=".txt", filetypes=[("Text Files", "*.txt")], title=title, initialfile=initialfile)
+        if file_path:
+            try:
+                with open(file_path, 'w', encoding='utf-8') as f: f.write(details)
+            except OSError as e: CustomMessageBox(self, title="Error", message=f"Could not save report: {e}").get_result()
+
+PDF_ZOOM_LEVELS = ["50%", "75%", "100%", "125%", "150%", "200%"]
+PDF_PAGE_GAP = 20
+PDF_POLL_MS = 50
+
 class PDFViewerWindow(ctk.CTkToplevel):
-    def __init__(self, master, pdf_path):
+    """
+    Estimate preview. Pages are rasterized on a worker thread only when they come near the viewport,
+    shown first as low-resolution placeholders, and kept in a size-bounded LRU (pdf_pages.PageRenderer).
+    Zoom is relative to the window width; zooming or resizing re-renders just the visible pages.
+    The renderer is polled only while it has work; binding a page row (scroll, zoom, resize) restarts it.
+    """
+    def __init__(self, master, pdf_bytes=None, on_cancel=None):
         super().__init__(master)
-        self.pdf_path = pdf_path
+        self.pdf_bytes = pdf_bytes; self.on_cancel = on_cancel; self._print_file = None
+        self.renderer = None; self.page_width = 0; self.zoom = 1.0; self.pan = 0.0; self._page_rows = []; self._poll_job = None
         self.title("Estimate Preview")
         self.geometry("850x900")
         self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.grab_set()
         self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(0, weight=1)
-        self.scroll_frame = ctk.CTkScrollableFrame(self, label_text="PDF Preview"); self.scroll_frame.grid(row=0, column=0, columnspan=2, padx=10, pady=10, sticky="nsew")
-        self.button_frame = ctk.CTkFrame(self, fg_color="transparent"); self.button_frame.grid(row=1, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="e")
+        self.page_list = CTkVirtualList(self, create_row=self._create_page_row, bind_row=self._bind_page_row, row_gap=PDF_PAGE_GAP, scroll_step=60, label_text="PDF Preview"); self.page_list.grid(row=0, column=0, columnspan=2, padx=10, pady=(10, 0), sticky="nsew")
+        self.page_list.bind("<Configure>", Debouncer(self, self._layout_pages, 150), add="+")
+        self.pan_scrollbar = ctk.CTkScrollbar(self, orientation="horizontal", command=self._on_pan)
+        self.button_frame = ctk.CTkFrame(self, fg_color="transparent"); self.button_frame.grid(row=2, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+        self.zoom_menu = ctk.CTkOptionMenu(self.button_frame, values=PDF_ZOOM_LEVELS, width=90, command=self.set_zoom); self.zoom_menu.set("100%"); self.zoom_menu.pack(side="left")
         self.print_button = ctk.CTkButton(self.button_frame, text="Print", width=120, command=self.print_pdf); self.print_button.pack(side="right", padx=(10, 0))
         self.save_button = ctk.CTkButton(self.button_frame, text="Save as PDF", width=120, command=self.save_pdf); self.save_button.pack(side="right")
-        self.after(100, self.display_pdf)
+        if pdf_bytes: self.after(100, self.display_pdf); return
+        self.print_button.configure(state="disabled"); self.save_button.configure(state="disabled"); self.zoom_menu.configure(state="disabled")
+        self.status_frame = ctk.CTkFrame(self, fg_color="transparent"); self.status_frame.grid(row=0, column=0, columnspan=2, padx=10, pady=(10, 0), sticky="nsew")
+        self.status_label = ctk.CTkLabel(self.status_frame, text="Generating estimate..."); self.status_label.pack(pady=(40, 10), padx=20)
+        self.progress_bar = ctk.CTkProgressBar(self.status_frame, width=300); self.progress_bar.set(0); self.progress_bar.pack(pady=(0, 20), padx=20)
+    def update_progress(self, fraction, message=None):
+        if self.pdf_bytes or not self.winfo_exists(): return
+        self.progress_bar.set(max(0.0, min(fraction, 1.0)))
+        if message: self.status_label.configure(text=message)
+    def set_document(self, pdf_bytes):
+        """Swaps the progress placeholder for the rendered pages."""
+        self.pdf_bytes = pdf_bytes; self.status_frame.destroy()
+        self.print_button.configure(state="normal"); self.save_button.configure(state="normal"); self.zoom_menu.configure(state="normal")
+        self.display_pdf()
+    def show_error(self, message):
+        self.progress_bar.destroy(); self.status_label.configure(text=message)
     def display_pdf(self):
-        target_width = self.scroll_frame.winfo_width() - 40
         try:
-            doc = fitz.open(self.pdf_path)
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num); zoom_factor = target_width / page.rect.width; matrix = fitz.Matrix(zoom_factor, zoom_factor); pix = page.get_pixmap(matrix=matrix)
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples); ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=(pix.width, pix.height))
-                label = ctk.CTkLabel(self.scroll_frame, image=ctk_img, text=""); label.pack(pady=10, padx=10)
-            doc.close()
+            self.renderer = PageRenderer(self.pdf_bytes)
         except Exception as e:
-            error_label = ctk.CTkLabel(self.scroll_frame, text=f"Error rendering PDF: {e}"); error_label.pack(pady=20, padx=20)
+            error_label = ctk.CTkLabel(self, text=f"Error rendering PDF: {e}"); error_label.grid(row=0, column=0, columnspan=2, pady=20, padx=20); return
+        self._layout_pages(); self.page_list.set_items(range(self.renderer.page_count))
+        self._start_polling()
+    def set_zoom(self, level):
+        self.zoom = int(level.rstrip("%")) / 100; self._layout_pages()
+    def _view_width(self):
+        return max(self.page_list.winfo_width() - 40, 100)
+    def _layout_pages(self):
+        """Sizes the rows for the current window width and zoom; a no-op if neither changed."""
+        if self.renderer is None or not self.winfo_exists(): return
+        width = int(self._view_width() * self.zoom)
+        if width == self.page_width: return
+        self.page_width = width
+        self.page_list.set_row_height(self.renderer.page_height(0, width) + PDF_PAGE_GAP)
+        if width > self._view_width(): self.pan_scrollbar.grid(row=1, column=0, columnspan=2, padx=10, sticky="ew")
+        else: self.pan_scrollbar.grid_remove(); self.pan = 0.0
+        self._update_pan_scrollbar(); self._start_polling()
+    def _create_page_row(self, parent):
+        row = ctk.CTkFrame(parent, fg_color="transparent"); row.shown_key = None
+        row.label = ctk.CTkLabel(row, text="", fg_color="white", text_color="gray50")
+        self._page_rows.append(row)
+        return row
+    def _bind_page_row(self, row, page, index):
+        """Shows the full-resolution page if cached, else a scaled-up placeholder, and asks for what is missing."""
+        width = self.page_width; height = self.renderer.page_height(page, width); full_key = (page, width)
+        image = self.renderer.request(page, width)
+        key = full_key; error = None if image is not None else self.renderer.error(full_key)
+        if image is None and error is None:
+            key = (page, max(int(width * PREVIEW_SCALE), 1)); image = self.renderer.cache.get(key)
+        if row.shown_key != key:
+            row.shown_key = key
+            if error: row.label.configure(image="", text=f"Could not render page {page + 1}:\n{error}", text_color="#D32F2F")
+            elif image is None: row.label.configure(image="", text=f"Page {page + 1}", text_color="gray50")
+            else: row.label.configure(image=ctk.CTkImage(light_image=image, dark_image=image, size=(width, height)), text="")
+        row.label.configure(width=width, height=height)
+        self._place_page(row, width); self._start_polling()
+    def _place_page(self, row, width):
+        overflow = width - self._view_width()
+        if overflow > 0: row.label.place(x=-int(self.pan * overflow), y=0)
+        else: row.label.place(relx=0.5, y=0, anchor="n")
+    def _on_pan(self, action, *args):
+        overflow = max(self.page_width - self._view_width(), 1)
+        if action == "moveto": self.pan = float(args[0]) * self.page_width / overflow
+        elif action == "scroll": self.pan += int(args[0]) * (0.5 if args[1] == "pages" else 0.05)
+        self.pan = max(0.0, min(self.pan, 1.0))
+        for row in self._page_rows: self._place_page(row, self.page_width)
+        self._update_pan_scrollbar()
+    def _update_pan_scrollbar(self):
+        view = self._view_width(); overflow = max(self.page_width - view, 0)
+        start = self.pan * overflow / max(self.page_width, 1)
+        self.pan_scrollbar.set(start, start + view / max(self.page_width, 1))
+    def _start_polling(self):
+        if self._poll_job is None and self.renderer is not None: self._poll_job = self.after_idle(self._poll_pages)
+    def _poll_pages(self):
+        """Keeps the worker busy with the visible pages (placeholders first) and swaps in whatever finished, until nothing is left to render."""
+        self._poll_job = None
+        if not self.winfo_exists(): return
+        first, last = self.page_list.visible_range(); width = self.page_width; preview_width = max(int(width * PREVIEW_SCALE), 1)
+        pages = range(max(first - 1, 0), min(last + 1, self.renderer.page_count))
+        wanted = [(page, preview_width) for page in pages] + [(page, width) for page in pages]
+        self.renderer.want(wanted)
+        for page, page_width in wanted:
+            if self.renderer.cache.get((page, width)) is None: self.renderer.request(page, page_width)
+        if any(first <= page < last for page, _ in self.renderer.collect()): self.page_list.refresh()
+        if self.renderer.busy and self._poll_job is None: self._poll_job = self.after(PDF_POLL_MS, self._poll_pages)
     def save_pdf(self):
         file_path = tkinter.filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF Documents", "*.pdf")], title="Save Estimate As...", initialfile=f"Estimate_{datetime.now().strftime('%Y-%m-%d')}.pdf")
         if file_path:
             try:
-                shutil.copy(self.pdf_path, file_path); CustomMessageBox(self, title="Success", message=f"PDF saved to:\n{file_path}").get_result()
+                with open(file_path, 'wb') as f: f.write(self.pdf_bytes)
+                CustomMessageBox(self, title="Success", message=f"PDF saved to:\n{file_path}").get_result()
             except Exception as e:
                 CustomMessageBox(self, title="Error", message=f"Could not save file: {e}").get_result()
     def print_pdf(self):
         try:
             current_os = platform.system()
-            if current_os == "Windows": os.startfile(self.pdf_path, "print")
-            elif current_os == "Darwin": subprocess.call(["lpr", self.pdf_path])
-            elif current_os == "Linux": subprocess.call(["lp", self.pdf_path])
+            if current_os == "Windows":
+                # The shell print verb needs a file; it is written only now and removed when the preview closes
+                if self._print_file is None:
+                    with tempfile.NamedTemporaryFile(delete=False, prefix="estimate_print_", suffix=".pdf") as tmp_pdf:
+                        tmp_pdf.write(self.pdf_bytes); self._print_file = tmp_pdf.name
+                os.startfile(self._print_file, "print")
+            elif current_os == "Darwin": subprocess.run(["lpr"], input=self.pdf_bytes, check=True)
+            elif current_os == "Linux": subprocess.run(["lp"], input=self.pdf_bytes, check=True)
             else: CustomMessageBox(self, title="Print Error", message="Unsupported OS for printing.").get_result()
         except Exception as e:
             CustomMessageBox(self, title="Print Error", message=f"Failed to open print dialog:\n{e}").get_result()
     def on_close(self):
-        if self.pdf_path and os.path.exists(self.pdf_path):
-            try: os.remove(self.pdf_path)
+        if self.pdf_bytes is None and self.on_cancel: self.on_cancel() # Still rendering
+        if self._poll_job is not None: self.after_cancel(self._poll_job)
+        if self.renderer is not None: self.renderer.close()
+        if self._print_file and os.path.exists(self._print_file):
+            try: os.remove(self._print_file)
             except OSError as e: print(f"Error deleting temp file: {e}")
         self.destroy()
 
 class CategoryManagerWindow(ctk.CTkToplevel):
     def __init__(self, master):
-        super().__init__(master); self.editing_category_id = None; self.title("Category Manager"); self.geometry("400x400"); self.grab_set()
+        super().__init__(master); self.editing_category_id = None; self.categories = []; self.title("Category Manager"); self.geometry("400x400"); self.grab_set()
+        unsubscribe = get_catalog().subscribe(lambda change: self.refresh_list(), kinds=("category",)); self.bind("<Destroy>", lambda event: unsubscribe() if event.widget is self else None, add="+")
         self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(0, weight=1)
-        self.display_frame = ctk.CTkScrollableFrame(self, label_text="Categories"); self.display_frame.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
+        self.display_frame = CTkVirtualList(self, create_row=self._create_category_row, bind_row=self._bind_category_row, label_text="Categories", row_height=40, on_reorder=self.reorder_categories); self.display_frame.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
         add_frame = ctk.CTkFrame(self); add_frame.grid(row=1, column=0, padx=20, pady=(0,20), sticky="ew"); add_frame.grid_columnconfigure(0, weight=1)
         self.name_entry = ctk.CTkEntry(add_frame, placeholder_text="Category Name"); self.name_entry.grid(row=0, column=0, padx=(0,10), sticky="ew")
         self.add_button = ctk.CTkButton(add_frame, text="Add New", width=80, command=self.add_or_update_category); self.add_button.grid(row=0, column=1); self.refresh_list()
     def refresh_list(self):
-        for widget in self.display_frame.winfo_children(): widget.destroy()
-        conn = db_connect(); cursor = conn.cursor(); cursor.execute("SELECT id, name FROM categories ORDER BY sort_order ASC"); categories = cursor.fetchall(); conn.close()
-        for index, (cat_id, name) in enumerate(categories):
-            row_frame = ctk.CTkFrame(self.display_frame); row_frame.pack(fill="x", padx=5, pady=4); label = ctk.CTkLabel(row_frame, text=name, anchor="w"); label.pack(side="left", fill="x", expand=True, padx=5)
-            if name != "Uncategorized":
-                down_button = ctk.CTkButton(row_frame, text="▼", width=30, command=lambda i=cat_id: self.move_category(i, 'down')); down_button.pack(side="right", padx=(5,0))
-                if index == len(categories) - 1: down_button.configure(state="disabled")
-                up_button = ctk.CTkButton(row_frame, text="▲", width=30, command=lambda i=cat_id: self.move_category(i, 'up')); up_button.pack(side="right", padx=5)
-                if index == 0: up_button.configure(state="disabled")
-                delete_btn = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828", command=lambda i=cat_id: self.delete_category(i)); delete_btn.pack(side="right", padx=5)
-                edit_btn = ctk.CTkButton(row_frame, text="Edit", width=50, command=lambda i=cat_id, n=name: self.populate_edit_fields(i, n)); edit_btn.pack(side="right", padx=5)
+        self.categories = get_catalog().categories(); self.display_frame.set_items(self.categories, keep_position=True)
+    def _create_category_row(self, parent):
+        row_frame = ctk.CTkFrame(parent)
+        row_frame.drag_handle = ctk.CTkLabel(row_frame, text="≡", width=20, cursor="fleur"); row_frame.drag_handle.pack(side="left", padx=(5,0))
+        row_frame.label = ctk.CTkLabel(row_frame, text=" ", anchor="w"); row_frame.label.pack(side="left", fill="x", expand=True, padx=5)
+        row_frame.down_button = ctk.CTkButton(row_frame, text="▼", width=30); row_frame.down_button.pack(side="right", padx=(5,0))
+        row_frame.up_button = ctk.CTkButton(row_frame, text="▲", width=30); row_frame.up_button.pack(side="right", padx=5)
+        row_frame.delete_btn = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828"); row_frame.delete_btn.pack(side="right", padx=5)
+        row_frame.edit_btn = ctk.CTkButton(row_frame, text="Edit", width=50); row_frame.edit_btn.pack(side="right", padx=5)
+        row_frame.controls_shown = True
+        return row_frame
+    def _bind_category_row(self, row_frame, category, index):
+        cat_id, name = category
+        row_frame.label.configure(text=name)
+        # 'Uncategorized' can't be moved, renamed or deleted, so its row has no controls
+        row_frame.draggable = name != UNCATEGORIZED; row_frame.drag_handle.configure(text="≡" if row_frame.draggable else "")
+        if row_frame.draggable != row_frame.controls_shown:
+            buttons = (row_frame.down_button, row_frame.up_button, row_frame.delete_btn, row_frame.edit_btn); row_frame.controls_shown = row_frame.draggable
+            for button in buttons: button.pack_forget()
+            if row_frame.draggable:
+                for button in buttons: button.pack(side="right", padx=(5,0) if button is row_frame.down_button else 5)
+        if not row_frame.draggable: return
+        row_frame.down_button.configure(state="disabled" if index == len(self.categories) - 1 else "normal", command=lambda i=index: self.reorder_categories(i, i + 1))
+        row_frame.up_button.configure(state="disabled" if index == 0 else "normal", command=lambda i=index: self.reorder_categories(i, i - 1))
+        row_frame.delete_btn.configure(command=lambda i=cat_id: self.delete_category(i))
+        row_frame.edit_btn.configure(command=lambda i=cat_id, n=name: self.populate_edit_fields(i, n))
     def populate_edit_fields(self, cat_id, name):
         self.editing_category_id = cat_id; self.name_entry.delete(0, 'end'); self.name_entry.insert(0, name); self.add_button.configure(text="Update")
     def add_or_update_category(self):
         name = self.name_entry.get().strip();
         if not name: return
-        conn = db_connect(); cursor = conn.cursor()
         try:
-            if self.editing_category_id: cursor.execute("UPDATE categories SET name = ? WHERE id = ?", (name, self.editing_category_id))
-            else:
-                cursor.execute("SELECT MAX(sort_order) FROM categories"); max_order = cursor.fetchone()[0] or 0
-                cursor.execute("INSERT INTO categories (name, sort_order) VALUES (?, ?)", (name, max_order + 1))
-            conn.commit(); self.name_entry.delete(0, 'end'); self.editing_category_id = None; self.add_button.configure(text="Add New")
+            get_catalog().save_category(self.editing_category_id, name)
+            self.name_entry.delete(0, 'end'); self.editing_category_id = None; self.add_button.configure(text="Add New")
         except sqlite3.IntegrityError: CustomMessageBox(self, title="Error", message=f"Category '{name}' already exists.").get_result()
-        finally: conn.close(); self.refresh_list()
     def delete_category(self, cat_id):
         confirm_delete = True
-        if load_setting('show_confirmations', 'True') == 'True':
+        if get_settings().get_bool('show_confirmations', True):
             dialog = CustomMessageBox(self, title="Confirm Delete", message="Are you sure? Items in this category will be moved to 'Uncategorized'.", buttons=["Yes", "No"])
             confirm_delete = dialog.get_result()
-        if confirm_delete:
-            conn = db_connect(); cursor = conn.cursor(); cursor.execute("SELECT id FROM categories WHERE name='Uncategorized'"); uncategorized_id = cursor.fetchone()[0]
-            cursor.execute("UPDATE pricelist SET category_id = ? WHERE category_id = ?", (uncategorized_id, cat_id)); cursor.execute("DELETE FROM categories WHERE id = ?", (cat_id,)); conn.commit(); conn.close(); self.refresh_list()
-    def move_category(self, cat_id, direction):
-        conn = db_connect(); cursor = conn.cursor(); cursor.execute("SELECT id, sort_order FROM categories ORDER BY sort_order"); sorted_items = cursor.fetchall(); item_index = -1
-        for i, (i_id, so) in enumerate(sorted_items):
-            if i_id == cat_id: item_index = i; break
-        if item_index == -1: conn.close(); return
-        if direction == 'up' and item_index > 0: other_index = item_index - 1
-        elif direction == 'down' and item_index < len(sorted_items) - 1: other_index = item_index + 1
-        else: conn.close(); return
-        item1_id, item1_so = sorted_items[item_index]; item2_id, item2_so = sorted_items[other_index]
-        cursor.execute("UPDATE categories SET sort_order = ? WHERE id = ?", (item2_so, item1_id)); cursor.execute("UPDATE categories SET sort_order = ? WHERE id = ?", (item1_so, item2_id)); conn.commit(); conn.close(); self.refresh_list()
+        if confirm_delete: get_catalog().delete_category(cat_id)
+    def reorder_categories(self, from_index, to_index):
+        """Moves one category (by ▲/▼ or drag-and-drop); only the moved row's sort_order is written."""
+        if 0 <= to_index < len(self.categories): get_catalog().move_category(self.categories[from_index].id, to_index)
 
 class CustomerManagerWindow(ctk.CTkToplevel):
     def __init__(self, master, estimate_frame):
@@ -254,24 +340,34 @@ class CustomerManagerWindow(ctk.CTkToplevel):
         self.name_entry = ctk.CTkEntry(form_frame, placeholder_text="Full Name"); self.name_entry.grid(row=0, column=0, columnspan=2, padx=10, pady=(10,5), sticky="ew"); self.address_entry = ctk.CTkEntry(form_frame, placeholder_text="Address"); self.address_entry.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="ew")
         self.phone_entry = ctk.CTkEntry(form_frame, placeholder_text="Phone Number"); self.phone_entry.grid(row=2, column=0, padx=(10,5), pady=5, sticky="ew"); self.email_entry = ctk.CTkEntry(form_frame, placeholder_text="Email"); self.email_entry.grid(row=2, column=1, padx=(5,10), pady=5, sticky="ew")
         self.save_button = ctk.CTkButton(form_frame, text="Add New Customer", command=self.add_or_update_customer); self.save_button.grid(row=3, column=0, columnspan=2, padx=10, pady=10)
-        self.search_entry = ctk.CTkEntry(self, placeholder_text="Search"); self.search_entry.grid(row=1, column=0, padx=20, pady=(10,0), sticky="ew"); self.search_entry.bind("<KeyRelease>", self.filter_list)
-        self.display_frame = ctk.CTkScrollableFrame(self, label_text="Saved Customers"); self.display_frame.grid(row=2, column=0, padx=20, pady=(10,20), sticky="nsew")
+        self.search_entry = ctk.CTkEntry(self, placeholder_text="Search"); self.search_entry.grid(row=1, column=0, padx=20, pady=(10,0), sticky="ew"); self.search_entry.bind("<KeyRelease>", Debouncer(self, self.filter_list))
+        self.display_frame = CTkVirtualList(self, create_row=self._create_customer_row, bind_row=self._bind_customer_row, label_text="Saved Customers"); self.display_frame.grid(row=2, column=0, padx=20, pady=(10,20), sticky="nsew")
         self.all_customers = []; self.refresh_list()
+        unsubscribe = get_catalog().subscribe(self.on_catalog_changed, kinds=("customer",)); self.bind("<Destroy>", lambda event: unsubscribe() if event.widget is self else None, add="+")
     def refresh_list(self):
-        conn = db_connect(); cursor = conn.cursor(); cursor.execute("SELECT id, name, phone, email, address FROM customers ORDER BY name"); self.all_customers = cursor.fetchall(); conn.close()
+        self.all_customers = get_catalog().customers()
         self.display_customers(self.all_customers)
+    def on_catalog_changed(self, change):
+        self.all_customers = get_catalog().customers()
+        if self.search_entry.get().strip(): self.filter_list()
+        else: self.display_customers(self.all_customers, keep_position=True)
     def filter_list(self, event=None):
-        search_term = self.search_entry.get().lower()
+        search_term = self.search_entry.get().strip()
         if not search_term: self.display_customers(self.all_customers); return
-        filtered_customers = [cust for cust in self.all_customers if search_term in cust[1].lower() or (cust[2] and search_term in cust[2].lower())]
-        self.display_customers(filtered_customers)
-    def display_customers(self, customer_list):
-        for widget in self.display_frame.winfo_children(): widget.destroy()
-        for (cust_id, name, phone, email, address) in customer_list:
-            row_frame = ctk.CTkFrame(self.display_frame); row_frame.pack(fill="x", padx=5, pady=4)
-            label = ctk.CTkLabel(row_frame, text=f"{name}  ({phone or 'No phone'})", anchor="w"); label.pack(side="left", fill="x", expand=True, padx=10)
-            delete_btn = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828", command=lambda i=cust_id: self.delete_customer(i)); delete_btn.pack(side="right", padx=5)
-            edit_btn = ctk.CTkButton(row_frame, text="Edit", width=50, command=lambda c_id=cust_id, n=name, a=address, p=phone, e=email: self.populate_edit_fields(c_id, n, a, p, e)); edit_btn.pack(side="right", padx=5)
+        self.display_customers(search_customers(get_db(), search_term))
+    def display_customers(self, customer_list, keep_position=False):
+        self.display_frame.set_items(customer_list, keep_position=keep_position)
+    def _create_customer_row(self, parent):
+        row_frame = ctk.CTkFrame(parent)
+        row_frame.label = ctk.CTkLabel(row_frame, text=" ", anchor="w"); row_frame.label.pack(side="left", fill="x", expand=True, padx=10)
+        row_frame.delete_btn = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828"); row_frame.delete_btn.pack(side="right", padx=5)
+        row_frame.edit_btn = ctk.CTkButton(row_frame, text="Edit", width=50); row_frame.edit_btn.pack(side="right", padx=5)
+        return row_frame
+    def _bind_customer_row(self, row_frame, customer, index):
+        cust_id, name, phone, email, address = customer
+        row_frame.label.configure(text=f"{name}  ({phone or 'No phone'})")
+        row_frame.delete_btn.configure(command=lambda i=cust_id: self.delete_customer(i))
+        row_frame.edit_btn.configure(command=lambda c_id=cust_id, n=name, a=address, p=phone, e=email: self.populate_edit_fields(c_id, n, a, p, e))
     def populate_edit_fields(self, cust_id, name, address, phone, email):
         self.editing_customer_id = cust_id; self.name_entry.delete(0, 'end'); self.name_entry.insert(0, name); self.address_entry.delete(0, 'end'); self.address_entry.insert(0, address or "")
         self.phone_entry.delete(0, 'end'); self.phone_entry.insert(0, phone or ""); self.email_entry.delete(0, 'end'); self.email_entry.insert(0, email or ""); self.save_button.configure(text=f"Update Customer")
@@ -279,115 +375,105 @@ class CustomerManagerWindow(ctk.CTkToplevel):
         name = self.name_entry.get().strip();
         if not name: CustomMessageBox(self, title="Input Error", message="Customer name cannot be empty.").get_result(); return
         address = self.address_entry.get().strip(); phone = self.phone_entry.get().strip(); email = self.email_entry.get().strip()
-        conn = db_connect(); cursor = conn.cursor()
-        if self.editing_customer_id: cursor.execute("UPDATE customers SET name=?, address=?, phone=?, email=? WHERE id=?", (name, address, phone, email, self.editing_customer_id))
-        else: cursor.execute("INSERT INTO customers (name, address, phone, email) VALUES (?, ?, ?, ?)", (name, address, phone, email))
-        conn.commit(); conn.close(); self.editing_customer_id = None; self.name_entry.delete(0, 'end'); self.address_entry.delete(0, 'end'); self.phone_entry.delete(0, 'end'); self.email_entry.delete(0, 'end')
-        self.save_button.configure(text="Add New Customer"); self.refresh_list(); self.estimate_frame.update_dropdowns()
+        get_catalog().save_customer(self.editing_customer_id, name, address, phone, email)
+        self.editing_customer_id = None; self.name_entry.delete(0, 'end'); self.address_entry.delete(0, 'end'); self.phone_entry.delete(0, 'end'); self.email_entry.delete(0, 'end')
+        self.save_button.configure(text="Add New Customer")
     def delete_customer(self, cust_id):
         confirm_delete = True
-        if load_setting('show_confirmations', 'True') == 'True':
+        if get_settings().get_bool('show_confirmations', True):
             dialog = CustomMessageBox(self, title="Confirm Delete", message="Are you sure? This will also delete ALL estimates associated with this customer. This action cannot be undone.", buttons=["Yes", "No"])
             confirm_delete = dialog.get_result()
-        if confirm_delete:
-            conn = db_connect(); cursor = conn.cursor()
-            cursor.execute("DELETE FROM estimate_jobs WHERE customer_id = ?", (cust_id,)); cursor.execute("DELETE FROM customers WHERE id = ?", (cust_id,)); conn.commit(); conn.close()
-            self.refresh_list(); self.estimate_frame.update_dropdowns()
+        if confirm_delete: get_catalog().delete_customer(cust_id)
 
 class PriceListWindow(ctk.CTkToplevel):
     def __init__(self, master, estimate_frame):
         super().__init__(master)
         self.estimate_frame = estimate_frame; self.editing_item_id = None; self.title("Price List Manager"); self.geometry("700x600"); self.grab_set(); self.after(250, lambda: self.iconbitmap(''))
-        self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(3, weight=1); self.categories = {}; self.items_by_cat = {}; self.all_items_from_db = []
+        self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(3, weight=1); self.categories = {}; self.showing_search_results = False
         top_frame = ctk.CTkFrame(self, fg_color="transparent"); top_frame.grid(row=0, column=0, padx=20, pady=(20,0), sticky="ew")
         self.manage_categories_button = ctk.CTkButton(top_frame, text="Manage Categories", command=self.open_category_manager); self.manage_categories_button.pack(side="right")
+        self.reprice_button = ctk.CTkButton(top_frame, text="Re-price Estimates", command=self.open_reprice_window); self.reprice_button.pack(side="right", padx=(0, 10))
+        CTkToolTip(self.reprice_button, message="Update draft and open estimates to the current prices.")
         self.form_frame = ctk.CTkFrame(self); self.form_frame.grid(row=1, column=0, padx=20, pady=10, sticky="ew"); self.form_frame.grid_columnconfigure(0, weight=1)
         self.item_name_entry = ctk.CTkEntry(self.form_frame, placeholder_text="Item Name"); self.item_name_entry.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
         self.unit_price_entry = ctk.CTkEntry(self.form_frame, placeholder_text="Unit Price ($)", width=120); self.unit_price_entry.grid(row=0, column=1, padx=10, pady=10)
         self.category_menu = ctk.CTkOptionMenu(self.form_frame, values=["-"]); self.category_menu.grid(row=0, column=2, padx=10, pady=10)
         self.add_button = ctk.CTkButton(self.form_frame, text="Add New Item", command=self.add_or_update_item); self.add_button.grid(row=0, column=3, padx=10, pady=10)
         search_and_select_frame = ctk.CTkFrame(self); search_and_select_frame.grid(row=2, column=0, padx=20, pady=(10, 0), sticky="ew"); search_and_select_frame.grid_columnconfigure(0, weight=1)
-        self.search_entry = ctk.CTkEntry(search_and_select_frame, placeholder_text="Search"); self.search_entry.grid(row=0, column=0, padx=(0, 10), pady=5, sticky="ew"); self.search_entry.bind("<KeyRelease>", self.on_search)
+        self.search_entry = ctk.CTkEntry(search_and_select_frame, placeholder_text="Search"); self.search_entry.grid(row=0, column=0, padx=(0, 10), pady=5, sticky="ew"); self.search_entry.bind("<KeyRelease>", Debouncer(self, self.on_search))
         self.category_selector = ctk.CTkOptionMenu(search_and_select_frame, command=self.display_items_for_category, values=["-"]); self.category_selector.grid(row=0, column=1, padx=(0,0), pady=5)
-        self.item_display_frame = ctk.CTkScrollableFrame(self); self.item_display_frame.grid(row=3, column=0, padx=20, pady=(10, 20), sticky="nsew")
+        self.item_display_frame = CTkVirtualList(self, create_row=self._create_item_row, bind_row=self._bind_item_row, row_height=34, on_reorder=self.reorder_items); self.item_display_frame.grid(row=3, column=0, padx=20, pady=(10, 20), sticky="nsew")
         self.refresh_data_and_ui()
+        unsubscribe = get_catalog().subscribe(self.on_catalog_changed, kinds=("category", "item")); self.bind("<Destroy>", lambda event: unsubscribe() if event.widget is self else None, add="+")
+    def on_catalog_changed(self, change):
+        """Keeps the menus and the list in step with catalog edits, whichever window made them."""
+        if self.showing_search_results: self._refresh_categories(); self.on_search(); return
+        if change.kind == "item":
+            shown = self.categories.get(self.category_selector.get())
+            if shown not in (change.row.category_id, change.old.category_id if change.old else None): return
+        self.refresh_data_and_ui(keep_position=True)
     def on_search(self, event=None):
-        search_term = self.search_entry.get().lower();
-        for widget in self.item_display_frame.winfo_children(): widget.destroy()
+        search_term = self.search_entry.get().strip()
         if not search_term:
             self.category_selector.configure(state="normal"); self.display_items_for_category(self.category_selector.get()); return
-        self.category_selector.configure(state="disabled"); filtered_items = [item for item in self.all_items_from_db if search_term in item[1].lower()]
-        for item_id, name, price, item_cat_id, cat_name in filtered_items:
-            row_frame = ctk.CTkFrame(self.item_display_frame); row_frame.pack(fill="x", padx=5, pady=2)
-            label = ctk.CTkLabel(row_frame, text=f"[{cat_name}] {name}: ${price:.2f}", anchor="w"); label.pack(side="left", fill="x", expand=True, padx=5, pady=2)
-            down_button = ctk.CTkButton(row_frame, text="▼", width=30, state="disabled"); down_button.pack(side="right", padx=(5,0))
-            up_button = ctk.CTkButton(row_frame, text="▲", width=30, state="disabled"); up_button.pack(side="right", padx=5)
-            delete_button = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828", command=lambda i=item_id: self.delete_item(i)); delete_button.pack(side="right", padx=5)
-            edit_button = ctk.CTkButton(row_frame, text="Edit", width=50, command=lambda i=item_id, n=name, p=price, cn=cat_name: self.populate_edit_fields(i, n, p, cn)); edit_button.pack(side="right", padx=5)
+        self.category_selector.configure(state="disabled"); filtered_items = search_pricelist(get_db(), search_term)
+        self.showing_search_results = True; self.item_display_frame.set_items(filtered_items)
+    def _create_item_row(self, parent):
+        row_frame = ctk.CTkFrame(parent)
+        row_frame.drag_handle = ctk.CTkLabel(row_frame, text="≡", width=20, cursor="fleur"); row_frame.drag_handle.pack(side="left", padx=(5,0))
+        row_frame.label = ctk.CTkLabel(row_frame, text=" ", anchor="w"); row_frame.label.pack(side="left", fill="x", expand=True, padx=5, pady=2)
+        row_frame.down_button = ctk.CTkButton(row_frame, text="▼", width=30); row_frame.down_button.pack(side="right", padx=(5,0))
+        row_frame.up_button = ctk.CTkButton(row_frame, text="▲", width=30); row_frame.up_button.pack(side="right", padx=5)
+        row_frame.delete_button = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828"); row_frame.delete_button.pack(side="right", padx=5)
+        row_frame.edit_button = ctk.CTkButton(row_frame, text="Edit", width=50); row_frame.edit_button.pack(side="right", padx=5)
+        return row_frame
+    def _bind_item_row(self, row_frame, item, index):
+        item_id, name, price, item_cat_id, cat_name = item
+        # Reordering only makes sense within a single category, so the arrows and dragging are disabled for search results.
+        row_frame.draggable = not self.showing_search_results; row_frame.drag_handle.configure(text="≡" if row_frame.draggable else "")
+        if self.showing_search_results:
+            row_frame.label.configure(text=f"[{cat_name}] {name}: ${price:.2f}")
+            row_frame.down_button.configure(state="disabled", command=None); row_frame.up_button.configure(state="disabled", command=None)
+        else:
+            row_frame.label.configure(text=f"{name}: ${price:.2f}")
+            row_frame.down_button.configure(state="disabled" if index == len(self.item_display_frame.items) - 1 else "normal", command=lambda i=index: self.reorder_items(i, i + 1))
+            row_frame.up_button.configure(state="disabled" if index == 0 else "normal", command=lambda i=index: self.reorder_items(i, i - 1))
+        row_frame.delete_button.configure(command=lambda i=item_id: self.delete_item(i))
+        row_frame.edit_button.configure(command=lambda i=item_id, n=name, p=price, cn=cat_name: self.populate_edit_fields(i, n, p, cn))
+    def open_reprice_window(self):
+        reprice_window = RepriceWindow(self, self.estimate_frame); self.wait_window(reprice_window)
     def open_category_manager(self):
-        cat_manager = CategoryManagerWindow(self); self.wait_window(cat_manager); self.refresh_data_and_ui(); self.estimate_frame.update_dropdowns()
+        cat_manager = CategoryManagerWindow(self); self.wait_window(cat_manager)
     def add_or_update_item(self):
         name = self.item_name_entry.get().strip(); price_str = self.unit_price_entry.get(); cat_name = self.category_menu.get()
         if not name or not price_str or cat_name == "-": return
         try: price = float(price_str)
         except ValueError: CustomMessageBox(self, title="Invalid Input", message="Please enter a valid number for the price.").get_result(); return
-        cat_id = self.categories.get(cat_name); conn = db_connect(); cursor = conn.cursor()
-        if self.editing_item_id is not None:
-            cursor.execute("UPDATE pricelist SET item_name = ?, unit_price = ?, category_id = ? WHERE id = ?", (name, price, cat_id, self.editing_item_id))
-        else:
-            cursor.execute("SELECT MAX(sort_order) FROM pricelist WHERE category_id = ?", (cat_id,)); max_order = cursor.fetchone()[0] or 0
-            cursor.execute("INSERT INTO pricelist (item_name, unit_price, sort_order, category_id) VALUES (?, ?, ?, ?)", (name, price, max_order + 1, cat_id))
-        conn.commit(); conn.close(); self.item_name_entry.delete(0, 'end'); self.unit_price_entry.delete(0, 'end'); self.editing_item_id = None; self.add_button.configure(text="Add New Item")
-        self.refresh_data_and_ui(select_category=cat_name); self.estimate_frame.update_dropdowns()
-    def refresh_data_and_ui(self, select_category=None):
-        self.category_selector.configure(state="normal")
-        if select_category is None:
-            try:
-                current_selection = self.category_selector.get()
-                if current_selection != "-": select_category = current_selection
-            except Exception: pass
-        conn = db_connect(); cursor = conn.cursor()
-        cursor.execute("SELECT id, name FROM categories ORDER BY CASE WHEN name = 'Uncategorized' THEN 1 ELSE 0 END, sort_order")
-        db_categories = cursor.fetchall(); self.categories.clear(); cat_options = [] if db_categories else ["-"]
-        for cat_id, name in db_categories: self.categories[name] = cat_id; cat_options.append(name)
-        query = """SELECT p.id, p.item_name, p.unit_price, p.category_id, c.name FROM pricelist p JOIN categories c ON p.category_id = c.id ORDER BY p.sort_order ASC"""
-        cursor.execute(query); self.all_items_from_db = cursor.fetchall(); conn.close()
-        self.items_by_cat.clear()
-        for cat_id, cat_name in db_categories: self.items_by_cat[cat_name] = []
-        for item in self.all_items_from_db:
-            cat_name = item[4]
-            if cat_name in self.items_by_cat: self.items_by_cat[cat_name].append(item)
+        switch_category = self.showing_search_results or self.category_selector.get() != cat_name
+        get_catalog().save_item(self.editing_item_id, name, price, self.categories.get(cat_name))
+        self.item_name_entry.delete(0, 'end'); self.unit_price_entry.delete(0, 'end'); self.editing_item_id = None; self.add_button.configure(text="Add New Item")
+        # Saving into the category on show is already redrawn by on_catalog_changed
+        if switch_category: self.refresh_data_and_ui(select_category=cat_name)
+    def _refresh_categories(self):
+        # 'Uncategorized' goes last; the sort is stable, so the rest keep their order
+        categories = sorted(get_catalog().categories(), key=lambda category: category.name == UNCATEGORIZED)
+        self.categories = {category.name: category.id for category in categories}; cat_options = list(self.categories) or ["-"]
         self.category_menu.configure(values=cat_options); self.category_selector.configure(values=cat_options)
-        category_to_display = select_category
-        if category_to_display not in cat_options: category_to_display = cat_options[0] if cat_options and cat_options[0] != "-" else None
-        if category_to_display: self.category_selector.set(category_to_display); self.display_items_for_category(category_to_display)
+    def refresh_data_and_ui(self, select_category=None, keep_position=False):
+        self.category_selector.configure(state="normal")
+        if select_category is None and self.category_selector.get() != "-": select_category = self.category_selector.get()
+        self._refresh_categories()
+        category_to_display = select_category if select_category in self.categories else next(iter(self.categories), None)
+        if category_to_display: self.category_selector.set(category_to_display); self.display_items_for_category(category_to_display, keep_position)
         else: self.category_selector.set("-"); self.display_items_for_category(None)
-    def display_items_for_category(self, category_name):
-        for widget in self.item_display_frame.winfo_children(): widget.destroy()
-        if category_name is None or category_name not in self.items_by_cat: return
-        category_items = self.items_by_cat[category_name]
-        for index, (item_id, name, price, item_cat_id, _) in enumerate(category_items):
-            row_frame = ctk.CTkFrame(self.item_display_frame); row_frame.pack(fill="x", padx=5, pady=2)
-            label = ctk.CTkLabel(row_frame, text=f"{name}: ${price:.2f}", anchor="w"); label.pack(side="left", fill="x", expand=True, padx=5, pady=2)
-            down_button = ctk.CTkButton(row_frame, text="▼", width=30, command=lambda i=item_id, c=item_cat_id: self.move_item(i, 'down', c)); down_button.pack(side="right", padx=(5,0))
-            if index == len(category_items) - 1: down_button.configure(state="disabled")
-            up_button = ctk.CTkButton(row_frame, text="▲", width=30, command=lambda i=item_id, c=item_cat_id: self.move_item(i, 'up', c)); up_button.pack(side="right", padx=5)
-            if index == 0: up_button.configure(state="disabled")
-            delete_button = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828", command=lambda i=item_id: self.delete_item(i)); delete_button.pack(side="right", padx=5)
-            edit_button = ctk.CTkButton(row_frame, text="Edit", width=50, command=lambda i=item_id, n=name, p=price, cn=category_name: self.populate_edit_fields(i, n, p, cn)); edit_button.pack(side="right", padx=5)
-    def move_item(self, item_id, direction, category_id):
-        conn = db_connect(); cursor = conn.cursor()
-        cursor.execute("SELECT id, sort_order FROM pricelist WHERE category_id = ? ORDER BY sort_order", (category_id,)); sorted_items = cursor.fetchall(); item_index = -1
-        for i, (i_id, so) in enumerate(sorted_items):
-            if i_id == item_id: item_index = i; break
-        if item_index == -1: conn.close(); return
-        if direction == 'up' and item_index > 0: other_index = item_index - 1
-        elif direction == 'down' and item_index < len(sorted_items) - 1: other_index = item_index + 1
-        else: conn.close(); return
-        item1_id, item1_so = sorted_items[item_index]; item2_id, item2_so = sorted_items[other_index]
-        cursor.execute("UPDATE pricelist SET sort_order = ? WHERE id = ?", (item2_so, item1_id)); cursor.execute("UPDATE pricelist SET sort_order = ? WHERE id = ?", (item1_so, item2_id)); conn.commit(); conn.close()
-        cat_id_to_name = {v: k for k, v in self.categories.items()}; cat_name = cat_id_to_name.get(category_id)
-        self.refresh_data_and_ui(select_category=cat_name); self.estimate_frame.update_dropdowns()
+    def display_items_for_category(self, category_name, keep_position=False):
+        self.showing_search_results = False
+        cat_id = self.categories.get(category_name)
+        self.item_display_frame.set_items(get_catalog().items(cat_id) if cat_id is not None else [], keep_position=keep_position)
+    def reorder_items(self, from_index, to_index):
+        """Moves one item within the shown category (by ▲/▼ or drag-and-drop); only the moved row's sort_order is written."""
+        items = self.item_display_frame.items
+        if not self.showing_search_results and 0 <= to_index < len(items): get_catalog().move_item(items[from_index].id, to_index)
     def populate_edit_fields(self, item_id, name, price, cat_name):
         self.editing_item_id = item_id; self.item_name_entry.delete(0, 'end'); self.unit_price_entry.delete(0, 'end')
         self.item_name_entry.insert(0, name); 
@@ -398,60 +484,115 @@ class PriceListWindow(ctk.CTkToplevel):
         self.category_menu.set(cat_name); self.add_button.configure(text="Update Item")
     def delete_item(self, item_id):
         confirm_delete = True
-        if load_setting('show_confirmations', 'True') == 'True':
+        if get_settings().get_bool('show_confirmations', True):
             dialog = CustomMessageBox(self, title="Confirm Delete", message=f"Are you sure you want to delete this item?", buttons=["Yes", "No"])
             confirm_delete = dialog.get_result()
-        if confirm_delete:
-            conn = db_connect(); cursor = conn.cursor()
-            cursor.execute("DELETE FROM pricelist WHERE id = ?", (item_id,)); conn.commit(); conn.close()
-            self.refresh_data_and_ui(); self.estimate_frame.update_dropdowns()
+        if confirm_delete: get_catalog().delete_item(item_id)
 
-class EstimateManagerWindow(ctk.CTkToplevel):
+class RepriceWindow(ctk.CTkToplevel):
+    """Previews and applies the current price list to every draft and open estimate in one transaction."""
     def __init__(self, master, estimate_frame):
-        super().__init__(master); self.estimate_frame = estimate_frame; self.title("Estimate Manager"); self.geometry("700x500"); self.grab_set(); self.after(250, lambda: self.iconbitmap(''))
+        super().__init__(master); self.estimate_frame = estimate_frame; self.title("Re-price Estimates"); self.geometry("700x500"); self.grab_set(); self.after(250, lambda: self.iconbitmap(''))
         self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(1, weight=1)
-        self.search_entry = ctk.CTkEntry(self, placeholder_text="Search"); self.search_entry.grid(row=0, column=0, padx=20, pady=(20,10), sticky="ew"); self.search_entry.bind("<KeyRelease>", self.filter_list)
-        self.scroll_frame = ctk.CTkScrollableFrame(self, label_text="Saved Estimates"); self.scroll_frame.grid(row=1, column=0, padx=20, pady=(10,20), sticky="nsew")
-        self.all_estimates = []; self.refresh_estimates()
+        self.summary_label = ctk.CTkLabel(self, text=" ", justify="left", anchor="w"); self.summary_label.grid(row=0, column=0, padx=20, pady=(20, 5), sticky="ew")
+        self.job_list = CTkVirtualList(self, create_row=self._create_job_row, bind_row=self._bind_job_row, label_text="Estimates to Update"); self.job_list.grid(row=1, column=0, padx=20, pady=5, sticky="nsew")
+        button_frame = ctk.CTkFrame(self, fg_color="transparent"); button_frame.grid(row=2, column=0, padx=20, pady=(10, 20), sticky="e")
+        self.apply_button = ctk.CTkButton(button_frame, text="Apply New Prices", command=self.apply, fg_color="#1F8B4C", hover_color="#1A733F"); self.apply_button.pack(side="left", padx=(0, 10))
+        ctk.CTkButton(button_frame, text="Close", command=self.destroy).pack(side="left")
+        self.refresh_preview()
+    def refresh_preview(self):
+        self.preview = preview_reprice(get_db())
+        self.summary_label.configure(text=self.preview.summary()); self.job_list.set_items(self.preview.jobs)
+        self.apply_button.configure(state="normal" if self.preview.jobs else "disabled")
+    def _create_job_row(self, parent):
+        row_frame = ctk.CTkFrame(parent)
+        row_frame.label = ctk.CTkLabel(row_frame, text=" ", anchor="w"); row_frame.label.pack(side="left", fill="x", expand=True, padx=10)
+        row_frame.total_label = ctk.CTkLabel(row_frame, text=" ", anchor="e"); row_frame.total_label.pack(side="right", padx=10)
+        return row_frame
+    def _bind_job_row(self, row_frame, job, index):
+        job_id, cust_name, job_name, status, lines, old_total, new_total = job
+        job_display_name = f"{job_name} - " if job_name else ""
+        row_frame.label.configure(text=f"{job_display_name}{cust_name} ({status.title()}): {lines} line{'s' if lines != 1 else ''}")
+        row_frame.total_label.configure(text=f"${old_total:,.2f} → ${new_total:,.2f}")
+    def apply(self):
+        affected = {job[0] for job in self.preview.jobs}
+        try:
+            with get_db().transaction() as cursor: lines_updated, estimates_updated = apply_reprice(cursor)
+        except Exception as e:
+            CustomMessageBox(self, title="Database Error", message=f"Could not re-price estimates: {e}").get_result(); return
+        self.refresh_preview()
+        CustomMessageBox(self, title="Re-price Complete", message=f"Updated {lines_updated:,} line items in {estimates_updated:,} estimates.").get_result()
+        if self.estimate_frame.current_job_id in affected:
+            dialog = CustomMessageBox(self, title="Reload Estimate", message="The estimate on screen was re-priced. Reload it now? Unsaved changes to it will be lost.", buttons=["Yes", "No"])
+            if dialog.get_result(): self.estimate_frame.load_estimate(self.estimate_frame.current_job_id)
+
+class EstimateManagerWindow(ctk.CTkToplevel):
+    def __init__(self, master, estimate_frame):
+        super().__init__(master); self.estimate_frame = estimate_frame; self.title("Estimate Manager"); self.geometry("700x560"); self.grab_set(); self.after(250, lambda: self.iconbitmap(''))
+        self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(2, weight=1)
+        self.search_entry = ctk.CTkEntry(self, placeholder_text="Search"); self.search_entry.grid(row=0, column=0, padx=20, pady=(20,5), sticky="ew"); self.search_entry.bind("<KeyRelease>", Debouncer(self, self.filter_list))
+        filter_frame = ctk.CTkFrame(self, fg_color="transparent"); filter_frame.grid(row=1, column=0, padx=20, pady=5, sticky="ew"); filter_frame.grid_columnconfigure(0, weight=1)
+        self.customer_filter_entry = ctk.CTkEntry(filter_frame, placeholder_text="Customer"); self.customer_filter_entry.grid(row=0, column=0, padx=(0,5), sticky="ew")
+        self.date_from_entry = ctk.CTkEntry(filter_frame, placeholder_text="From (YYYY-MM-DD)", width=130); self.date_from_entry.grid(row=0, column=1, padx=5)
+        self.date_to_entry = ctk.CTkEntry(filter_frame, placeholder_text="To (YYYY-MM-DD)", width=130); self.date_to_entry.grid(row=0, column=2, padx=5)
+        self.min_total_entry = ctk.CTkEntry(filter_frame, placeholder_text="Min $", width=70); self.min_total_entry.grid(row=0, column=3, padx=5)
+        self.max_total_entry = ctk.CTkEntry(filter_frame, placeholder_text="Max $", width=70); self.max_total_entry.grid(row=0, column=4, padx=(5,0))
+        for entry in (self.customer_filter_entry, self.date_from_entry, self.date_to_entry, self.min_total_entry, self.max_total_entry):
+            entry.bind("<KeyRelease>", Debouncer(self, self.filter_list))
+        self.scroll_frame = CTkVirtualList(self, create_row=self._create_estimate_row, bind_row=self._bind_estimate_row, label_text="Saved Estimates", on_end_reached=self.load_next_page); self.scroll_frame.grid(row=2, column=0, padx=20, pady=(5,20), sticky="nsew")
+        self.where_sql = "1"; self.where_params = []; self.next_cursor = None; self.all_loaded = False
+        self.refresh_estimates()
     def refresh_estimates(self):
-        conn = db_connect(); cursor = conn.cursor()
-        query = """SELECT j.job_id, c.name, j.estimate_date, j.total_amount, j.job_name FROM estimate_jobs j JOIN customers c ON j.customer_id = c.id ORDER BY j.estimate_date DESC"""
-        cursor.execute(query); self.all_estimates = cursor.fetchall(); conn.close(); self.display_estimates(self.all_estimates)
+        """Re-runs the current filters and loads the first page; later pages load as the list is scrolled."""
+        self.where_sql, self.where_params = build_estimate_filter(
+            get_db(), text=self.search_entry.get(), customer=self.customer_filter_entry.get(),
+            date_from=self.date_from_entry.get(), date_to=self.date_to_entry.get(),
+            min_total=self.min_total_entry.get(), max_total=self.max_total_entry.get())
+        rows = fetch_estimate_page(get_db(), self.where_sql, self.where_params)
+        self.next_cursor = page_cursor(rows); self.all_loaded = len(rows) < ESTIMATE_PAGE_SIZE
+        self.display_estimates(rows)
+    def load_next_page(self):
+        if self.all_loaded or self.next_cursor is None or not self.winfo_exists(): return
+        rows = fetch_estimate_page(get_db(), self.where_sql, self.where_params, after=self.next_cursor)
+        self.all_loaded = len(rows) < ESTIMATE_PAGE_SIZE
+        if rows: self.next_cursor = page_cursor(rows); self.scroll_frame.append_items(rows)
     def filter_list(self, event=None):
-        search_term = self.search_entry.get().lower()
-        if not search_term: self.display_estimates(self.all_estimates); return
-        filtered = [est for est in self.all_estimates if search_term in est[1].lower() or (est[4] and search_term in est[4].lower())]
-        self.display_estimates(filtered)
+        self.refresh_estimates()
     def display_estimates(self, estimate_list):
-        for widget in self.scroll_frame.winfo_children(): widget.destroy()
-        for job_id, cust_name, date, total, job_name in estimate_list:
-            row_frame = ctk.CTkFrame(self.scroll_frame); row_frame.pack(fill="x", padx=5, pady=4)
-            job_display_name = f"{job_name} - " if job_name else ""; label_text = f"{job_display_name}{cust_name} - {date.split(' ')[0]} - ${total:,.2f}"
-            label = ctk.CTkLabel(row_frame, text=label_text, anchor="w"); label.pack(side="left", fill="x", expand=True, padx=10)
-            delete_btn = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828", command=lambda j=job_id: self.delete_job(j)); delete_btn.pack(side="right", padx=5)
-            duplicate_btn = ctk.CTkButton(row_frame, text="Duplicate", width=80, command=lambda j=job_id: self.duplicate_job(j)); duplicate_btn.pack(side="right", padx=5)
-            CTkToolTip(duplicate_btn, message="Create a new, editable copy of this estimate.")
-            load_btn = ctk.CTkButton(row_frame, text="Load", width=50, command=lambda j=job_id: self.load_job(j)); load_btn.pack(side="right", padx=5)
+        self.scroll_frame.set_items(estimate_list)
+    def _create_estimate_row(self, parent):
+        row_frame = ctk.CTkFrame(parent)
+        row_frame.label = ctk.CTkLabel(row_frame, text=" ", anchor="w"); row_frame.label.pack(side="left", fill="x", expand=True, padx=10)
+        row_frame.delete_btn = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828"); row_frame.delete_btn.pack(side="right", padx=5)
+        row_frame.duplicate_btn = ctk.CTkButton(row_frame, text="Duplicate", width=80); row_frame.duplicate_btn.pack(side="right", padx=5)
+        CTkToolTip(row_frame.duplicate_btn, message="Create a new, editable copy of this estimate.")
+        row_frame.load_btn = ctk.CTkButton(row_frame, text="Load", width=50); row_frame.load_btn.pack(side="right", padx=5)
+        return row_frame
+    def _bind_estimate_row(self, row_frame, estimate, index):
+        job_id, cust_name, date, total, job_name, status = estimate
+        job_display_name = f"{job_name} - " if job_name else ""; label_text = f"{job_display_name}{cust_name} - {date.split(' ')[0]} - ${total:,.2f} - {status.title()}"
+        row_frame.label.configure(text=label_text)
+        row_frame.delete_btn.configure(command=lambda j=job_id: self.delete_job(j))
+        row_frame.duplicate_btn.configure(command=lambda j=job_id: self.duplicate_job(j))
+        row_frame.load_btn.configure(command=lambda j=job_id: self.load_job(j))
 
     def delete_job(self, job_id):
         confirm_delete = True
-        if load_setting('show_confirmations', 'True') == 'True':
+        if get_settings().get_bool('show_confirmations', True):
             dialog = CustomMessageBox(self, title="Confirm Delete", message=f"Are you sure you want to delete this estimate? This cannot be undone.", buttons=["Yes", "No"])
             confirm_delete = dialog.get_result()
         if confirm_delete:
-            conn = db_connect()
-            cursor = conn.cursor()
-            # Also delete associated line items for data integrity
-            cursor.execute("DELETE FROM estimate_line_items WHERE job_id = ?", (job_id,))
-            cursor.execute("DELETE FROM estimate_jobs WHERE job_id = ?", (job_id,))
-            conn.commit()
-            conn.close()
+            with get_db().transaction() as cursor:
+                # Also delete associated line items for data integrity
+                cursor.execute("DELETE FROM estimate_line_items WHERE job_id = ?", (job_id,))
+                cursor.execute("DELETE FROM estimate_jobs WHERE job_id = ?", (job_id,))
             
             # If the deleted job is the one loaded on the main screen, clear the screen
             if self.estimate_frame.current_job_id == job_id:
                 self.estimate_frame.clear_estimate()
                 
-            self.refresh_estimates()
+            # Drop just this row so the loaded pages and scroll position are kept
+            self.scroll_frame.set_items([est for est in self.scroll_frame.items if est[0] != job_id], keep_position=True)
     
     def duplicate_job(self, job_id):
         self.estimate_frame.load_estimate(job_id, is_duplicate=True); self.destroy()
@@ -461,7 +602,7 @@ class EstimateManagerWindow(ctk.CTkToplevel):
 class SettingsWindow(ctk.CTkToplevel):
     def __init__(self, master):
         super().__init__(master)
-        self.title("Settings"); self.geometry("500x650"); self.grab_set(); self.after(250, lambda: self.iconbitmap(''))
+        self.title("Settings"); self.geometry("500x760"); self.grab_set(); self.after(250, lambda: self.iconbitmap(''))
         self.grid_columnconfigure(0, weight=1)
         financial_frame = ctk.CTkFrame(self); financial_frame.pack(pady=(20, 10), padx=20, fill="x"); financial_frame.grid_columnconfigure(1, weight=1)
         ctk.CTkLabel(financial_frame, text="Financial Defaults", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, columnspan=2, pady=(10,15), padx=10, sticky="w")
@@ -478,12 +619,21 @@ class SettingsWindow(ctk.CTkToplevel):
         self.theme_switch = ctk.CTkSwitch(behavior_frame, text="Dark", onvalue="dark", offvalue="light", command=lambda: self.master.toggle_theme(self.theme_switch.get())); self.theme_switch.grid(row=1, column=1, pady=10, padx=10, sticky="w")
         ctk.CTkLabel(behavior_frame, text="Show Delete Confirmations:").grid(row=2, column=0, pady=10, padx=10, sticky="w")
         self.confirmations_switch = ctk.CTkSwitch(behavior_frame, text="", onvalue="True", offvalue="False"); self.confirmations_switch.grid(row=2, column=1, pady=10, padx=10, sticky="w")
+        ctk.CTkLabel(behavior_frame, text="Database Profile:").grid(row=3, column=0, pady=10, padx=10, sticky="w")
+        self.db_profile_menu = ctk.CTkOptionMenu(behavior_frame, values=list(PROFILES)); self.db_profile_menu.grid(row=3, column=1, pady=10, padx=10, sticky="w")
+        CTkToolTip(self.db_profile_menu, message="safe: fully synced writes. balanced: recommended. fast: largest caches, fewer disk syncs.")
         data_frame = ctk.CTkFrame(self); data_frame.pack(pady=10, padx=20, fill="x"); data_frame.grid_columnconfigure((0,1), weight=1)
         ctk.CTkLabel(data_frame, text="Data Management", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, columnspan=2, pady=(10,15), padx=10, sticky="w")
         self.backup_button = ctk.CTkButton(data_frame, text="Backup Database", command=self.master.backup_database); self.backup_button.grid(row=1, column=0, columnspan=2, pady=5, padx=10, sticky="ew")
         self.restore_button = ctk.CTkButton(data_frame, text="Restore Database", command=self.master.restore_database, fg_color="#D32F2F", hover_color="#C62828"); self.restore_button.grid(row=2, column=0, columnspan=2, pady=5, padx=10, sticky="ew")
         self.export_button = ctk.CTkButton(data_frame, text="Export Price List (CSV)", command=self.master.export_pricelist_csv); self.export_button.grid(row=3, column=0, pady=(15, 5), padx=10, sticky="ew")
         self.import_button = ctk.CTkButton(data_frame, text="Import Price List (CSV)", command=self.master.import_pricelist_csv); self.import_button.grid(row=3, column=1, pady=(15, 5), padx=10, sticky="ew")
+        self.export_all_button = ctk.CTkButton(data_frame, text="Export All Data (CSV)", command=self.master.export_all_data); self.export_all_button.grid(row=4, column=0, columnspan=2, pady=(5, 10), padx=10, sticky="ew")
+        CTkToolTip(self.export_all_button, message="Price list, customers, estimates and line items, one CSV file each. Can be limited to records changed since the last export.")
+        self.diagnostics_button = ctk.CTkButton(data_frame, text="Query Diagnostics", command=lambda: QueryDiagnosticsWindow(self)); self.diagnostics_button.grid(row=5, column=0, pady=(0, 10), padx=10, sticky="ew")
+        CTkToolTip(self.diagnostics_button, message="Records how long each database query takes, with query plans for slow ones. Exportable for support.")
+        self.stalls_button = ctk.CTkButton(data_frame, text="UI Responsiveness", command=lambda: StallReportWindow(self, self.master.stall_watchdog)); self.stalls_button.grid(row=5, column=1, pady=(0, 10), padx=10, sticky="ew")
+        CTkToolTip(self.stalls_button, message="Shows when the window stopped responding, for how long, and which code was running at the time.")
         self.save_button = ctk.CTkButton(self, text="Save Settings", command=self.save_and_close); self.save_button.pack(side="right", pady=20, padx=20)
         self.load_settings()
 
@@ -496,20 +646,182 @@ class SettingsWindow(ctk.CTkToplevel):
         show_confirmations = load_setting('show_confirmations', 'True')
         if show_confirmations == 'True': self.confirmations_switch.select()
         else: self.confirmations_switch.deselect()
+        self.db_profile_menu.set(load_setting('db_profile', DEFAULT_PROFILE))
 
     def save_and_close(self):
-        save_setting('default_markup', self.markup_entry.get())
-        save_setting('default_install_price', self.install_price_entry.get())
-        save_setting('theme', self.theme_switch.get()); save_setting('show_confirmations', self.confirmations_switch.get())
-        
-        self.master.refresh_defaults_on_screen()
+        # Open windows react through settings subscriptions; everything is written in one transaction.
+        get_settings().update({
+            'default_markup': self.markup_entry.get(), 'default_install_price': self.install_price_entry.get(),
+            'theme': self.theme_switch.get(), 'show_confirmations': self.confirmations_switch.get(),
+            'db_profile': self.db_profile_menu.get(),
+        })
         self.destroy()
 
+class QueryDiagnosticsWindow(ctk.CTkToplevel):
+    """Shows what the query profiler recorded: per-statement totals, the slow-query log with query plans, and the latency histogram."""
+    def __init__(self, master):
+        super().__init__(master); self.title("Query Diagnostics"); self.geometry("900x600"); self.grab_set(); self.after(250, lambda: self.iconbitmap(''))
+        self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(1, weight=1)
+        self.bind("<Destroy>", lambda event: master.grab_set() if event.widget is self and master.winfo_exists() else None, add="+")
+        controls = ctk.CTkFrame(self); controls.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="ew")
+        self.record_switch = ctk.CTkSwitch(controls, text="Record Queries", onvalue="True", offvalue="False", command=self.toggle_recording); self.record_switch.pack(side="left", padx=10, pady=10)
+        ctk.CTkLabel(controls, text="Slow Query (ms):").pack(side="left", padx=(20, 5))
+        self.threshold_entry = ctk.CTkEntry(controls, width=70); self.threshold_entry.pack(side="left", pady=10); self.threshold_entry.bind("<Return>", self.save_threshold)
+        CTkToolTip(self.threshold_entry, message="Queries slower than this are logged together with their query plan. Press Enter to apply.")
+        ctk.CTkButton(controls, text="Export...", width=80, command=self.export_report).pack(side="right", padx=(5, 10))
+        ctk.CTkButton(controls, text="Reset", width=70, command=self.reset, fg_color="#D32F2F", hover_color="#C62828").pack(side="right", padx=5)
+        ctk.CTkButton(controls, text="Refresh", width=70, command=self.refresh).pack(side="right", padx=5)
+        self.tabs = ctk.CTkTabview(self); self.tabs.grid(row=1, column=0, padx=20, pady=0, sticky="nsew")
+        for name in ("Statements", "Slow Queries", "Latency"): self.tabs.add(name).grid_columnconfigure(0, weight=1); self.tabs.tab(name).grid_rowconfigure(0, weight=1)
+        self.statement_list = CTkVirtualList(self.tabs.tab("Statements"), create_row=self._create_statement_row, bind_row=self._bind_statement_row, row_height=52, label_text="Slowest In Total First"); self.statement_list.grid(row=0, column=0, sticky="nsew")
+        self.slow_text = ctk.CTkTextbox(self.tabs.tab("Slow Queries"), wrap="none"); self.slow_text.grid(row=0, column=0, sticky="nsew")
+        self.latency_text = ctk.CTkTextbox(self.tabs.tab("Latency"), wrap="none", font=ctk.CTkFont(family="Courier")); self.latency_text.grid(row=0, column=0, sticky="nsew")
+        self.status_label = ctk.CTkLabel(self, text="", anchor="w"); self.status_label.grid(row=2, column=0, padx=20, pady=(5, 15), sticky="ew")
+        if get_profiler().enabled: self.record_switch.select()
+        self.threshold_entry.insert(0, f"{get_profiler().slow_ms:g}")
+        self.refresh()
+
+    def toggle_recording(self):
+        # The app applies the setting, reopening the shared connection with or without instrumentation
+        save_setting('query_profiling', self.record_switch.get()); self.refresh()
+
+    def save_threshold(self, event=None):
+        try: slow_ms = float(self.threshold_entry.get())
+        except ValueError: slow_ms = 0
+        if slow_ms <= 0: CustomMessageBox(self, title="Input Error", message="The slow query threshold must be a number of milliseconds above 0.").get_result(); return
+        save_setting('slow_query_ms', slow_ms); self.refresh()
+
+    def reset(self):
+        get_profiler().reset(); self.refresh()
+
+    def refresh(self):
+        profiler = get_profiler(); statements = profiler.statements(); slow_queries = profiler.slow_queries()
+        self.statement_list.set_items(statements)
+        self._set_text(self.slow_text, "\n\n".join(self._describe_slow_query(entry) for entry in slow_queries) or f"No queries slower than {profiler.slow_ms:g} ms yet.")
+        self._set_text(self.latency_text, self._describe_histogram(profiler.histogram()))
+        state = "Recording" if profiler.enabled else "Not recording (switch on Record Queries to start)"
+        self.status_label.configure(text=f"{state}  |  Since {profiler.started_at.strftime('%Y-%m-%d %H:%M:%S')}  |  {sum(s['count'] for s in statements)} queries from {len(statements)} statements, {len(slow_queries)} slow")
+
+    def _set_text(self, textbox, text):
+        textbox.configure(state="normal"); textbox.delete("1.0", "end"); textbox.insert("1.0", text); textbox.configure(state="disabled")
+
+    def _describe_slow_query(self, entry):
+        plan = "\n".join(f"    {line}" for line in entry['plan']) or "    (no query plan)"
+        return f"{entry['at']}  {entry['ms']:.1f} ms  {entry['rows']} rows  {entry['call_site']}  [{entry['thread']}]\n  {entry['sql']}\n{plan}"
+
+    def _describe_histogram(self, histogram):
+        total = sum(histogram)
+        if not total: return "No queries recorded yet."
+        widest = max(histogram); lines = []
+        for index, count in enumerate(histogram):
+            lines.append(f"{bucket_label(index):>12}  {count:>8}  {count / total:>6.1%}  {'#' * round(40 * count / widest)}")
+        return "\n".join(lines)
+
+    def _create_statement_row(self, parent):
+        row_frame = ctk.CTkFrame(parent)
+        row_frame.stats_label = ctk.CTkLabel(row_frame, text=" ", anchor="w", font=ctk.CTkFont(weight="bold")); row_frame.stats_label.pack(fill="x", padx=10)
+        row_frame.sql_label = ctk.CTkLabel(row_frame, text=" ", anchor="w"); row_frame.sql_label.pack(fill="x", padx=10)
+        return row_frame
+
+    def _bind_statement_row(self, row_frame, stat, index):
+        p95 = "-" if stat['p95_ms'] is None else f"{stat['p95_ms']:g}"
+        row_frame.stats_label.configure(text=f"{stat['total_ms']:.1f} ms total  |  {stat['count']} calls  |  {stat['mean_ms']:.2f} ms avg, {stat['max_ms']:.1f} max, p95 <= {p95}  |  {stat['rows']} rows  |  {stat['call_site']}")
+        sql = stat['sql']; row_frame.sql_label.configure(text=sql if len(sql) <= 140 else sql[:137] + "...")
+
+    def export_report(self):
+        file_path = tkinter.filedialog.asksaveasfilename(parent=self, defaultextension=".json", filetypes=[("JSON Files", "*.json")], title="Export Query Diagnostics As...", initialfile=f"query_diagnostics_{datetime.now().strftime('%Y-%m-%d')}.json")
+        if not file_path: return
+        db = get_db(); database = {"path": db.path, "profile": db.profile, "schema_version": get_schema_version(db)}
+        try: database["size_bytes"] = os.path.getsize(db.path)
+        except OSError: pass
+        try: get_profiler().export(file_path, extra={"database": database})
+        except OSError as e: CustomMessageBox(self, title="Error", message=f"Could not export diagnostics: {e}").get_result(); return
+        CustomMessageBox(self, title="Success", message=f"Query diagnostics saved to:\n{file_path}").get_result()
+
+class StallReportWindow(ctk.CTkToplevel):
+    """The stall watchdog's rolling summary: event loop latency, stalls by culprit and the most recent stalls with their stacks."""
+    def __init__(self, master, watchdog):
+        super().__init__(master); self.watchdog = watchdog; self.title("UI Responsiveness"); self.geometry("850x550"); self.grab_set(); self.after(250, lambda: self.iconbitmap(''))
+        self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(1, weight=1)
+        self.bind("<Destroy>", lambda event: master.grab_set() if event.widget is self and master.winfo_exists() else None, add="+")
+        controls = ctk.CTkFrame(self); controls.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="ew")
+        self.watch_switch = ctk.CTkSwitch(controls, text="Watch for Stalls", onvalue="True", offvalue="False", command=lambda: save_setting('stall_watchdog', self.watch_switch.get())); self.watch_switch.pack(side="left", padx=10, pady=10)
+        ctk.CTkLabel(controls, text="Stall After (ms):").pack(side="left", padx=(20, 5))
+        self.threshold_entry = ctk.CTkEntry(controls, width=70); self.threshold_entry.pack(side="left", pady=10); self.threshold_entry.bind("<Return>", self.save_threshold)
+        CTkToolTip(self.threshold_entry, message="The window counts as stalled when it can't handle events for this long. Press Enter to apply.")
+        ctk.CTkButton(controls, text="Save Report...", width=100, command=self.save_report).pack(side="right", padx=(5, 10))
+        ctk.CTkButton(controls, text="Reset", width=70, command=lambda: (self.watchdog.reset(), self.refresh()), fg_color="#D32F2F", hover_color="#C62828").pack(side="right", padx=5)
+        self.report_text = ctk.CTkTextbox(self, wrap="none", font=ctk.CTkFont(family="Courier")); self.report_text.grid(row=1, column=0, padx=20, pady=(0, 20), sticky="nsew")
+        if watchdog.running: self.watch_switch.select()
+        self.threshold_entry.insert(0, f"{watchdog.threshold_ms:g}")
+        self.refresh()
+
+    def save_threshold(self, event=None):
+        try: threshold_ms = float(self.threshold_entry.get())
+        except ValueError: threshold_ms = 0
+        if threshold_ms <= 0: CustomMessageBox(self, title="Input Error", message="The stall threshold must be a number of milliseconds above 0.").get_result(); return
+        save_setting('stall_threshold_ms', threshold_ms)
+
+    def refresh(self):
+        # Redrawn every second while open; the scroll position is kept so a long report can be read
+        if not self.winfo_exists(): return
+        position = self.report_text.yview()[0]
+        self.report_text.configure(state="normal"); self.report_text.delete("1.0", "end"); self.report_text.insert("1.0", self.watchdog.format_summary())
+        self.report_text.configure(state="disabled"); self.report_text.yview_moveto(position)
+        self.after(1000, self.refresh)
+
+    def save_report(self):
+        file_path = tkinter.filedialog.asksaveasfilename(parent=self, defaultextension=".txt", filetypes=[("Text Files", "*.txt")], title="Save Responsiveness Report As...", initialfile=f"ui_stalls_{datetime.now().strftime('%Y-%m-%d')}.txt")
+        if not file_path: return
+        try:
+            with open(file_path, 'w', encoding='utf-8') as f: f.write(self.watchdog.format_summary(recent=RECENT_STALLS))
+        except OSError as e: CustomMessageBox(self, title="Error", message=f"Could not save report: {e}").get_result()
+
+class AnalyticsWindow(ctk.CTkToplevel):
+    """Sales totals by month, customer and category, read from the summary tables that triggers keep current (see analytics.py)."""
+    def __init__(self, master):
+        super().__init__(master); self.title("Sales Analytics"); self.geometry("850x600"); self.grab_set(); self.after(250, lambda: self.iconbitmap(''))
+        self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(1, weight=1)
+        self.totals_label = ctk.CTkLabel(self, text="", anchor="w", font=ctk.CTkFont(size=14, weight="bold")); self.totals_label.grid(row=0, column=0, padx=20, pady=(20, 0), sticky="ew")
+        CTkToolTip(self.totals_label, message=f"Won estimates are those marked {WON_STATUS.title()}. Quoted totals include every estimate.")
+        self.tabs = ctk.CTkTabview(self); self.tabs.grid(row=1, column=0, padx=20, pady=(10, 20), sticky="nsew")
+        self.month_list = self._create_table("By Month", ("Month", "Estimates", "Quoted", "Won", "Won Revenue"))
+        self.customer_list = self._create_table("By Customer", ("Customer", "Estimates", "Quoted", "Won", "Won Revenue"), label_text=f"Top {TOP_CUSTOMERS} Customers by Won Revenue")
+        self.category_list = self._create_table("By Category", ("Category", "Line Items", "Quantity", "Quoted", "Won"))
+        self.refresh()
+
+    def _create_table(self, tab_name, headings, label_text=None):
+        tab = self.tabs.add(tab_name); tab.grid_columnconfigure(0, weight=1); tab.grid_rowconfigure(1, weight=1)
+        def layout(frame):
+            frame.grid_columnconfigure(0, weight=3, uniform="column"); frame.grid_columnconfigure(tuple(range(1, len(headings))), weight=2, uniform="column")
+        header = ctk.CTkFrame(tab, fg_color="transparent"); header.grid(row=0, column=0, padx=(10, 30), sticky="ew"); layout(header)
+        for column, heading in enumerate(headings): ctk.CTkLabel(header, text=heading, anchor="w" if column == 0 else "e", font=ctk.CTkFont(weight="bold")).grid(row=0, column=column, padx=10, sticky="ew")
+        def create_row(parent):
+            row_frame = ctk.CTkFrame(parent); layout(row_frame)
+            row_frame.labels = [ctk.CTkLabel(row_frame, text=" ", anchor="w" if column == 0 else "e") for column in range(len(headings))]
+            for column, label in enumerate(row_frame.labels): label.grid(row=0, column=column, padx=10, sticky="ew")
+            return row_frame
+        def bind_row(row_frame, values, index):
+            for label, value in zip(row_frame.labels, values): label.configure(text=value)
+        table = CTkVirtualList(tab, create_row=create_row, bind_row=bind_row, label_text=label_text); table.grid(row=1, column=0, sticky="nsew")
+        return table
+
+    def refresh(self):
+        db = get_db()
+        estimates, quoted_total, won, won_total = overall_totals(db)
+        win_rate = f" ({won / estimates:.0%})" if estimates else ""
+        self.totals_label.configure(text=f"All time: {estimates:,} estimates, ${quoted_total:,.2f} quoted  |  {won:,} won{win_rate}, ${won_total:,.2f}")
+        def won_count(won, estimates): return f"{won:,} ({won / estimates:.0%})" if estimates else f"{won:,}"
+        self.month_list.set_items([(month or "Undated", f"{count:,}", f"${quoted:,.2f}", won_count(won, count), f"${won_total:,.2f}") for month, count, quoted, won, won_total in monthly_summary(db)])
+        self.customer_list.set_items([(name, f"{count:,}", f"${quoted:,.2f}", won_count(won, count), f"${won_total:,.2f}") for name, count, quoted, won, won_total in customer_summary(db)])
+        self.category_list.set_items([(name, f"{count:,}", f"{quantity:,g}", f"${quoted:,.2f}", f"${won_total:,.2f}") for name, count, quantity, quoted, won_total in category_summary(db)])
+
 class EstimateFrame(ctk.CTkFrame):
     def __init__(self, master):
         super().__init__(master)
-        self.current_job_id = None; self.line_items = []; self.customers = {}; self.prices = {}; self.items_by_category = {}
-        self.selected_customer_id = None; self.editing_item_index = None
+        self.current_job_id = None; self.line_items = []
+        self.selected_customer_id = None; self.editing_item_key = None
+        self._line_keys = itertools.count(1); self._line_rows = {}; self.line_items_subtotal = 0.0
         self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(2, weight=1)
 
         self.title = ctk.CTkLabel(self, text="Estimate Generator", font=ctk.CTkFont(size=18, weight="bold"))
@@ -524,8 +836,9 @@ class EstimateFrame(ctk.CTkFrame):
         
         add_item_frame = ctk.CTkFrame(self, fg_color="transparent"); add_item_frame.grid(row=3, column=0, columnspan=2, padx=20, pady=0, sticky="ew"); add_item_frame.grid_columnconfigure((0,1), weight=1)
         ctk.CTkLabel(add_item_frame, text="Add from Price List:").grid(row=0, column=0, columnspan=4, sticky="w")
-        self.category_est_menu = ctk.CTkOptionMenu(add_item_frame, values=["-"], command=self.update_item_menu); self.category_est_menu.grid(row=1, column=0, padx=(0,10), pady=5, sticky="ew")
-        self.item_menu = ctk.CTkOptionMenu(add_item_frame, values=["-"]); self.item_menu.grid(row=1, column=1, padx=(0,10), pady=5, sticky="ew")
+        self.category_est_menu = ctk.CTkOptionMenu(add_item_frame, values=[ALL_CATEGORIES], command=lambda _: self.item_picker.clear()); self.category_est_menu.grid(row=1, column=0, padx=(0,10), pady=5, sticky="ew")
+        self.item_picker = CTkSearchPicker(add_item_frame, search=self.search_price_items, on_pick=lambda item: self.add_or_update_item_in_estimate(), placeholder_text="Type to search the price list")
+        self.item_picker.grid(row=1, column=1, padx=(0,10), pady=5, sticky="ew")
         self.quantity_entry = ctk.CTkEntry(add_item_frame, placeholder_text="Qty", width=80); self.quantity_entry.grid(row=1, column=2, padx=0, pady=5)
         self.add_item_button = ctk.CTkButton(add_item_frame, text="Add Item", command=self.add_or_update_item_in_estimate); self.add_item_button.grid(row=1, column=3, padx=10, pady=5)
         
@@ -546,16 +859,31 @@ class EstimateFrame(ctk.CTkFrame):
         
         CTkToolTip(self.delete_button, message="Delete the currently loaded estimate from the database.")
         
-        self.clear_estimate()
+        # The customer and price list menus are filled by update_dropdowns() once the window is on screen
+        self.clear_estimate(reload_lists=False)
+        get_settings().subscribe(self.on_defaults_changed, keys=('default_markup', 'default_install_price'))
+        get_catalog().subscribe(self.on_catalog_changed)
+
+    def on_defaults_changed(self, changed):
+        """Applies new financial defaults to a blank, unsaved estimate; loaded or edited estimates are left alone."""
+        if self.current_job_id is not None or self.line_items: return
+        if 'default_markup' in changed: self.markup_entry.delete(0, 'end'); self.markup_entry.insert(0, changed['default_markup'])
+        if 'default_install_price' in changed:
+            self.install_cost_entry.delete(0, 'end'); self.install_cost_entry.insert(0, changed['default_install_price'])
+        self.recalculate_totals()
 
     def _build_header_fields(self):
         for widget in self.header_container.winfo_children(): widget.destroy()
         ctk.CTkLabel(self.header_container, text="Customer:").grid(row=0, column=0, padx=(20,10), pady=(10, 5), sticky="w")
-        self.customer_menu = ctk.CTkOptionMenu(self.header_container, values=["-"], command=self.set_customer)
-        self.customer_menu.grid(row=0, column=1, padx=(0,20), pady=(10,5), sticky="ew")
+        self.customer_picker = CTkSearchPicker(self.header_container, search=self.search_customers, on_pick=self.set_customer, on_clear=lambda: self.set_customer(None), placeholder_text="Type a customer name or phone number")
+        self.customer_picker.grid(row=0, column=1, padx=(0,20), pady=(10,5), sticky="ew")
         ctk.CTkLabel(self.header_container, text="Job Name:").grid(row=1, column=0, padx=(20,10), pady=5, sticky="w")
         self.job_name_entry = ctk.CTkEntry(self.header_container, placeholder_text="e.g., Kitchen Remodel")
         self.job_name_entry.grid(row=1, column=1, padx=(0,20), pady=5, sticky="ew")
+        ctk.CTkLabel(self.header_container, text="Status:").grid(row=2, column=0, padx=(20,10), pady=5, sticky="w")
+        self.status_menu = ctk.CTkOptionMenu(self.header_container, values=[status.title() for status in ESTIMATE_STATUSES], width=120)
+        self.status_menu.grid(row=2, column=1, padx=(0,20), pady=5, sticky="w"); self.status_menu.set("Draft")
+        CTkToolTip(self.status_menu, message="Draft and open estimates are updated by Re-price Estimates; closed ones keep their prices.")
 
     def _build_totals_frame(self):
         if hasattr(self, 'totals_frame') and self.totals_frame.winfo_exists():
@@ -599,14 +927,15 @@ class EstimateFrame(ctk.CTkFrame):
             self.install_qty_entry.insert(0, "1")
         self.recalculate_totals()
 
-    def clear_estimate(self):
+    def clear_estimate(self, reload_lists=True):
         self.current_job_id = None; self.line_items = []; self.selected_customer_id = None
         self._build_header_fields()
         self._build_totals_frame()
-        self.update_dropdowns()
-        default_markup = load_setting('default_markup', '')
+        if reload_lists: self.update_dropdowns()
+        settings = get_settings()
+        default_markup = settings.get('default_markup', '')
         if default_markup: self.markup_entry.insert(0, default_markup)
-        default_install = load_setting('default_install_price', '')
+        default_install = settings.get('default_install_price', '')
         if default_install: self.install_cost_entry.insert(0, default_install)
         self.refresh_estimate_display()
         self.recalculate_totals()
@@ -618,12 +947,12 @@ class EstimateFrame(ctk.CTkFrame):
             CustomMessageBox(self, title="Error", message="This is a new estimate and has not been saved yet.").get_result()
             return
         
-        customer_name = self.customer_menu.get()
+        customer_name = self.customer_name()
         job_name = self.job_name_entry.get().strip()
         display_text = f"the estimate '{job_name}' for {customer_name}" if job_name else f"the estimate for {customer_name}"
         
         confirm_delete = True
-        if load_setting('show_confirmations', 'True') == 'True':
+        if get_settings().get_bool('show_confirmations', True):
             dialog = CustomMessageBox(self, title="Confirm Delete", 
                                       message=f"Are you sure you want to permanently delete {display_text}? This action cannot be undone.", 
                                       buttons=["Yes", "No"])
@@ -631,12 +960,9 @@ class EstimateFrame(ctk.CTkFrame):
             
         if confirm_delete:
             try:
-                conn = db_connect()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM estimate_jobs WHERE job_id = ?", (self.current_job_id,))
-                cursor.execute("DELETE FROM estimate_line_items WHERE job_id = ?", (self.current_job_id,))
-                conn.commit()
-                conn.close()
+                with get_db().transaction() as cursor:
+                    cursor.execute("DELETE FROM estimate_jobs WHERE job_id = ?", (self.current_job_id,))
+                    cursor.execute("DELETE FROM estimate_line_items WHERE job_id = ?", (self.current_job_id,))
                 self.clear_estimate()
             except Exception as e:
                 CustomMessageBox(self, title="Database Error", message=f"Could not delete estimate: {e}").get_result()
@@ -644,22 +970,23 @@ class EstimateFrame(ctk.CTkFrame):
     def load_estimate(self, job_id, is_duplicate=False):
         self.clear_estimate() # Start with a clean slate
         
-        conn = db_connect(); cursor = conn.cursor()
-        cursor.execute("SELECT customer_id, job_name, install_total, markup_percent, misc_charge, install_qty, install_unit_price FROM estimate_jobs WHERE job_id = ?", (job_id,));
-        job_info = cursor.fetchone()
-        if not job_info: conn.close(); return
+        db = get_db()
+        job_info = load_estimate_job(db, job_id)
+        if not job_info: return
 
         if not is_duplicate:
             self.current_job_id = job_id
             # Show the delete button because a saved estimate is loaded
             self.delete_button.pack(side="left", padx=(10, 0))
 
-        cust_id, job_name, install_total, markup_percent, misc_charge, install_qty, install_unit_price = job_info
-        cust_name = self.customer_names_by_id.get(cust_id, "-"); self.customer_menu.set(cust_name); self.selected_customer_id = cust_id
+        cust_id, job_name, install_total, markup_percent, misc_charge, install_qty, install_unit_price, status = job_info
+        customer = get_catalog().customer(cust_id); self.customer_picker.set(customer.name if customer else "", customer); self.selected_customer_id = cust_id
         self.job_name_entry.insert(0, job_name or "")
-        cursor.execute("SELECT item_name, category_name, quantity, unit_price, line_total FROM estimate_line_items WHERE job_id = ?", (job_id,)); items = cursor.fetchall()
-        for name, cat_name, qty, unit_p, total_p in items:
-            self.line_items.append({"name": name, "category": cat_name or "Write-in", "qty": qty, "unit_price": unit_p, "total": total_p})
+        if not is_duplicate and status in ESTIMATE_STATUSES: self.status_menu.set(status.title()) # A copy starts out as a draft
+        self.line_items = load_line_items(db, job_id)
+        if is_duplicate:
+            # The copy is saved as a new job, so its lines must not keep the original's row ids
+            for item in self.line_items: item["item_id"] = None
 
         # Clear fields before inserting loaded values to prevent doubling
         markup_val = markup_percent or 0.0
@@ -682,7 +1009,7 @@ class EstimateFrame(ctk.CTkFrame):
         self.misc_entry.delete(0, 'end')
         self.misc_entry.insert(0, str(int(misc_val)) if misc_val == int(misc_val) else str(misc_val))
         
-        conn.close(); self.refresh_estimate_display()
+        self.refresh_estimate_display()
         if is_duplicate:
             self.current_job_id = None
             original_job_name = self.job_name_entry.get()
@@ -692,120 +1019,212 @@ class EstimateFrame(ctk.CTkFrame):
             self.delete_button.pack_forget()
 
     def recalculate_totals_event(self, event=None): self.recalculate_totals()
+    def read_totals(self, subtotal=None):
+        """Prices the estimate from the entries with the shared pricing engine; subtotal defaults to the running line item sum."""
+        if subtotal is None: subtotal = self.line_items_subtotal if self.line_items else 0.0
+        return compute_totals(subtotal, parse_amount(self.markup_entry.get()), parse_amount(self.install_qty_entry.get()),
+                              parse_amount(self.install_cost_entry.get()), parse_amount(self.misc_entry.get()))
     def recalculate_totals(self):
-        subtotal = sum(item['total'] for item in self.line_items)
-        try: markup_percent = float(self.markup_entry.get() or 0)
-        except ValueError: markup_percent = 0
-        markup_amount = subtotal * (markup_percent / 100); total_after_markup = subtotal + markup_amount
-        try: install_qty = float(self.install_qty_entry.get() or 0)
-        except ValueError: install_qty = 0
-        try: install_unit_cost = float(self.install_cost_entry.get() or 0)
-        except ValueError: install_unit_cost = 0
-        install_total = install_qty * install_unit_cost
-        try: misc_charge = float(self.misc_entry.get() or 0)
-        except ValueError: misc_charge = 0
-        grand_total = total_after_markup + install_total + misc_charge
-        self.subtotal_label_value.configure(text=f"${subtotal:,.2f}"); self.markup_label_value.configure(text=f"${markup_amount:,.2f}"); self.install_label_value.configure(text=f"${install_total:,.2f}"); self.misc_label_value.configure(text=f"${misc_charge:,.2f}"); self.grand_total_label_value.configure(text=f"${grand_total:,.2f}")
+        totals = self.read_totals()
+        self.subtotal_label_value.configure(text=f"${totals.subtotal:,.2f}"); self.markup_label_value.configure(text=f"${totals.markup_amount:,.2f}"); self.install_label_value.configure(text=f"${totals.install_total:,.2f}"); self.misc_label_value.configure(text=f"${totals.misc_charge:,.2f}"); self.grand_total_label_value.configure(text=f"${totals.grand_total:,.2f}")
+    def make_snapshot(self):
+        """Returns an immutable EstimateSnapshot of the estimate as currently shown, or None if no customer is selected."""
+        if not self.selected_customer_id: return None
+        customer = get_catalog().customer(self.selected_customer_id)
+        if customer is None: return None
+        return make_snapshot((customer.name, customer.address, customer.phone, customer.email), self.line_items, self.read_totals(sum(item['total'] for item in self.line_items)))
     def add_write_in_item(self):
         desc = self.write_in_desc_entry.get(); qty_str = self.write_in_qty_entry.get(); price_str = self.write_in_price_entry.get()
         if not desc or not qty_str or not price_str: return
         try: qty = int(qty_str); price = float(price_str)
         except ValueError: CustomMessageBox(self, title="Input Error", message="Quantity and Price must be valid numbers.").get_result(); return
-        new_item_data = {"category": "Write-in", "name": desc, "qty": qty, "unit_price": price, "total": qty * price}
-        self.line_items.append(new_item_data); self.write_in_desc_entry.delete(0, 'end'); self.write_in_qty_entry.delete(0, 'end'); self.write_in_price_entry.delete(0, 'end'); self.refresh_estimate_display()
-    def delete_item_from_estimate(self, index):
+        new_item_data = {"category": "Write-in", "name": desc, "qty": qty, "unit_price": price, "total": line_total(qty, price)}
+        self.write_in_desc_entry.delete(0, 'end'); self.write_in_qty_entry.delete(0, 'end'); self.write_in_price_entry.delete(0, 'end'); self._insert_line_item(len(self.line_items), new_item_data)
+    def delete_item_from_estimate(self, key):
         confirm_delete = True
-        if load_setting('show_confirmations', 'True') == 'True':
+        if get_settings().get_bool('show_confirmations', True):
             dialog = CustomMessageBox(self, title="Confirm Delete", message=f"Are you sure you want to delete this item?", buttons=["Yes", "No"])
             confirm_delete = dialog.get_result()
         if confirm_delete:
-            self.line_items.pop(index); self.refresh_estimate_display()
-    def populate_edit_form(self, index):
-        self.editing_item_index = index; item_data = self.line_items[index]; self.quantity_entry.delete(0, 'end')
-        self.category_est_menu.set(item_data['category']); self.update_item_menu(item_data['category']); self.item_menu.set(item_data['name'])
+            index = self._line_item_index(key)
+            if index is None: return
+            item = self.line_items.pop(index); self.line_items_subtotal -= item['total']
+            self._line_rows.pop(key).destroy()
+            if self.editing_item_key == key: self.editing_item_key = None; self.add_item_button.configure(text="Add Item")
+            # Only the new first/last rows can have changed arrow states.
+            if index == 0 and self.line_items: self._bind_line_row(0)
+            if index == len(self.line_items) and self.line_items: self._bind_line_row(index - 1)
+            self.recalculate_totals()
+    def populate_edit_form(self, key):
+        index = self._line_item_index(key)
+        if index is None: return
+        self.editing_item_key = key; item_data = self.line_items[index]; self.quantity_entry.delete(0, 'end')
+        # The linked id is trusted only while it still names this line's item; a stale one would put a different product in the picker
+        catalog = get_catalog(); price_item = catalog.item(item_data.get('pricelist_id'))
+        if price_item is None or (price_item.category_name, price_item.name) != (item_data['category'], item_data['name']): price_item = catalog.find_item(item_data['category'], item_data['name'])
+        self.item_picker.set(item_data['name'], price_item)
         self.quantity_entry.insert(0, str(item_data['qty'])); self.add_item_button.configure(text="Update Item")
     def add_or_update_item_in_estimate(self):
-        category_name = self.category_est_menu.get(); item_name = self.item_menu.get(); quantity_str = self.quantity_entry.get()
-        if item_name == "-" or not quantity_str or self.selected_customer_id is None: return
+        # A picked item is added straight away, so a blank quantity means one
+        price_item = self.item_picker.value; quantity_str = self.quantity_entry.get().strip() or "1"
+        if price_item is None or self.selected_customer_id is None: return
         try:
-            quantity = int(quantity_str); unit_price = self.prices[item_name]; line_total = quantity * unit_price
-            new_item_data = {"category": category_name, "name": item_name, "qty": quantity, "unit_price": unit_price, "total": line_total}
-            if self.editing_item_index is not None:
-                self.line_items.pop(self.editing_item_index); self.line_items.insert(self.editing_item_index, new_item_data)
-            else: self.line_items.append(new_item_data)
-            self.quantity_entry.delete(0, 'end'); self.editing_item_index = None; self.add_item_button.configure(text="Add Item"); self.refresh_estimate_display()
-        except (ValueError, KeyError): pass
-    def move_item_in_estimate(self, index, direction):
-        if direction == 'up' and index > 0: self.line_items[index], self.line_items[index - 1] = self.line_items[index - 1], self.line_items[index]
-        elif direction == 'down' and index < len(self.line_items) - 1: self.line_items[index], self.line_items[index + 1] = self.line_items[index + 1], self.line_items[index]
-        self.refresh_estimate_display()
+            quantity = int(quantity_str); unit_price = price_item.price; item_total = line_total(quantity, unit_price)
+            new_item_data = {"category": price_item.category_name, "name": price_item.name, "qty": quantity, "unit_price": unit_price, "total": item_total, "pricelist_id": price_item.id}
+            index = self._line_item_index(self.editing_item_key) if self.editing_item_key is not None else None
+            if index is not None:
+                old_item = self.line_items[index]
+                # Keep the row key and the stored row id/position so the save only updates this line
+                for field in ('key', 'item_id', 'position'): new_item_data[field] = old_item.get(field)
+                self.line_items[index] = new_item_data; self.line_items_subtotal += item_total - old_item['total']
+                self._bind_line_row(index); self.recalculate_totals()
+            else: self._insert_line_item(len(self.line_items), new_item_data)
+            self.quantity_entry.delete(0, 'end'); self.item_picker.clear(); self.editing_item_key = None; self.add_item_button.configure(text="Add Item")
+        except ValueError: pass
+    def move_item_in_estimate(self, key, direction):
+        index = self._line_item_index(key)
+        if index is None: return
+        if direction == 'up' and index > 0: other = index - 1
+        elif direction == 'down' and index < len(self.line_items) - 1: other = index + 1
+        else: return
+        self.line_items[index], self.line_items[other] = self.line_items[other], self.line_items[index]
+        upper, lower = min(index, other), max(index, other)
+        # Swap the two row widgets in the pack order; no other row is touched.
+        self._line_rows[self.line_items[upper]['key']].pack(before=self._line_rows[self.line_items[lower]['key']])
+        self._bind_line_row(upper); self._bind_line_row(lower)
+
+    # --- Keyed line-item rows: each row widget is tied to a line item's key and patched in place ---
+    def _line_item_index(self, key):
+        for index, item in enumerate(self.line_items):
+            if item['key'] == key: return index
+        return None
+    def _insert_line_item(self, index, item):
+        """Inserts one line item and creates exactly one row widget for it."""
+        item['key'] = next(self._line_keys); self.line_items.insert(index, item); self.line_items_subtotal += item['total']
+        row_frame = self._create_line_row(item['key']); self._line_rows[item['key']] = row_frame
+        if index + 1 < len(self.line_items): row_frame.pack(fill="x", before=self._line_rows[self.line_items[index + 1]['key']])
+        else: row_frame.pack(fill="x")
+        self._bind_line_row(index)
+        if index > 0: self._bind_line_row(index - 1)
+        if index + 1 < len(self.line_items) and index == 0: self._bind_line_row(1)
+        self.recalculate_totals()
+    def _create_line_row(self, key):
+        row_frame = ctk.CTkFrame(self.estimate_display_frame, fg_color="transparent")
+        row_frame.label = ctk.CTkLabel(row_frame, text=" ", anchor="w"); row_frame.label.pack(side="left", padx=10, pady=2, fill="x", expand=True)
+        row_frame.down_button = ctk.CTkButton(row_frame, text="▼", width=30, command=lambda k=key: self.move_item_in_estimate(k, 'down')); row_frame.down_button.pack(side="right", padx=(5,10), pady=2)
+        row_frame.up_button = ctk.CTkButton(row_frame, text="▲", width=30, command=lambda k=key: self.move_item_in_estimate(k, 'up')); row_frame.up_button.pack(side="right", padx=5, pady=2)
+        delete_btn = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828", command=lambda k=key: self.delete_item_from_estimate(k)); delete_btn.pack(side="right", padx=5, pady=2)
+        edit_btn = ctk.CTkButton(row_frame, text="Edit", width=50, command=lambda k=key: self.populate_edit_form(k)); edit_btn.pack(side="right", padx=5, pady=2)
+        return row_frame
+    def _bind_line_row(self, index):
+        item = self.line_items[index]; row_frame = self._line_rows[item['key']]
+        row_frame.label.configure(text=f"{item['qty']} x {item['name']} @ ${item['unit_price']:.2f} = ${item['total']:.2f}")
+        row_frame.up_button.configure(state="disabled" if index == 0 else "normal")
+        row_frame.down_button.configure(state="disabled" if index == len(self.line_items) - 1 else "normal")
     def refresh_estimate_display(self):
-        for widget in self.estimate_display_frame.winfo_children(): widget.destroy()
+        """Rebuilds every row from self.line_items; used when a whole estimate is cleared or loaded."""
+        for row_frame in self._line_rows.values(): row_frame.destroy()
+        self._line_rows = {}; self.line_items_subtotal = 0.0; self.editing_item_key = None
         for index, item in enumerate(self.line_items):
-            row_frame = ctk.CTkFrame(self.estimate_display_frame, fg_color="transparent"); row_frame.pack(fill="x")
-            text = f"{item['qty']} x {item['name']} @ ${item['unit_price']:.2f} = ${item['total']:.2f}"
-            label = ctk.CTkLabel(row_frame, text=text, anchor="w"); label.pack(side="left", padx=10, pady=2, fill="x", expand=True)
-            down_button = ctk.CTkButton(row_frame, text="▼", width=30, command=lambda i=index: self.move_item_in_estimate(i, 'down')); down_button.pack(side="right", padx=(5,10), pady=2)
-            if index == len(self.line_items) - 1: down_button.configure(state="disabled")
-            up_button = ctk.CTkButton(row_frame, text="▲", width=30, command=lambda i=index: self.move_item_in_estimate(i, 'up')); up_button.pack(side="right", padx=5, pady=2)
-            if index == 0: up_button.configure(state="disabled")
-            delete_btn = ctk.CTkButton(row_frame, text="Delete", width=60, fg_color="#D32F2F", hover_color="#C62828", command=lambda i=index: self.delete_item_from_estimate(i)); delete_btn.pack(side="right", padx=5, pady=2)
-            edit_btn = ctk.CTkButton(row_frame, text="Edit", width=50, command=lambda i=index: self.populate_edit_form(i)); edit_btn.pack(side="right", padx=5, pady=2)
+            item['key'] = next(self._line_keys); self.line_items_subtotal += item['total']
+            row_frame = self._create_line_row(item['key']); self._line_rows[item['key']] = row_frame; row_frame.pack(fill="x")
+            self._bind_line_row(index)
         self.recalculate_totals()
     def update_dropdowns(self):
-        conn = db_connect(); cursor = conn.cursor(); cursor.execute("SELECT id, name FROM customers ORDER BY name"); customers = cursor.fetchall(); customer_names = [name for id, name in customers]
-        self.customers = {name: id for id, name in customers}; self.customer_names_by_id = {id: name for id, name in customers}; self.customer_menu.configure(values=customer_names if customer_names else ["-"])
-        if not customer_names: self.customer_menu.set("-")
-        cursor.execute("SELECT name FROM categories ORDER BY sort_order ASC"); categories = [row[0] for row in cursor.fetchall()]
-        self.category_est_menu.configure(values=categories if categories else ["-"])
-        if not categories: self.category_est_menu.set("-")
-        cursor.execute("""SELECT c.name, p.item_name, p.unit_price FROM pricelist p JOIN categories c ON p.category_id = c.id ORDER BY c.name, p.sort_order""")
-        self.items_by_category.clear(); self.prices.clear()
-        for cat_name, item_name, price in cursor.fetchall():
-            if cat_name not in self.items_by_category: self.items_by_category[cat_name] = []
-            self.items_by_category[cat_name].append(item_name); self.prices[item_name] = price
-        conn.close(); self.update_item_menu(self.category_est_menu.get())
-    def update_item_menu(self, category):
-        items = self.items_by_category.get(category, []); self.item_menu.configure(values=items if items else ["-"]); self.item_menu.set(items[0] if items else "-")
-    def set_customer(self, selected_name): self.selected_customer_id = self.customers.get(selected_name)
+        """Fills the category menu from the in-memory catalog; customers and items are searched as they are typed."""
+        self._refresh_category_menu()
+    def search_customers(self, text):
+        """Matches for the customer picker, by id, so customers who share a name stay apart (their phone tells them apart)."""
+        customers = get_customer_index().search(text) if text.strip() else get_catalog().customers()[:CUSTOMER_SEARCH_LIMIT]
+        return [(f"{customer.name}  {customer.phone}" if customer.phone else customer.name, customer) for customer in customers]
+    def _refresh_category_menu(self):
+        categories = [ALL_CATEGORIES] + [category.name for category in get_catalog().categories()]
+        self.category_est_menu.configure(values=categories)
+        if self.category_est_menu.get() not in categories: self.category_est_menu.set(ALL_CATEGORIES)
+    def search_price_items(self, text):
+        """Matches for the item picker: prefix search within the chosen category, or its first items while nothing is typed."""
+        catalog = get_catalog(); category = catalog.category_by_name(self.category_est_menu.get())
+        if text.strip(): items = get_item_index().search(text, category.id if category else None)
+        else: items = catalog.items(category.id)[:ITEM_SEARCH_LIMIT] if category else []
+        show_category = category is None
+        return [(f"{item.name}{f'  ({item.category_name})' if show_category else ''}  ${item.price:,.2f}", item) for item in items]
+    def on_catalog_changed(self, change):
+        """Updates only the menus an edit affects, keeping the current selections (and the picked item) where they still exist."""
+        if change.kind == "all": self.update_dropdowns(); self.item_picker.clear(); self._relink_line_items(); return # An import can renumber items
+        if change.kind == "customer":
+            if change.row.id == self.selected_customer_id:
+                if change.action == "deleted": self.selected_customer_id = None; self.customer_picker.clear()
+                else: self.customer_picker.set(change.row.name, change.row)
+            self.after_idle(self.customer_picker.refresh)
+        elif change.kind == "category":
+            shown = self.category_est_menu.get()
+            if change.action == "updated" and change.old.name == shown: self.category_est_menu.set(change.row.name)
+            elif change.action == "deleted" and change.row.name == shown: self.category_est_menu.set(UNCATEGORIZED) # Its items went there
+            self._refresh_category_menu()
+        elif change.kind == "item" and change.action == "deleted": self._unlink_line_items(change.row.id)
+        picked = self.item_picker.value
+        if picked is not None and change.kind in ("item", "category"):
+            # Keep the picked item's price and category current, or drop it if it was deleted
+            if change.kind == "item" and change.row.id == picked.id: self.item_picker.value = None if change.action == "deleted" else change.row
+            elif change.kind == "category": self.item_picker.value = get_catalog().item(picked.id)
+        # The search index updates from the same event, so search once every subscriber has seen it
+        if change.kind in ("item", "category"): self.after_idle(self.item_picker.refresh)
+    def _relink_line_items(self):
+        """Points the open estimate's lines at the price list items with their category and name, as link_line_items() does for saved ones."""
+        catalog = get_catalog()
+        for item in self.line_items:
+            if item['category'] == "Write-in": continue
+            price_item = catalog.find_item(item['category'], item['name']); item['pricelist_id'] = price_item.id if price_item else None
+    def _unlink_line_items(self, pricelist_id):
+        """Drops the open estimate's links to a deleted item, whose id may be given to a later one; the lines keep their price."""
+        for item in self.line_items:
+            if item.get('pricelist_id') == pricelist_id: item['pricelist_id'] = None
+    def set_customer(self, customer):
+        self.selected_customer_id = customer.id if customer else None
+    def customer_name(self):
+        customer = get_catalog().customer(self.selected_customer_id) if self.selected_customer_id else None
+        return customer.name if customer else ""
     def save_estimate(self):
         if not self.selected_customer_id: CustomMessageBox(self, title="Save Error", message="Please select a customer before saving.").get_result(); return
         job_name = self.job_name_entry.get().strip()
-        try: markup_percent = float(self.markup_entry.get() or 0)
-        except ValueError: markup_percent = 0
-        try: install_qty = float(self.install_qty_entry.get() or 0)
-        except ValueError: install_qty = 0
-        try: install_unit_cost = float(self.install_cost_entry.get() or 0)
-        except ValueError: install_unit_cost = 0
-        install_total = install_qty * install_unit_cost
-        try: misc_charge = float(self.misc_entry.get() or 0)
-        except ValueError: misc_charge = 0
-        conn = db_connect(); cursor = conn.cursor(); date_str = datetime.now().strftime('%Y-%m-%d %H:%M')
-        subtotal = sum(item['total'] for item in self.line_items); markup_amount = subtotal * (markup_percent / 100)
-        grand_total = subtotal + markup_amount + install_total + misc_charge
+        date_str = datetime.now().strftime('%Y-%m-%d %H:%M')
+        # Saved totals use an exact sum rather than the running subtotal
+        totals = self.read_totals(sum(item['total'] for item in self.line_items))
+        status = self.status_menu.get().lower()
         
-        if self.current_job_id is None:
-            cursor.execute("""INSERT INTO estimate_jobs (customer_id, job_name, estimate_date, total_amount, install_total, markup_percent, misc_charge, install_qty, install_unit_price) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                           (self.selected_customer_id, job_name, date_str, grand_total, install_total, markup_percent, misc_charge, install_qty, install_unit_cost)); self.current_job_id = cursor.lastrowid
-        else:
-            cursor.execute("""UPDATE estimate_jobs SET job_name=?, estimate_date=?, total_amount=?, install_total=?, markup_percent=?, misc_charge=?, install_qty=?, install_unit_price=? WHERE job_id=?""",
-                           (job_name, date_str, grand_total, install_total, markup_percent, misc_charge, install_qty, install_unit_cost, self.current_job_id))
-            cursor.execute("DELETE FROM estimate_line_items WHERE job_id = ?", (self.current_job_id,))
-            
-        for item in self.line_items: cursor.execute("INSERT INTO estimate_line_items (job_id, item_name, category_name, quantity, unit_price, line_total) VALUES (?, ?, ?, ?, ?, ?)",
-                           (self.current_job_id, item['name'], item['category'], item['qty'], item['unit_price'], item['total']))
-        conn.commit(); conn.close()
+        previous_job_id = self.current_job_id
+        try:
+            with get_db().transaction() as cursor:
+                self.current_job_id = save_estimate_job(cursor, self.current_job_id, self.selected_customer_id, job_name, date_str, totals, status)
+                # Only lines that were added, changed, moved or removed since the last save are written
+                save_line_items(cursor, self.current_job_id, self.line_items)
+        except Exception as e:
+            # Rolled back: a new estimate's job row doesn't exist, so the next save must insert it again
+            self.current_job_id = previous_job_id
+            CustomMessageBox(self, title="Database Error", message=f"Could not save estimate: {e}").get_result(); return
         
         self.delete_button.pack(side="left", padx=(10, 0))
         
-        customer_name = self.customer_menu.get()
+        customer_name = self.customer_name()
         display_text = f"'{job_name}' for {customer_name}" if job_name else f"Estimate for {customer_name}"
         CustomMessageBox(self, title="Success", message=f"{display_text} has been saved successfully.").get_result()
 
 class CabinetEstimatorApp(ctk.CTk):
-    def __init__(self):
+    """
+    Starts in two stages: __init__ builds the window with empty menus, and the queries that fill
+    them run only once it has been mapped, so the window appears as early as possible.
+    """
+    def __init__(self, report_startup=False, profile_queries=False):
         super().__init__()
+        self.report_startup = report_startup; self._startup_finished = False
         setup_database()
+        profile = load_setting('db_profile', DEFAULT_PROFILE)
+        if profile in PROFILES: get_db().set_profile(profile)
+        self.apply_query_profiling(force=profile_queries)
+        # Started once the start-up data is loaded; start-up itself is covered by the startup timer
+        self.stall_watchdog = StallWatchdog(self, threshold_ms=get_settings().get_float('stall_threshold_ms', STALL_THRESHOLD_MS), log_dir=get_app_data_path())
+        STARTUP_TIMER.mark("database")
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         
         self.iconbitmap(resource_path("door_icon.ico"))
         self.title("Custom Cabinet Estimator"); self.geometry("950x800")
@@ -814,7 +1233,7 @@ class CabinetEstimatorApp(ctk.CTk):
         ctk.set_appearance_mode(initial_theme)
 
         self.grid_columnconfigure(1, weight=1); self.grid_rowconfigure(0, weight=1)
-        self.pricelist_window = None; self.estimate_manager_window = None; self.customer_manager_window = None; self.settings_window = None
+        self.pricelist_window = None; self.estimate_manager_window = None; self.customer_manager_window = None; self.settings_window = None; self.analytics_window = None
         
         self.left_panel = ctk.CTkFrame(self, fg_color="transparent")
         self.left_panel.grid(row=0, column=0, sticky="nsew", padx=20, pady=20)
@@ -829,6 +1248,9 @@ class CabinetEstimatorApp(ctk.CTk):
         self.manage_estimates_button = ctk.CTkButton(self.left_panel, text="Manage Estimates", command=self.open_estimate_manager)
         self.manage_estimates_button.pack(fill="x", padx=20, pady=5)
         
+        self.analytics_button = ctk.CTkButton(self.left_panel, text="Sales Analytics", command=self.open_analytics_window)
+        self.analytics_button.pack(fill="x", padx=20, pady=5)
+        
         self.bind("<Control-s>", lambda event: self.estimate_frame.save_estimate())
         self.bind("<Control-n>", lambda event: self.estimate_frame.clear_estimate())
         self.bind("<Control-p>", lambda event: self.generate_and_print_estimate())
@@ -841,15 +1263,53 @@ class CabinetEstimatorApp(ctk.CTk):
         
         self.estimate_frame = EstimateFrame(self)
         self.estimate_frame.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
+        get_settings().subscribe(self.on_settings_changed, keys=('theme', 'db_profile', 'query_profiling', 'slow_query_ms', 'stall_watchdog', 'stall_threshold_ms'))
+        STARTUP_TIMER.mark("window built")
+        self.bind("<Map>", self._on_first_map, add="+")
+
+    def _on_first_map(self, event):
+        if event.widget is not self or self._startup_finished: return
+        self._startup_finished = True; STARTUP_TIMER.mark("window shown")
+        # Let the first frame paint before the data queries run
+        self.update_idletasks(); self.after(0, self._load_startup_data)
+
+    def _load_startup_data(self):
+        self.estimate_frame.update_dropdowns()
+        STARTUP_TIMER.mark("data loaded")
+        # Build the search indexes while the user is still reading the screen, not on the first keystroke
+        if not self.report_startup: self.after_idle(get_item_index); self.after_idle(get_customer_index); self.apply_stall_watchdog()
+        try: STARTUP_TIMER.append_to_log(get_app_data_path())
+        except OSError as e: print(f"Could not write the startup log: {e}")
+        if self.report_startup:
+            print(STARTUP_TIMER.summary()); self.on_close()
+
+    def on_close(self):
+        self.stall_watchdog.stop(); close_db()
+        self.destroy()
 
     def toggle_theme(self, new_mode):
         """Sets the application theme based on the provided mode."""
         ctk.set_appearance_mode(new_mode)
         
-    def refresh_defaults_on_screen(self):
-        """Called from settings to update the main estimate screen with new defaults."""
-        if self.estimate_frame:
-            self.estimate_frame.clear_estimate()
+    def on_settings_changed(self, changed):
+        """Applies theme, database profile, query profiling and stall watchdog changes published by the settings store."""
+        if 'theme' in changed: self.toggle_theme(changed['theme'])
+        if changed.get('db_profile') in PROFILES: get_db().set_profile(changed['db_profile'])
+        if 'query_profiling' in changed or 'slow_query_ms' in changed: self.apply_query_profiling()
+        if 'stall_watchdog' in changed or 'stall_threshold_ms' in changed: self.apply_stall_watchdog()
+
+    def apply_query_profiling(self, force=False):
+        """Starts or stops the query profiler as set in the settings (or for this session only, if force is set)."""
+        settings = get_settings(); profiler = get_profiler(); was_enabled = profiler.enabled
+        profiler.configure(enabled=force or settings.get_bool('query_profiling', False), slow_ms=settings.get_float('slow_query_ms', SLOW_QUERY_MS))
+        # Only connections opened while profiling is on are instrumented, so the shared one is reopened on a switch
+        if profiler.enabled != was_enabled: get_db().close()
+
+    def apply_stall_watchdog(self):
+        """Starts or stops the stall watchdog as set in the settings (off by default)."""
+        settings = get_settings(); self.stall_watchdog.threshold_ms = settings.get_float('stall_threshold_ms', STALL_THRESHOLD_MS)
+        if settings.get_bool('stall_watchdog', False): self.stall_watchdog.start()
+        else: self.stall_watchdog.stop()
 
     def open_customer_manager(self):
         if self.customer_manager_window is None or not self.customer_manager_window.winfo_exists(): self.customer_manager_window = CustomerManagerWindow(self, estimate_frame=self.estimate_frame)
@@ -860,9 +1320,15 @@ class CabinetEstimatorApp(ctk.CTk):
         self.pricelist_window.focus()
         
     def open_estimate_manager(self):
+        # The manager grabs input while open, so estimates cannot change behind it; refocusing needs no reload.
         if self.estimate_manager_window is None or not self.estimate_manager_window.winfo_exists(): self.estimate_manager_window = EstimateManagerWindow(self, estimate_frame=self.estimate_frame)
-        else: self.estimate_manager_window.focus(); self.estimate_manager_window.refresh_estimates()
+        else: self.estimate_manager_window.focus()
         
+    def open_analytics_window(self):
+        # Opened fresh each time so it shows the latest totals; the summary tables make that a few small reads
+        if self.analytics_window is None or not self.analytics_window.winfo_exists(): self.analytics_window = AnalyticsWindow(self)
+        else: self.analytics_window.focus()
+
     def open_settings_window(self):
         if self.settings_window is None or not self.settings_window.winfo_exists():
             self.settings_window = SettingsWindow(self)
@@ -870,8 +1336,8 @@ class CabinetEstimatorApp(ctk.CTk):
     
     # --- MODIFICATION START ---
     def backup_database(self):
-        source_path = os.path.join(get_app_data_path(), 'database.db')
-        if not os.path.exists(source_path):
+        db = get_db()
+        if not os.path.exists(db.path):
             CustomMessageBox(self, title="Error", message="Database file not found.").get_result()
             return
         
@@ -884,7 +1350,7 @@ class CabinetEstimatorApp(ctk.CTk):
         
         if backup_path:
             try:
-                shutil.copy(source_path, backup_path)
+                db.backup_to(backup_path)
                 CustomMessageBox(self, title="Success", message=f"Database backed up successfully to:\n{backup_path}").get_result()
             except Exception as e:
                 CustomMessageBox(self, title="Error", message=f"Could not save backup: {e}").get_result()
@@ -907,9 +1373,10 @@ class CabinetEstimatorApp(ctk.CTk):
                 if self.customer_manager_window and self.customer_manager_window.winfo_exists(): self.customer_manager_window.destroy()
                 if self.settings_window and self.settings_window.winfo_exists(): self.settings_window.destroy()
                 
-                shutil.copy(backup_path, os.path.join(get_app_data_path(), 'database.db'))
-                
-                self.estimate_frame.update_dropdowns()
+                get_db().restore_from(backup_path)
+                setup_database() # Bring older backups up to the current schema
+                get_settings().reload()
+                get_catalog().reload()
                 
                 CustomMessageBox(self, title="Success", message="Database restored successfully. It's recommended to restart the application.").get_result()
             except Exception as e:
@@ -924,22 +1391,31 @@ class CabinetEstimatorApp(ctk.CTk):
             initialfile=f"pricelist_export_{datetime.now().strftime('%Y-%m-%d')}.csv"
         )
         if file_path:
-            try:
-                conn = db_connect()
-                cursor = conn.cursor()
-                query = """SELECT c.name, p.item_name, p.unit_price FROM pricelist p JOIN categories c ON p.category_id = c.id ORDER BY c.sort_order, p.sort_order"""
-                cursor.execute(query)
-                items = cursor.fetchall()
-                conn.close()
-                
-                with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(['Category', 'ItemName', 'UnitPrice'])
-                    writer.writerows(items)
-                
-                CustomMessageBox(self, title="Success", message=f"Price list exported to:\n{file_path}").get_result()
-            except Exception as e:
-                CustomMessageBox(self, title="Error", message=f"Failed to export price list: {e}").get_result()
+            self.run_export("Exporting Price List", lambda progress, cancel_event: export_file("pricelist", file_path, progress=progress, cancel_event=cancel_event),
+                            lambda count: (f"Exported {count:,} price list items to:\n{file_path}", None))
+
+    def export_all_data(self):
+        output_dir = tkinter.filedialog.askdirectory(title="Choose a Folder for the Export")
+        if not output_dir: return
+        since = None; last_export = load_setting(LAST_EXPORT_SETTING)
+        if last_export:
+            changed_only = CustomMessageBox(self, title="Export Data", message=f"Export only the records changed since the last export ({last_export} UTC)?\n\nChoose No to export everything.", buttons=["Yes", "No"]).get_result()
+            since = last_export if changed_only else None
+        def on_done(report):
+            # The mark and the deletion log change together, as in the command-line export
+            with get_db().transaction() as cursor: record_export(cursor, report.exported_at)
+            get_settings().reload()
+            return report.summary(), "\n".join(report.files)
+        self.run_export("Exporting Data", lambda progress, cancel_event: export_data(output_dir, since=since, progress=progress, cancel_event=cancel_event), on_done)
+
+    def run_export(self, title, work, describe_result):
+        """Runs an export on a worker thread behind a ProgressDialog; describe_result(result) returns (message, details)."""
+        dialog = ProgressDialog(self, title=title, message="Starting export...")
+        def on_done(result): dialog.show_result(*describe_result(result))
+        def on_error(error): dialog.destroy(); CustomMessageBox(self, title="Error", message=f"Export failed: {error}").get_result()
+        def on_cancelled(): dialog.destroy(); CustomMessageBox(self, title="Export Cancelled", message="The export was cancelled; no files were written.").get_result()
+        task = BackgroundTask(self, work, on_progress=dialog.update_progress, on_done=on_done, on_error=on_error, on_cancelled=on_cancelled)
+        dialog.on_cancel = task.cancel; task.start()
 
     def import_pricelist_csv(self):
         confirm = CustomMessageBox(self, title="Confirm Import", 
@@ -952,149 +1428,52 @@ class CabinetEstimatorApp(ctk.CTk):
             filetypes=[("CSV Files", "*.csv")],
             title="Select CSV File to Import"
         )
-        if file_path:
-            conn = db_connect()
-            cursor = conn.cursor()
-            try:
-                with open(file_path, 'r', newline='', encoding='utf-8') as f:
-                    reader = csv.reader(f)
-                    header = next(reader)
-                    
-                    cursor.execute("BEGIN TRANSACTION")
-                    cursor.execute("DELETE FROM pricelist")
-                    
-                    categories_cache = {name: cat_id for cat_id, name in cursor.execute("SELECT id, name FROM categories").fetchall()}
-                    
-                    for row in reader:
-                        cat_name, item_name, unit_price = row
-                        
-                        if cat_name not in categories_cache:
-                            cursor.execute("INSERT INTO categories (name, sort_order) VALUES (?, (SELECT IFNULL(MAX(sort_order), 0) + 1 FROM categories))", (cat_name,))
-                            categories_cache[cat_name] = cursor.lastrowid
-                        
-                        cat_id = categories_cache[cat_name]
-                        cursor.execute("INSERT INTO pricelist (category_id, item_name, unit_price, sort_order) VALUES (?, ?, ?, (SELECT IFNULL(MAX(sort_order), 0) + 1 FROM pricelist WHERE category_id = ?))",
-                                       (cat_id, item_name, float(unit_price), cat_id))
-                
-                conn.commit()
-                CustomMessageBox(self, title="Success", message="Price list imported successfully.").get_result()
-            except Exception as e:
-                conn.rollback()
-                CustomMessageBox(self, title="Error", message=f"Failed to import price list: {e}").get_result()
-            finally:
-                conn.close()
-                self.estimate_frame.update_dropdowns()
-                
+        if not file_path: return
+        dialog = ProgressDialog(self, title="Importing Price List", message="Reading price list...")
+        def on_done(report):
+            self.refresh_pricelist_views()
+            dialog.show_result(report.summary(), report.error_text() or None, save_title="Save Import Report As...", save_name=f"pricelist_import_report_{datetime.now().strftime('%Y-%m-%d')}.txt")
+        def on_error(error):
+            dialog.destroy(); CustomMessageBox(self, title="Error", message=f"Failed to import price list: {error}").get_result()
+        def on_cancelled():
+            dialog.destroy(); CustomMessageBox(self, title="Import Cancelled", message="The import was cancelled. Your price list was not changed.").get_result()
+        task = BackgroundTask(self, lambda progress, cancel_event: import_pricelist(file_path, progress=progress, cancel_event=cancel_event),
+                              on_progress=dialog.update_progress, on_done=on_done, on_error=on_error, on_cancelled=on_cancelled)
+        dialog.on_cancel = task.cancel; task.start()
+
+    def refresh_pricelist_views(self):
+        """Reloads the catalog once an import has committed; every open view follows its change event."""
+        get_catalog().reload()
+
     def show_about_dialog(self):
+        shown = [run["window shown"] for run in read_startup_log(get_app_data_path()) if "window shown" in run]
+        startup_text = f"\n\nWindow shown {STARTUP_TIMER.elapsed('window shown') or 0:,.0f} ms after launch"
+        if len(shown) > 1: startup_text += f" (median of the last {len(shown)} starts: {sorted(shown)[len(shown) // 2]:,.0f} ms)"
         CustomMessageBox(self, title="About", 
-                         message="Custom Cabinet Estimator\n\nVersion: 1.0\nCreated with CustomTkinter.")
+                         message=f"Custom Cabinet Estimator\n\nVersion: 1.0\nCreated with CustomTkinter.{startup_text}")
 
     def generate_and_print_estimate(self):
-        estimate_frame = self.estimate_frame
-        cust_id = estimate_frame.selected_customer_id
-        if not cust_id:
+        snapshot = self.estimate_frame.make_snapshot()
+        if snapshot is None:
             CustomMessageBox(self, title="Error", message="Please select a customer.").get_result()
             return
 
-        line_items = estimate_frame.line_items
-        subtotal = sum(item['total'] for item in line_items)
-        
-        try:
-            install_qty = float(estimate_frame.install_qty_entry.get() or 0)
-        except ValueError:
-            install_qty = 0
-        try:
-            install_unit_cost = float(estimate_frame.install_cost_entry.get() or 0)
-        except ValueError:
-            install_unit_cost = 0
-        install_total = install_qty * install_unit_cost
-            
-        try:
-            markup_percent = float(estimate_frame.markup_entry.get() or 0)
-        except ValueError:
-            markup_percent = 0
-            
-        markup_amount = subtotal * (markup_percent / 100)
-        
-        try:
-            misc_charge = float(estimate_frame.misc_entry.get() or 0)
-        except ValueError:
-            misc_charge = 0
-            
-        grand_total = subtotal + markup_amount + install_total + misc_charge
-
-        conn = db_connect()
-        cursor = conn.cursor()
-        cursor.execute("SELECT name, address, phone, email FROM customers WHERE id = ?", (cust_id,))
-        customer_info = cursor.fetchone()
-        conn.close()
-        
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-                pdf_filename = tmp_pdf.name
-            
-            pdf = FPDF()
-            pdf.add_page()
-            
-            pdf.set_font("Helvetica", 'B', 18)
-            pdf.cell(0, 10, 'Custom Cabinet Estimate', new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
-            pdf.ln(5)
-            
-            pdf.set_font("Helvetica", 'B', 12)
-            pdf.cell(0, 6, f"{customer_info[0]}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            pdf.set_font("Helvetica", '', 12)
-            
-            if customer_info[1]: 
-                pdf.cell(0, 6, f"{customer_info[1]}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            
-            if customer_info[2]:
-                pdf.cell(0, 6, f"{customer_info[2]}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            
-            pdf.cell(0, 6, f"{datetime.now().strftime('%m-%d-%Y')}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            pdf.ln(10)
-            
-            pdf.set_font('Helvetica', 'B', 12)
-            pdf.cell(95, 8, 'Item Description', border='B', align='L')
-            pdf.cell(25, 8, 'Quantity', border='B', align='C')
-            pdf.cell(35, 8, 'Unit Price', border='B', align='R')
-            pdf.cell(35, 8, 'Total Price', border='B', align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            pdf.ln(2)
-            
-            pdf.set_font('Helvetica', '', 12)
-            if line_items:
-                for item in line_items:
-                    pdf.cell(95, 8, item['name'], border=0, align='L')
-                    pdf.cell(25, 8, str(item['qty']), border=0, align='C')
-                    pdf.cell(35, 8, f"${item['unit_price']:.2f}", border=0, align='R')
-                    pdf.cell(35, 8, f"${item['total']:.2f}", border=0, align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            pdf.ln(2)
-            
-            pdf.set_font('Helvetica', 'B', 12)
-            pdf.cell(155, 8, 'Subtotal:', align='R')
-            pdf.cell(35, 8, f"${subtotal:,.2f}", align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            
-            pdf.set_font('Helvetica', '', 12)
-            if markup_amount > 0:
-                pdf.cell(155, 8, f'Markup ({markup_percent}%):', align='R')
-                pdf.cell(35, 8, f"${markup_amount:,.2f}", align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            if install_total > 0:
-                pdf.cell(155, 8, 'Installation:', align='R')
-                pdf.cell(35, 8, f"${install_total:,.2f}", align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-            if misc_charge != 0:
-                pdf.cell(155, 8, 'Misc:', align='R')
-                pdf.cell(35, 8, f"${misc_charge:,.2f}", align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-
-            pdf.set_font('Helvetica', 'B', 14)
-            pdf.cell(155, 10, 'Grand Total:', border='T', align='R')
-            pdf.cell(35, 10, f"${grand_total:,.2f}", border='T', align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
-
-            pdf.output(pdf_filename)
-            
-            PDFViewerWindow(self, pdf_path=pdf_filename)
-            
-        except Exception as e:
-            CustomMessageBox(self, title="Error", message=f"Failed to generate PDF for preview:\n{e}").get_result()
+        # The preview opens straight away; the document is laid out from the frozen snapshot on a worker thread
+        # and handed over as bytes, so nothing touches the disk unless the user saves or prints.
+        viewer = PDFViewerWindow(self)
+        def on_done(pdf_bytes):
+            if viewer.winfo_exists(): viewer.set_document(pdf_bytes)
+        def on_error(error):
+            if viewer.winfo_exists(): viewer.show_error(f"Failed to generate PDF for preview:\n{error}")
+        def work(progress, cancel_event):
+            pdf_bytes = render_estimate_pdf(snapshot, progress, cancel_event)
+            load_backend() # The preview's PyMuPDF import happens here rather than on the Tk thread
+            return pdf_bytes
+        task = BackgroundTask(self, work, on_progress=viewer.update_progress, on_done=on_done, on_error=on_error)
+        viewer.on_cancel = task.cancel; task.start()
 
 if __name__ == "__main__":
-    app = CabinetEstimatorApp()
+    # --startup-timing prints how long each start-up stage took and exits once the data is loaded;
+    # --profile-queries records query timings for this session (see Settings > Query Diagnostics)
+    app = CabinetEstimatorApp(report_startup="--startup-timing" in sys.argv[1:], profile_queries="--profile-queries" in sys.argv[1:])
     app.mainloop()
\ No newline at end of file
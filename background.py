@@ -0,0 +1,66 @@
+# background.py
+import queue
+import threading
+
+class TaskCancelled(Exception):
+    """Raised inside a worker when the user cancelled the task."""
+
+class BackgroundTask:
+    """
+    Runs work(progress, cancel_event) on a daemon thread and delivers its progress
+    and outcome back on the Tk thread by polling a queue with widget.after().
+
+    work may call progress(fraction, message) at any time and should check
+    cancel_event.is_set() (or raise TaskCancelled) to stop early. Callbacks:
+    on_progress(fraction, message), on_done(result), on_error(exception), on_cancelled().
+    """
+    def __init__(self, widget, work, on_progress=None, on_done=None, on_error=None, on_cancelled=None, poll_ms=100):
+        self.widget = widget; self.work = work; self.poll_ms = poll_ms
+        self.on_progress = on_progress; self.on_done = on_done; self.on_error = on_error; self.on_cancelled = on_cancelled
+        self.cancel_event = threading.Event()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.widget.after(self.poll_ms, self._poll)
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _progress(self, fraction, message=""):
+        self._queue.put(("progress", (fraction, message)))
+
+    def _run(self):
+        try:
+            result = self.work(self._progress, self.cancel_event)
+            self._queue.put(("cancelled", None) if self.cancel_event.is_set() and result is None else ("done", result))
+        except TaskCancelled:
+            self._queue.put(("cancelled", None))
+        except Exception as e:
+            self._queue.put(("error", e))
+
+    def _poll(self):
+        finished = False; latest_progress = None
+        try:
+            while True:
+                kind, payload = self._queue.get_nowait()
+                if kind == "progress": latest_progress = payload; continue
+                finished = True
+                if latest_progress and self.on_progress: self.on_progress(*latest_progress); latest_progress = None
+                if kind == "done" and self.on_done: self.on_done(payload)
+                elif kind == "error" and self.on_error: self.on_error(payload)
+                elif kind == "cancelled" and self.on_cancelled: self.on_cancelled()
+        except queue.Empty:
+            pass
+        # Only the newest progress update is worth drawing
+        if latest_progress and self.on_progress: self.on_progress(*latest_progress)
+        if not finished:
+            try: self.widget.after(self.poll_ms, self._poll)
+            except Exception: pass # The widget was destroyed; nobody is listening any more
@@ -0,0 +1,132 @@
+# batch_render.py
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from database import Database, get_db_path
+from estimate_pdf import make_snapshot, render_estimate_pdf
+from estimate_queries import build_estimate_filter, ESTIMATE_SORT_KEY
+from estimate_store import load_line_items
+from migrations import migrate
+from pricing import compute_totals, saved_install
+
+def select_job_ids(db, job_ids=None, date_from=None, date_to=None, customer=None, text=None):
+    """Returns the job ids to render, oldest first: the given ids, narrowed by any date, customer or name filters."""
+    where_sql, params = build_estimate_filter(db, text=text, customer=customer, date_from=date_from, date_to=date_to)
+    if job_ids:
+        where_sql += f" AND j.job_id IN ({', '.join('?' * len(job_ids))})"; params = list(params) + list(job_ids)
+    rows = db.query(f"SELECT j.job_id FROM estimate_jobs j JOIN customers c ON j.customer_id = c.id WHERE {where_sql} ORDER BY {ESTIMATE_SORT_KEY}, j.job_id", params)
+    return [row[0] for row in rows]
+
+def _printed_date(saved_date):
+    try: return datetime.strptime((saved_date or "")[:10], '%Y-%m-%d').strftime('%m-%d-%Y')
+    except ValueError: return None
+
+def load_snapshot(db, job_id, use_saved_date=False):
+    """
+    Builds the EstimateSnapshot a saved job would print with after Load Estimate, using the same
+    install fallback as EstimateFrame.load_estimate. The printed date is today's, as in the app,
+    unless use_saved_date is set. Returns (snapshot, customer_name, job_name) or None.
+    """
+    job = db.query_one("""SELECT c.name, c.address, c.phone, c.email, j.job_name, j.markup_percent, j.misc_charge, j.install_total, j.install_qty, j.install_unit_price, j.estimate_date
+                          FROM estimate_jobs j JOIN customers c ON j.customer_id = c.id WHERE j.job_id = ?""", (job_id,))
+    if job is None: return None
+    customer, (job_name, markup_percent, misc_charge, install_total, install_qty, install_unit_price, saved_date) = job[:4], job[4:]
+    estimate_date = _printed_date(saved_date) if use_saved_date else None
+    line_items = load_line_items(db, job_id)
+    totals = compute_totals(sum(item['total'] for item in line_items), markup_percent or 0.0,
+                            *saved_install(install_qty, install_unit_price, install_total), misc_charge or 0.0)
+    snapshot = make_snapshot(customer, line_items, totals, estimate_date)
+    return snapshot, customer[0], job_name
+
+def pdf_filename(job_id, customer_name, job_name):
+    label = re.sub(r'[^\w\- ]+', '', f"{customer_name} {job_name or ''}").strip().replace(' ', '_')[:80]
+    return f"Estimate_{job_id}_{label}.pdf" if label else f"Estimate_{job_id}.pdf"
+
+def _render_to_file(snapshot, file_path):
+    """Worker-process entry point: renders one snapshot and writes it. Returns the file size in bytes."""
+    pdf_bytes = render_estimate_pdf(snapshot)
+    with open(file_path, 'wb') as f: f.write(pdf_bytes)
+    return len(pdf_bytes)
+
+class BatchReport:
+    def __init__(self, workers):
+        self.workers = workers
+        self.files = []
+        self.errors = []  # (job_id, message)
+        self.bytes_written = 0
+        self.seconds = 0.0
+
+    def summary(self):
+        count = len(self.files); rate = count / self.seconds if self.seconds else 0.0
+        text = (f"Rendered {count:,} estimates ({self.bytes_written / 1024 / 1024:.1f} MB) in {self.seconds:.1f}s "
+                f"with {self.workers} worker processes: {rate:.1f} PDFs/s.")
+        if self.errors: text += f" {len(self.errors)} failed."
+        return text
+
+def render_jobs(db, job_ids, output_dir, workers=None, use_saved_dates=False, progress=None):
+    """
+    Renders each job to <output_dir>/Estimate_<id>_<customer>_<job>.pdf across a process pool.
+    Snapshots are read here, so the workers only lay out and write PDFs and never touch the database.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    report = BatchReport(workers); started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for job_id in job_ids:
+            loaded = load_snapshot(db, job_id, use_saved_dates)
+            if loaded is None: report.errors.append((job_id, "no such estimate")); continue
+            snapshot, customer_name, job_name = loaded
+            file_path = os.path.join(output_dir, pdf_filename(job_id, customer_name, job_name))
+            futures[executor.submit(_render_to_file, snapshot, file_path)] = (job_id, file_path)
+        for done, future in enumerate(as_completed(futures), 1):
+            job_id, file_path = futures[future]
+            try: report.bytes_written += future.result(); report.files.append(file_path)
+            except Exception as e: report.errors.append((job_id, str(e)))
+            if progress: progress(done, len(futures))
+    report.seconds = time.perf_counter() - started
+    return report
+
+def _parse_job_ids(value):
+    try: return [int(part) for part in value.replace(" ", "").split(",") if part]
+    except ValueError: raise argparse.ArgumentTypeError("job ids must be a comma separated list of numbers")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render saved estimates to PDF files in parallel.")
+    parser.add_argument("output_dir", help="directory the PDFs are written to")
+    parser.add_argument("--jobs", type=_parse_job_ids, help="comma separated job ids")
+    parser.add_argument("--from", dest="date_from", help="first estimate date to include (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="last estimate date to include (YYYY-MM-DD)")
+    parser.add_argument("--customer", help="customer name search, as in the Estimate Manager")
+    parser.add_argument("--search", help="job name search, as in the Estimate Manager")
+    parser.add_argument("--all", action="store_true", help="render every saved estimate")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--estimate-date", action="store_true", help="print each estimate's saved date instead of today's")
+    parser.add_argument("--db", default=None, help="database file (defaults to the application database)")
+    args = parser.parse_args(argv)
+    if not (args.all or args.jobs or args.date_from or args.date_to or args.customer or args.search):
+        parser.error("choose estimates with --jobs, --from/--to, --customer, --search or --all")
+
+    db = Database(args.db or get_db_path())
+    migrate(db)
+    job_ids = select_job_ids(db, args.jobs, args.date_from, args.date_to, args.customer, args.search)
+    skipped = sorted(set(args.jobs or ()) - set(job_ids))
+    if skipped: print(f"Skipping job ids not found or filtered out: {', '.join(map(str, skipped))}")
+    if not job_ids: print("No estimates match."); db.close(); return 0
+    print(f"Rendering {len(job_ids):,} estimates to {args.output_dir}...")
+    def progress(done, total):
+        if done % 50 == 0 or done == total: print(f"  {done:,} / {total:,}")
+    report = render_jobs(db, job_ids, args.output_dir, args.workers, args.estimate_date, progress)
+    db.close()
+    print(report.summary())
+    for job_id, message in report.errors: print(f"  job {job_id}: {message}")
+    return 1 if report.errors else 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support() # Needed for the process pool in a PyInstaller build
+    sys.exit(main())
@@ -0,0 +1,265 @@
+# benchmark.py
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from database import Database
+from migrations import migrate
+from catalog import Catalog
+from catalog_index import ItemSearchIndex, CustomerSearchIndex
+from estimate_queries import build_estimate_filter, fetch_estimate_page, page_cursor
+from estimate_store import load_estimate_job, load_line_items, save_estimate_job, save_line_items
+from exporter import export_data, export_file
+from pricelist_import import import_pricelist
+from batch_render import load_snapshot
+from estimate_pdf import render_estimate_pdf
+from pricing import compute_totals, saved_install, line_total
+from analytics import overall_totals, monthly_summary, customer_summary, category_summary
+
+BENCHMARK_REPEAT = 5
+BENCHMARK_SAMPLE = 20
+BENCHMARK_SEED = 1
+RESULTS_FORMAT = 1
+SCROLL_PAGES = 20
+
+class BenchContext:
+    """What the benchmarks run against: a working copy of the database, a scratch directory, and a fixed sample of estimates and customers."""
+    def __init__(self, db, work_dir, sample=BENCHMARK_SAMPLE, seed=BENCHMARK_SEED):
+        self.db = db
+        self.work_dir = work_dir
+        rng = random.Random(seed)
+        job_ids = [row[0] for row in db.query("SELECT job_id FROM estimate_jobs ORDER BY job_id")]
+        self.job_ids = rng.sample(job_ids, min(sample, len(job_ids)))
+        customers = db.query("SELECT name, phone FROM customers ORDER BY id")
+        self.customers = rng.sample(customers, min(sample, len(customers)))
+        items = db.query("SELECT item_name FROM pricelist ORDER BY id")
+        self.item_names = [row[0] for row in rng.sample(items, min(sample, len(items)))]
+        # Last names are shared by many customers, so these searches match a realistic number of estimates
+        self.search_words = sorted({name.split()[-1] for name, _ in self.customers if name.split()})
+
+    def path(self, name):
+        return os.path.join(self.work_dir, name)
+
+# Each benchmark is prepare(ctx) -> step. prepare is not timed; step is timed once per run and
+# returns how many operations it did (estimates loaded, keystrokes searched, ...) or None for one.
+
+def _bench_update_dropdowns(ctx):
+    def step():
+        catalog = Catalog(ctx.db); catalog.categories(); catalog.customers()
+    return step
+
+def _bench_search_index_build(ctx):
+    catalog = Catalog(ctx.db); catalog.categories()
+    def step():
+        ItemSearchIndex(catalog); CustomerSearchIndex(catalog)
+    return step
+
+def _bench_type_ahead(ctx):
+    catalog = Catalog(ctx.db); items = ItemSearchIndex(catalog); customers = CustomerSearchIndex(catalog)
+    # Every prefix of each name, as typed one key at a time
+    queries = [(items, name[:length]) for name in ctx.item_names for length in range(1, len(name) + 1)]
+    queries += [(customers, name[:length]) for name, _ in ctx.customers for length in range(1, len(name) + 1)]
+    def step():
+        for index, text in queries: index.search(text)
+        return len(queries)
+    return step
+
+def _bench_refresh_estimates(ctx):
+    def step():
+        where_sql, params = build_estimate_filter(ctx.db)
+        fetch_estimate_page(ctx.db, where_sql, params)
+    return step
+
+def _bench_search_estimates(ctx):
+    def step():
+        for word in ctx.search_words:
+            where_sql, params = build_estimate_filter(ctx.db, text=word)
+            fetch_estimate_page(ctx.db, where_sql, params)
+        return len(ctx.search_words)
+    return step
+
+def _bench_scroll_estimates(ctx):
+    where_sql, params = build_estimate_filter(ctx.db)
+    def step():
+        after = None
+        for _ in range(SCROLL_PAGES):
+            rows = fetch_estimate_page(ctx.db, where_sql, params, after=after); after = page_cursor(rows)
+            if after is None: break
+        return SCROLL_PAGES
+    return step
+
+def _bench_load_estimate(ctx):
+    def step():
+        for job_id in ctx.job_ids: load_estimate_job(ctx.db, job_id); load_line_items(ctx.db, job_id)
+        return len(ctx.job_ids)
+    return step
+
+def _bench_analytics(ctx):
+    def step():
+        overall_totals(ctx.db); monthly_summary(ctx.db); customer_summary(ctx.db); category_summary(ctx.db)
+    return step
+
+def _estimate_totals(job, line_items):
+    _, _, install_total, markup_percent, misc_charge, install_qty, install_unit_price, _ = job
+    return compute_totals(sum(item['total'] for item in line_items), markup_percent or 0.0, *saved_install(install_qty, install_unit_price, install_total), misc_charge or 0.0)
+
+def _bench_save_estimate(ctx):
+    def step():
+        # Load, change one quantity and move one line, then save: the usual edit of an existing estimate
+        for job_id in ctx.job_ids:
+            job = load_estimate_job(ctx.db, job_id); line_items = load_line_items(ctx.db, job_id)
+            item = line_items[0]; item['qty'] += 1; item['total'] = line_total(item['qty'], item['unit_price'])
+            if len(line_items) > 1: line_items.append(line_items.pop(0))
+            with ctx.db.transaction() as cursor:
+                save_estimate_job(cursor, job_id, job[0], job[1], datetime.now().strftime('%Y-%m-%d %H:%M'), _estimate_totals(job, line_items), job[7])
+                save_line_items(cursor, job_id, line_items)
+        return len(ctx.job_ids)
+    return step
+
+def _bench_save_new_estimate(ctx):
+    sources = [(load_estimate_job(ctx.db, job_id), load_line_items(ctx.db, job_id)) for job_id in ctx.job_ids]
+    def step():
+        # Saving a duplicated estimate: every line is an INSERT
+        for job, line_items in sources:
+            copies = [dict(item, item_id=None) for item in line_items]
+            with ctx.db.transaction() as cursor:
+                job_id = save_estimate_job(cursor, None, job[0], job[1], datetime.now().strftime('%Y-%m-%d %H:%M'), _estimate_totals(job, copies), "draft")
+                save_line_items(cursor, job_id, copies)
+        return len(sources)
+    return step
+
+def _bench_pricelist_export(ctx):
+    def step():
+        return export_file("pricelist", ctx.path("pricelist_export.csv"), db_path=ctx.db.path)
+    return step
+
+def _bench_export_all(ctx):
+    def step():
+        report = export_data(ctx.path("export"), db_path=ctx.db.path)
+        return sum(report.row_counts.values())
+    return step
+
+def _bench_pricelist_import(ctx):
+    csv_path = ctx.path("pricelist_import.csv"); export_file("pricelist", csv_path, db_path=ctx.db.path)
+    def step():
+        return import_pricelist(csv_path, db_path=ctx.db.path).rows_imported
+    return step
+
+def _bench_pdf(ctx):
+    render_estimate_pdf(load_snapshot(ctx.db, ctx.job_ids[0])[0]) # The first PDF imports fpdf2; that is a start-up cost, not this path's
+    def step():
+        for job_id in ctx.job_ids: render_estimate_pdf(load_snapshot(ctx.db, job_id)[0])
+        return len(ctx.job_ids)
+    return step
+
+# name -> (prepare, description). Benchmarks that write run last, so the read paths see the seeded data.
+BENCHMARKS = {
+    "update_dropdowns": (_bench_update_dropdowns, "load the in-memory catalog that fills the estimate menus"),
+    "search_index_build": (_bench_search_index_build, "build the item and customer type-ahead indexes"),
+    "type_ahead": (_bench_type_ahead, "item and customer picker searches, one per keystroke"),
+    "refresh_estimates": (_bench_refresh_estimates, "first page of the Estimate Manager, no filters"),
+    "search_estimates": (_bench_search_estimates, "first page of the Estimate Manager searching a customer name"),
+    "scroll_estimates": (_bench_scroll_estimates, f"{SCROLL_PAGES} further Estimate Manager pages"),
+    "load_estimate": (_bench_load_estimate, "load an estimate and its line items"),
+    "analytics": (_bench_analytics, "read the sales summaries behind the analytics window"),
+    "pdf": (_bench_pdf, "read a saved estimate and render its PDF"),
+    "pricelist_export": (_bench_pricelist_export, "export the price list to CSV"),
+    "export_all": (_bench_export_all, "export every dataset to CSV"),
+    "save_estimate": (_bench_save_estimate, "edit and re-save an existing estimate"),
+    "save_new_estimate": (_bench_save_new_estimate, "save a copy of an estimate as a new one"),
+    "pricelist_import": (_bench_pricelist_import, "import the price list CSV, re-linking every line item"),
+}
+
+def _git_commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+def describe_database(db):
+    counts = {table: db.query_one(f"SELECT COUNT(*) FROM {table}")[0] for table in ("customers", "categories", "pricelist", "estimate_jobs", "estimate_line_items")}
+    return {"path": os.path.abspath(db.path), "size_bytes": os.path.getsize(db.path), "counts": counts}
+
+def run_benchmarks(db_path, names=None, repeat=BENCHMARK_REPEAT, sample=BENCHMARK_SAMPLE, seed=BENCHMARK_SEED, progress=None):
+    """
+    Times each named benchmark `repeat` times against a scratch copy of db_path (which is never
+    modified) and returns the results as a JSON-ready dict, including the data set and environment.
+    """
+    names = list(names or BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown: raise ValueError(f"Unknown benchmark(s): {', '.join(unknown)}")
+    source = Database(db_path)
+    results = {"format": RESULTS_FORMAT, "started_at": datetime.now().isoformat(timespec='seconds'), "database": describe_database(source),
+               "environment": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "platform": platform.platform(),
+                               "cpu_count": os.cpu_count(), "commit": _git_commit()},
+               "settings": {"repeat": repeat, "sample": sample, "seed": seed}, "results": {}}
+    work_dir = tempfile.mkdtemp(prefix="estimator-benchmark-")
+    try:
+        source.backup_to(os.path.join(work_dir, "benchmark.db")); source.close()
+        db = Database(os.path.join(work_dir, "benchmark.db")); migrate(db)
+        ctx = BenchContext(db, work_dir, sample, seed)
+        for name in names:
+            prepare, description = BENCHMARKS[name]
+            step = prepare(ctx); runs = []; operations = None
+            for _ in range(repeat):
+                started = time.perf_counter(); operations = step(); runs.append((time.perf_counter() - started) * 1000)
+            median = statistics.median(runs)
+            result = {"description": description, "runs_ms": [round(ms, 3) for ms in runs], "min_ms": round(min(runs), 3), "median_ms": round(median, 3),
+                      "mean_ms": round(statistics.fmean(runs), 3), "max_ms": round(max(runs), 3), "operations": operations or 1,
+                      "median_ms_per_operation": round(median / (operations or 1), 4)}
+            results["results"][name] = result
+            if progress: progress(name, result)
+        db.close()
+    finally:
+        source.close(); shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def compare_results(previous, current):
+    """Lines comparing the median of each benchmark with an earlier run's."""
+    lines = []
+    if previous.get("database", {}).get("counts") != current["database"]["counts"]:
+        lines.append("Note: the earlier run used a database with different row counts.")
+    for name, result in current["results"].items():
+        old = previous.get("results", {}).get(name)
+        if old is None: lines.append(f"  {name:<20} {result['median_ms']:>10.1f} ms   (new)"); continue
+        change = (result['median_ms'] - old['median_ms']) / old['median_ms'] * 100 if old['median_ms'] else 0.0
+        lines.append(f"  {name:<20} {old['median_ms']:>10.1f} -> {result['median_ms']:>10.1f} ms  {change:+6.1f}%")
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the app's hot paths against a (seeded) database and write the results as JSON.")
+    parser.add_argument("db_path", help="database to measure, e.g. one made by seed_data.py; it is copied, never changed")
+    parser.add_argument("--out", help="results file (default: benchmark-<date>-<time>.json)")
+    parser.add_argument("--only", help=f"comma separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=BENCHMARK_REPEAT, help=f"timed runs per benchmark (default: {BENCHMARK_REPEAT})")
+    parser.add_argument("--sample", type=int, default=BENCHMARK_SAMPLE, help=f"estimates and customers per run (default: {BENCHMARK_SAMPLE})")
+    parser.add_argument("--seed", type=int, default=BENCHMARK_SEED, help="seed for picking the sample")
+    parser.add_argument("--compare", help="earlier results file to compare the medians with")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db_path): parser.error(f"{args.db_path} does not exist")
+    if args.repeat < 1 or args.sample < 1: parser.error("--repeat and --sample must be at least 1")
+    names = [name.strip() for name in args.only.split(",")] if args.only else None
+
+    def progress(name, result):
+        per_operation = f"  ({result['median_ms_per_operation']:.3f} ms x {result['operations']:,})" if result['operations'] > 1 else ""
+        print(f"  {name:<20} median {result['median_ms']:>10.1f} ms{per_operation}")
+    print(f"Benchmarking {args.db_path}...")
+    try: results = run_benchmarks(args.db_path, names, args.repeat, args.sample, args.seed, progress)
+    except ValueError as e: parser.error(str(e))
+    out_path = args.out or f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(out_path, 'w', encoding='utf-8') as f: json.dump(results, f, indent=2)
+    print(f"Results written to {out_path}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f: previous = json.load(f)
+        print(f"Compared with {args.compare}:"); print("\n".join(compare_results(previous, results)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+# catalog.py
+import bisect
+from collections import namedtuple
+from database import get_db
+from sort_keys import move_row, next_sort_key
+
+# Field order matches the rows search_index returns, so search results and catalog rows can share list widgets
+Customer = namedtuple("Customer", "id name phone email address")
+Category = namedtuple("Category", "id name")
+PriceItem = namedtuple("PriceItem", "id name price category_id category_name")
+
+# change.kind is "customer", "category", "item" or "all" (after reload()); change.action is "added",
+# "updated", "deleted", "moved" or "reloaded". row is the new row (the removed one for "deleted"), old the previous one.
+# Category changes can change items too: a rename renames their category_name and a delete moves them to Uncategorized.
+CatalogChange = namedtuple("CatalogChange", "kind action row old", defaults=(None, None))
+
+UNCATEGORIZED = "Uncategorized"
+
+def _customer_key(customer):
+    return (customer.name, customer.id) # Same order as ORDER BY name (binary collation)
+
+def _neighbour_ids(rows, index, to_index):
+    """The ids that will sit either side of rows[index] once it is moved to to_index (None at the ends)."""
+    if to_index > index: before, after = to_index, to_index + 1
+    else: before, after = to_index - 1, to_index
+    return (rows[before].id if before >= 0 else None), (rows[after].id if after < len(rows) else None)
+
+class Catalog:
+    """
+    Customers, categories and the price list, loaded once and kept in memory in display order.
+    Edits go straight through to SQLite, are applied to the in-memory copy, and are published
+    to subscribers as CatalogChange events, so no view has to re-query after a single change.
+    """
+    def __init__(self, db):
+        self._db = db
+        self._loaded = False
+        self._listeners = []
+
+    def _ensure_loaded(self):
+        if self._loaded: return
+        db = self._db
+        self._customers = {row[0]: Customer(*row) for row in db.query("SELECT id, name, phone, email, address FROM customers")}
+        self._customer_order = sorted(self._customers.values(), key=_customer_key)
+        self._categories = [Category(*row) for row in db.query("SELECT id, name FROM categories ORDER BY sort_order, id")]
+        names = {category.id: category.name for category in self._categories}
+        self._items = {}; self._items_by_category = {category.id: [] for category in self._categories}
+        for item_id, name, price, category_id in db.query("SELECT id, item_name, unit_price, category_id FROM pricelist ORDER BY category_id, sort_order, id"):
+            if category_id not in names: continue
+            item = self._items[item_id] = PriceItem(item_id, name, price, category_id, names[category_id])
+            self._items_by_category[category_id].append(item)
+        self._loaded = True
+
+    def reload(self):
+        """Re-reads everything (e.g. after a price list import or a database restore) and notifies every subscriber."""
+        self._loaded = False; self._ensure_loaded()
+        self._notify(CatalogChange("all", "reloaded"))
+
+    def subscribe(self, callback, kinds=None):
+        """Calls callback(change) for changes of the given kinds (or all kinds, if None). Returns an unsubscribe function."""
+        listener = (callback, frozenset(kinds) | {"all"} if kinds else None)
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener) if listener in self._listeners else None
+
+    def _notify(self, change):
+        for callback, kinds in list(self._listeners):
+            if kinds is None or change.kind in kinds: callback(change)
+
+    # --- Reads ---
+    def customers(self):
+        self._ensure_loaded(); return list(self._customer_order)
+
+    def customer(self, customer_id):
+        self._ensure_loaded(); return self._customers.get(customer_id)
+
+    def customer_by_name(self, name):
+        self._ensure_loaded()
+        index = bisect.bisect_left(self._customer_order, (name,), key=lambda customer: (customer.name,))
+        if index < len(self._customer_order) and self._customer_order[index].name == name: return self._customer_order[index]
+        return None
+
+    def categories(self):
+        self._ensure_loaded(); return list(self._categories)
+
+    def category_by_name(self, name):
+        self._ensure_loaded()
+        return next((category for category in self._categories if category.name == name), None)
+
+    def items(self, category_id):
+        """The category's items in display order."""
+        self._ensure_loaded(); return list(self._items_by_category.get(category_id, ()))
+
+    def item(self, item_id):
+        self._ensure_loaded(); return self._items.get(item_id)
+
+    def find_item(self, category_name, item_name):
+        """The first item with this name in the named category, or None."""
+        category = self.category_by_name(category_name)
+        if category is None: return None
+        return next((item for item in self._items_by_category[category.id] if item.name == item_name), None)
+
+    # --- Customers ---
+    def save_customer(self, customer_id, name, address, phone, email):
+        """Adds a customer (customer_id None) or updates one. Returns the id."""
+        self._ensure_loaded()
+        with self._db.transaction() as cursor:
+            if customer_id: cursor.execute("UPDATE customers SET name=?, address=?, phone=?, email=? WHERE id=?", (name, address, phone, email, customer_id))
+            else: cursor.execute("INSERT INTO customers (name, address, phone, email) VALUES (?, ?, ?, ?)", (name, address, phone, email)); customer_id = cursor.lastrowid
+        old = self._customers.get(customer_id)
+        if old is not None: self._customer_order.remove(old)
+        customer = self._customers[customer_id] = Customer(customer_id, name, phone, email, address)
+        bisect.insort(self._customer_order, customer, key=_customer_key)
+        self._notify(CatalogChange("customer", "updated" if old else "added", customer, old))
+        return customer_id
+
+    def delete_customer(self, customer_id):
+        """Deletes a customer together with all of their estimates."""
+        self._ensure_loaded()
+        with self._db.transaction() as cursor:
+            cursor.execute("DELETE FROM estimate_jobs WHERE customer_id = ?", (customer_id,)); cursor.execute("DELETE FROM customers WHERE id = ?", (customer_id,))
+        customer = self._customers.pop(customer_id, None)
+        if customer is not None: self._customer_order.remove(customer); self._notify(CatalogChange("customer", "deleted", customer))
+
+    # --- Categories ---
+    def save_category(self, category_id, name):
+        """Adds a category at the end (category_id None) or renames one. Raises sqlite3.IntegrityError for a duplicate name."""
+        self._ensure_loaded()
+        with self._db.transaction() as cursor:
+            if category_id: cursor.execute("UPDATE categories SET name = ? WHERE id = ?", (name, category_id))
+            else: cursor.execute("INSERT INTO categories (name, sort_order) VALUES (?, ?)", (name, next_sort_key(cursor, "categories"))); category_id = cursor.lastrowid
+        category = Category(category_id, name); index = next((i for i, c in enumerate(self._categories) if c.id == category_id), None)
+        if index is None:
+            self._categories.append(category); self._items_by_category[category_id] = []
+            self._notify(CatalogChange("category", "added", category)); return category_id
+        old = self._categories[index]; self._categories[index] = category
+        # Items carry their category's name, so a rename refreshes that category's items too
+        items = self._items_by_category[category_id]
+        for i, item in enumerate(items): items[i] = self._items[item.id] = item._replace(category_name=name)
+        self._notify(CatalogChange("category", "updated", category, old))
+        return category_id
+
+    def delete_category(self, category_id):
+        """Deletes a category; its items move to the end of 'Uncategorized'."""
+        self._ensure_loaded()
+        uncategorized = self.category_by_name(UNCATEGORIZED); category = next((c for c in self._categories if c.id == category_id), None)
+        if category is None or uncategorized is None or category.id == uncategorized.id: return
+        moved = self._items_by_category[category_id]
+        with self._db.transaction() as cursor:
+            first_key = next_sort_key(cursor, "pricelist", uncategorized.id)
+            cursor.executemany("UPDATE pricelist SET category_id = ?, sort_order = ? WHERE id = ?", [(uncategorized.id, first_key + i, item.id) for i, item in enumerate(moved)])
+            cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+        self._categories.remove(category); del self._items_by_category[category_id]
+        for item in moved:
+            item = self._items[item.id] = item._replace(category_id=uncategorized.id, category_name=uncategorized.name)
+            self._items_by_category[uncategorized.id].append(item)
+        self._notify(CatalogChange("category", "deleted", category))
+
+    def move_category(self, category_id, to_index):
+        """Moves a category to `to_index` in the display order, writing only its own sort key."""
+        self._ensure_loaded()
+        index = next((i for i, c in enumerate(self._categories) if c.id == category_id), None)
+        if index is None or not 0 <= to_index < len(self._categories) or to_index == index: return
+        prev_id, next_id = _neighbour_ids(self._categories, index, to_index)
+        with self._db.transaction() as cursor: move_row(cursor, "categories", category_id, prev_id, next_id)
+        category = self._categories.pop(index); self._categories.insert(to_index, category)
+        self._notify(CatalogChange("category", "moved", category))
+
+    # --- Price list items ---
+    def save_item(self, item_id, name, price, category_id):
+        """Adds an item at the end of its category (item_id None) or updates one; an item moved to another category goes to its end."""
+        self._ensure_loaded()
+        old = self._items.get(item_id) if item_id else None
+        with self._db.transaction() as cursor:
+            if old is None:
+                cursor.execute("INSERT INTO pricelist (item_name, unit_price, sort_order, category_id) VALUES (?, ?, ?, ?)", (name, price, next_sort_key(cursor, "pricelist", category_id), category_id)); item_id = cursor.lastrowid
+            elif old.category_id != category_id:
+                cursor.execute("UPDATE pricelist SET item_name = ?, unit_price = ?, category_id = ?, sort_order = ? WHERE id = ?", (name, price, category_id, next_sort_key(cursor, "pricelist", category_id), item_id))
+            else: cursor.execute("UPDATE pricelist SET item_name = ?, unit_price = ? WHERE id = ?", (name, price, item_id))
+        category = next(c for c in self._categories if c.id == category_id)
+        item = self._items[item_id] = PriceItem(item_id, name, price, category_id, category.name)
+        if old is not None and old.category_id == category_id:
+            items = self._items_by_category[category_id]; items[items.index(old)] = item
+        else:
+            if old is not None: self._items_by_category[old.category_id].remove(old)
+            self._items_by_category[category_id].append(item)
+        self._notify(CatalogChange("item", "updated" if old else "added", item, old))
+        return item_id
+
+    def delete_item(self, item_id):
+        self._ensure_loaded()
+        with self._db.transaction() as cursor:
+            cursor.execute("DELETE FROM pricelist WHERE id = ?", (item_id,))
+            # Estimates keep the item at its last price; the id must not match a later item
+            cursor.execute("UPDATE estimate_line_items SET pricelist_id = NULL WHERE pricelist_id = ?", (item_id,))
+        item = self._items.pop(item_id, None)
+        if item is not None: self._items_by_category[item.category_id].remove(item); self._notify(CatalogChange("item", "deleted", item))
+
+    def move_item(self, item_id, to_index):
+        """Moves an item to `to_index` within its category, writing only its own sort key."""
+        self._ensure_loaded()
+        item = self._items.get(item_id)
+        if item is None: return
+        items = self._items_by_category[item.category_id]; index = items.index(item)
+        if not 0 <= to_index < len(items) or to_index == index: return
+        prev_id, next_id = _neighbour_ids(items, index, to_index)
+        with self._db.transaction() as cursor: move_row(cursor, "pricelist", item_id, prev_id, next_id)
+        items.pop(index); items.insert(to_index, item)
+        self._notify(CatalogChange("item", "moved", item))
+
+_catalog = None
+
+def get_catalog():
+    """Returns the application-wide Catalog."""
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog(get_db())
+    return _catalog
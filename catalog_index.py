@@ -0,0 +1,148 @@
+# catalog_index.py
+import bisect
+import re
+from catalog import get_catalog
+
+ITEM_SEARCH_LIMIT = 12
+CUSTOMER_SEARCH_LIMIT = 12
+
+_WORD = re.compile(r"\w+")
+_PART = re.compile(r"[^\W\d_]+|\d+")
+
+def _index_tokens(text):
+    """Lower-cased words of a name plus their letter and digit runs, so 'B15' is found by 'b15' and by '15'."""
+    tokens = set()
+    for word in _WORD.findall(text.lower()):
+        tokens.add(word)
+        if not (word.isalpha() or word.isdigit()): tokens.update(_PART.findall(word))
+    return tokens
+
+def _customer_text(customer):
+    return f"{customer.name} {customer.phone or ''}" # A phone number is found by any of its digit groups
+
+class _TokenIndex:
+    """
+    A sorted list of (token, name, id) entries over catalog rows; a prefix lookup is a bisect plus a
+    short forward scan. text_of(row) is the text whose words are indexed (the row's name by default).
+    """
+    def __init__(self, items=(), tokens=None, text_of=lambda row: row.name):
+        tokens = tokens or {}; self._text_of = text_of
+        self._names = {item.id: item.name.lower() for item in items}
+        self._tokens = {item.id: tokens.get(item.id) or _index_tokens(text_of(item)) for item in items}  # id -> tokens
+        # " tok1 tok2 ...": " " + word in it is true when word starts one of the tokens, one C-level search per check
+        self._token_text = {item_id: " " + " ".join(item_tokens) for item_id, item_tokens in self._tokens.items()}
+        self._entries = sorted((token, self._names[item_id], item_id) for item_id, item_tokens in self._tokens.items() for token in item_tokens)
+
+    def add(self, item):
+        tokens = self._tokens[item.id] = _index_tokens(self._text_of(item)); name = self._names[item.id] = item.name.lower()
+        self._token_text[item.id] = " " + " ".join(tokens)
+        for token in tokens: bisect.insort(self._entries, (token, name, item.id))
+
+    def remove(self, item):
+        tokens = self._tokens.pop(item.id, ()); name = self._names.pop(item.id, None); self._token_text.pop(item.id, None)
+        for token in tokens:
+            index = bisect.bisect_left(self._entries, (token, name, item.id))
+            if index < len(self._entries) and self._entries[index] == (token, name, item.id): del self._entries[index]
+
+    def _prefix_range(self, word):
+        return bisect.bisect_left(self._entries, (word,)), bisect.bisect_left(self._entries, (word + "\uffff",))
+
+    def search(self, words, limit):
+        # Scan the narrowest (most selective) word's entries, already in (token, name) order, and check the others
+        ranges = {word: self._prefix_range(word) for word in set(words)}
+        scan = min(ranges, key=lambda word: ranges[word][1] - ranges[word][0])
+        needles = [" " + word for word in ranges if word != scan]
+        start, stop = ranges[scan]; token_text = self._token_text; found = []; seen = set()
+        for _, _, item_id in self._entries[start:stop]:
+            if item_id in seen: continue
+            seen.add(item_id)
+            text = token_text[item_id]
+            if all(needle in text for needle in needles):
+                found.append(item_id)
+                if len(found) == limit: break
+        return found
+
+class ItemSearchIndex:
+    """
+    Prefix search over price list item names, for the type-ahead picker. Every word typed must be
+    the start of a word (or letter/digit run) of the name. There is one index for the whole price
+    list, plus one per category built the first time that category is searched. They follow
+    catalog change events, so an edit updates a few entries rather than rebuilding.
+    """
+    def __init__(self, catalog):
+        self._catalog = catalog
+        self._rebuild()
+        catalog.subscribe(self._on_catalog_changed, kinds=("category", "item"))
+
+    def _rebuild(self):
+        items = [item for category in self._catalog.categories() for item in self._catalog.items(category.id)]
+        self._all = _TokenIndex(items); self._by_category = {}
+
+    def _category_index(self, category_id):
+        index = self._by_category.get(category_id)
+        if index is None:
+            # Reuse the tokens already worked out for the whole-list index
+            index = self._by_category[category_id] = _TokenIndex(self._catalog.items(category_id), self._all._tokens)
+        return index
+
+    def _add(self, item):
+        self._all.add(item)
+        if item.category_id in self._by_category: self._by_category[item.category_id].add(item)
+
+    def _remove(self, item):
+        self._all.remove(item)
+        if item.category_id in self._by_category: self._by_category[item.category_id].remove(item)
+
+    def _on_catalog_changed(self, change):
+        if change.kind == "item":
+            if change.old is not None: self._remove(change.old)
+            if change.action == "deleted": self._remove(change.row)
+            elif change.action != "moved": self._add(change.row)
+        elif change.kind == "all" or change.action == "deleted":
+            self._rebuild() # A deleted category moves its items; both are rare
+
+    def search(self, text, category_id=None, limit=ITEM_SEARCH_LIMIT):
+        """The first `limit` items matching `text`, as catalog PriceItems ordered by matching word then name."""
+        words = _WORD.findall(text.lower())
+        if not words: return []
+        index = self._all if category_id is None else self._category_index(category_id)
+        return [self._catalog.item(item_id) for item_id in index.search(words, limit)]
+
+class CustomerSearchIndex:
+    """Prefix search over customer names and phone numbers for the customer picker, following catalog customer changes."""
+    def __init__(self, catalog):
+        self._catalog = catalog
+        self._rebuild()
+        catalog.subscribe(self._on_catalog_changed, kinds=("customer",))
+
+    def _rebuild(self):
+        self._index = _TokenIndex(self._catalog.customers(), text_of=_customer_text)
+
+    def _on_catalog_changed(self, change):
+        if change.kind == "all": self._rebuild(); return
+        if change.old is not None: self._index.remove(change.old)
+        if change.action == "deleted": self._index.remove(change.row)
+        else: self._index.add(change.row)
+
+    def search(self, text, limit=CUSTOMER_SEARCH_LIMIT):
+        """The first `limit` customers matching `text`, as catalog Customers ordered by matching word then name."""
+        words = _WORD.findall(text.lower())
+        if not words: return []
+        return [self._catalog.customer(customer_id) for customer_id in self._index.search(words, limit)]
+
+_item_index = None
+_customer_index = None
+
+def get_item_index():
+    """Returns the application-wide ItemSearchIndex over the catalog."""
+    global _item_index
+    if _item_index is None:
+        _item_index = ItemSearchIndex(get_catalog())
+    return _item_index
+
+def get_customer_index():
+    """Returns the application-wide CustomerSearchIndex over the catalog."""
+    global _customer_index
+    if _customer_index is None:
+        _customer_index = CustomerSearchIndex(get_catalog())
+    return _customer_index
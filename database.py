@@ -0,0 +1,166 @@
+# database.py
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from query_profiler import connection_factory
+
+DB_FILENAME = 'database.db'
+
+# PRAGMA profiles. A negative cache_size is in KiB; mmap_size is in bytes.
+PROFILES = {
+    "safe": {"synchronous": "FULL", "cache_size": -8000, "mmap_size": 0},
+    "balanced": {"synchronous": "NORMAL", "cache_size": -32000, "mmap_size": 64 * 1024 * 1024},
+    "fast": {"synchronous": "OFF", "cache_size": -128000, "mmap_size": 256 * 1024 * 1024},
+}
+DEFAULT_PROFILE = "balanced"
+
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.05
+# Change stamps (updated_at, deleted_at): UTC to the millisecond, so they compare correctly as text
+UTC_NOW_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+_app_data_dir = None
+_shared_db = None
+
+def get_app_data_path():
+    """Gets the path to a writable application data directory for the database."""
+    global _app_data_dir
+    if _app_data_dir is None:
+        home = os.path.expanduser("~")
+        _app_data_dir = os.path.join(home, ".CC-Estimator")
+        os.makedirs(_app_data_dir, exist_ok=True) # Ensure the directory exists
+    return _app_data_dir
+
+def get_db_path():
+    """Returns the full path of the application database file."""
+    return os.path.join(get_app_data_path(), DB_FILENAME)
+
+def _is_busy_error(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+def with_retry(func, *args, attempts=RETRY_ATTEMPTS):
+    """Calls func(*args), retrying with backoff while SQLite reports the database as busy."""
+    for attempt in range(attempts):
+        try:
+            return func(*args)
+        except sqlite3.OperationalError as e:
+            if not _is_busy_error(e) or attempt == attempts - 1:
+                raise
+            time.sleep(RETRY_BASE_DELAY * (2 ** attempt))
+
+def apply_profile(conn, profile=DEFAULT_PROFILE):
+    """Applies the synchronous/cache_size/mmap_size PRAGMAs of a named profile to a connection."""
+    settings = PROFILES.get(profile, PROFILES[DEFAULT_PROFILE])
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+
+def connect(path=None, profile=DEFAULT_PROFILE, check_same_thread=True):
+    """Opens a new connection with WAL journaling, a busy timeout and the given PRAGMA profile.
+
+    The Tk thread should use the shared connection from get_db(); this is for
+    background workers and scripts that need a connection of their own. While query
+    profiling is enabled the connection reports its statements to the profiler.
+    """
+    conn = sqlite3.connect(path or get_db_path(), timeout=BUSY_TIMEOUT_MS / 1000, factory=connection_factory(),
+                           cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=check_same_thread)
+    with_retry(conn.execute, "PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    apply_profile(conn, profile)
+    return conn
+
+class Database:
+    """A long-lived, lazily opened SQLite connection shared by the whole application."""
+    def __init__(self, path=None, profile=DEFAULT_PROFILE):
+        self.path = path or get_db_path()
+        self.profile = profile
+        self._conn = None
+        self._tx_depth = 0
+
+    @property
+    def connection(self):
+        if self._conn is None:
+            self._conn = connect(self.path, self.profile)
+        return self._conn
+
+    def set_profile(self, profile):
+        """Switches the PRAGMA profile of the open connection (and of any future reconnects)."""
+        if profile not in PROFILES: raise ValueError(f"Unknown database profile: {profile}")
+        self.profile = profile
+        if self._conn is not None: apply_profile(self._conn, profile)
+
+    def execute(self, sql, params=()):
+        return with_retry(self.connection.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return with_retry(self.connection.executemany, sql, seq_of_params)
+
+    def query(self, sql, params=()):
+        """Runs a SELECT and returns all rows."""
+        return self.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        """Runs a SELECT and returns the first row, or None."""
+        return self.execute(sql, params).fetchone()
+
+    @contextmanager
+    def transaction(self):
+        """Yields a cursor inside a write transaction that commits on success and rolls back on error.
+
+        Nested use becomes a SAVEPOINT so helpers can be composed freely. Raises sqlite3.ProgrammingError
+        if a statement outside transaction() left an implicit transaction open on the connection.
+        """
+        conn = self.connection
+        if self._tx_depth == 0:
+            # Committing it here would hide that caller's bug and split its writes from their transaction
+            if conn.in_transaction: raise sqlite3.ProgrammingError("a write outside Database.transaction() left a transaction open")
+            with_retry(conn.execute, "BEGIN IMMEDIATE")
+        else:
+            conn.execute(f"SAVEPOINT sp_{self._tx_depth}")
+        self._tx_depth += 1
+        try:
+            yield conn.cursor()
+        except BaseException:
+            self._tx_depth -= 1
+            if self._tx_depth == 0: conn.rollback()
+            else: conn.execute(f"ROLLBACK TO sp_{self._tx_depth}"); conn.execute(f"RELEASE sp_{self._tx_depth}")
+            raise
+        self._tx_depth -= 1
+        if self._tx_depth == 0: with_retry(conn.commit)
+        else: conn.execute(f"RELEASE sp_{self._tx_depth}")
+
+    def backup_to(self, target_path):
+        """Writes a consistent copy of the database (including un-checkpointed WAL pages) to target_path."""
+        target = sqlite3.connect(target_path)
+        try: self.connection.backup(target)
+        finally: target.close()
+
+    def restore_from(self, source_path):
+        """Replaces the live database contents with those of another database file."""
+        source = sqlite3.connect(source_path)
+        try: source.backup(self.connection)
+        finally: source.close()
+
+    def close(self):
+        if self._conn is not None:
+            try: self._conn.execute("PRAGMA optimize")
+            except sqlite3.Error: pass
+            self._conn.close(); self._conn = None
+            self._tx_depth = 0
+
+def get_db():
+    """Returns the application-wide shared Database."""
+    global _shared_db
+    if _shared_db is None:
+        _shared_db = Database()
+    return _shared_db
+
+def close_db():
+    global _shared_db
+    if _shared_db is not None:
+        _shared_db.close(); _shared_db = None
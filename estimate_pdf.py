@@ -0,0 +1,88 @@
+# estimate_pdf.py
+from collections import namedtuple
+from datetime import datetime
+from background import TaskCancelled
+
+# How many line items are laid out between progress reports and cancel checks
+PROGRESS_EVERY = 50
+
+EstimateLine = namedtuple("EstimateLine", "name qty unit_price total")
+EstimateSnapshot = namedtuple("EstimateSnapshot", [
+    "customer_name", "customer_address", "customer_phone", "estimate_date", "line_items",
+    "subtotal", "markup_percent", "markup_amount", "install_total", "misc_charge", "grand_total",
+])
+
+def make_snapshot(customer, line_items, totals, estimate_date=None):
+    """
+    Freezes everything the PDF needs into an immutable EstimateSnapshot, so it can be rendered
+    on another thread (or process) while the estimate keeps being edited.
+    `customer` is a (name, address, phone, ...) row, `line_items` are EstimateFrame-style dicts
+    and `totals` is the pricing.EstimateTotals they add up to.
+    """
+    lines = tuple(EstimateLine(item['name'], item['qty'], item['unit_price'], item['total']) for item in line_items)
+    return EstimateSnapshot(customer[0], customer[1], customer[2], estimate_date or datetime.now().strftime('%m-%d-%Y'), lines,
+                            totals.subtotal, totals.markup_percent, totals.markup_amount, totals.install_total, totals.misc_charge, totals.grand_total)
+
+def render_estimate_pdf(snapshot, progress=None, cancel_event=None):
+    """Lays out `snapshot` as the customer-facing estimate and returns the PDF as bytes. Safe to call off the Tk thread."""
+    # fpdf2 is the slowest import the app has, so it is only loaded once the first PDF is made
+    from fpdf import FPDF
+    from fpdf.enums import XPos, YPos
+    pdf = FPDF()
+    pdf.add_page()
+
+    pdf.set_font("Helvetica", 'B', 18)
+    pdf.cell(0, 10, 'Custom Cabinet Estimate', new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.ln(5)
+
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.cell(0, 6, f"{snapshot.customer_name}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font("Helvetica", '', 12)
+    if snapshot.customer_address:
+        pdf.cell(0, 6, f"{snapshot.customer_address}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    if snapshot.customer_phone:
+        pdf.cell(0, 6, f"{snapshot.customer_phone}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.cell(0, 6, f"{snapshot.estimate_date}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(10)
+
+    pdf.set_font('Helvetica', 'B', 12)
+    pdf.cell(95, 8, 'Item Description', border='B', align='L')
+    pdf.cell(25, 8, 'Quantity', border='B', align='C')
+    pdf.cell(35, 8, 'Unit Price', border='B', align='R')
+    pdf.cell(35, 8, 'Total Price', border='B', align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(2)
+
+    pdf.set_font('Helvetica', '', 12)
+    line_count = len(snapshot.line_items)
+    for index, line in enumerate(snapshot.line_items):
+        if index % PROGRESS_EVERY == 0:
+            if cancel_event is not None and cancel_event.is_set(): raise TaskCancelled()
+            if progress: progress(0.9 * index / line_count, f"Laying out line items ({index:,} of {line_count:,})...")
+        pdf.cell(95, 8, line.name, border=0, align='L')
+        pdf.cell(25, 8, str(line.qty), border=0, align='C')
+        pdf.cell(35, 8, f"${line.unit_price:.2f}", border=0, align='R')
+        pdf.cell(35, 8, f"${line.total:.2f}", border=0, align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(2)
+
+    pdf.set_font('Helvetica', 'B', 12)
+    pdf.cell(155, 8, 'Subtotal:', align='R')
+    pdf.cell(35, 8, f"${snapshot.subtotal:,.2f}", align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    pdf.set_font('Helvetica', '', 12)
+    if snapshot.markup_amount > 0:
+        pdf.cell(155, 8, f'Markup ({snapshot.markup_percent}%):', align='R')
+        pdf.cell(35, 8, f"${snapshot.markup_amount:,.2f}", align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    if snapshot.install_total > 0:
+        pdf.cell(155, 8, 'Installation:', align='R')
+        pdf.cell(35, 8, f"${snapshot.install_total:,.2f}", align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    if snapshot.misc_charge != 0:
+        pdf.cell(155, 8, 'Misc:', align='R')
+        pdf.cell(35, 8, f"${snapshot.misc_charge:,.2f}", align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    pdf.set_font('Helvetica', 'B', 14)
+    pdf.cell(155, 10, 'Grand Total:', border='T', align='R')
+    pdf.cell(35, 10, f"${snapshot.grand_total:,.2f}", border='T', align='R', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    if cancel_event is not None and cancel_event.is_set(): raise TaskCancelled()
+    if progress: progress(0.95, "Writing PDF...")
+    return bytes(pdf.output())
@@ -0,0 +1,54 @@
+# estimate_queries.py
+from datetime import datetime
+from search_index import estimate_match_clause, customer_match_clause
+
+ESTIMATE_PAGE_SIZE = 100
+
+ESTIMATE_LIST_COLUMNS = "j.job_id, c.name, j.estimate_date, j.total_amount, j.job_name, j.status"
+# Undated estimates sort as '' (after every date, newest first), so the keyset never compares against NULL.
+# Matches the idx_jobs_date_order expression index.
+ESTIMATE_SORT_KEY = "IFNULL(j.estimate_date, '')"
+
+def _parse_date(value):
+    try: return datetime.strptime(value.strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except (ValueError, AttributeError): return None
+
+def _parse_amount(value):
+    try: return float(value)
+    except (TypeError, ValueError): return None
+
+def build_estimate_filter(db, text=None, customer=None, date_from=None, date_to=None, min_total=None, max_total=None):
+    """
+    Builds a (where_sql, params) pair over estimate_jobs j JOIN customers c.
+    Blank or unparseable filter values are ignored. Dates are 'YYYY-MM-DD' and both ends are inclusive.
+    """
+    clauses, params = [], []
+    for clause, clause_params in (estimate_match_clause(db, text or ""), customer_match_clause(db, customer or "")):
+        if clause: clauses.append(clause); params.extend(clause_params)
+    start = _parse_date(date_from); end = _parse_date(date_to)
+    # Compared on the sort key so idx_jobs_date_order serves them; > '' keeps undated estimates out, as NULL did
+    if start: clauses.append(f"{ESTIMATE_SORT_KEY} >= ?"); params.append(start)
+    if end: clauses.append(f"{ESTIMATE_SORT_KEY} > '' AND {ESTIMATE_SORT_KEY} < date(?, '+1 day')"); params.append(end)
+    low = _parse_amount(min_total); high = _parse_amount(max_total)
+    if low is not None: clauses.append("j.total_amount >= ?"); params.append(low)
+    if high is not None: clauses.append("j.total_amount <= ?"); params.append(high)
+    return (" AND ".join(clauses) if clauses else "1"), params
+
+def fetch_estimate_page(db, where_sql="1", params=(), after=None, limit=ESTIMATE_PAGE_SIZE):
+    """
+    Returns up to `limit` (job_id, customer_name, date, total, job_name, status) rows, newest first.
+
+    Pagination is keyset-based on (estimate_date, job_id), undated estimates last: pass
+    page_cursor(rows) as `after` to fetch the next page without an OFFSET scan.
+    """
+    sql = f"SELECT {ESTIMATE_LIST_COLUMNS} FROM estimate_jobs j JOIN customers c ON j.customer_id = c.id WHERE {where_sql}"
+    params = list(params)
+    if after is not None:
+        # The plain bound lets SQLite seek the expression index; the row value alone would only scan it
+        sql += f" AND {ESTIMATE_SORT_KEY} <= ? AND ({ESTIMATE_SORT_KEY}, j.job_id) < (?, ?)"; params.extend((after[0], *after))
+    sql += f" ORDER BY {ESTIMATE_SORT_KEY} DESC, j.job_id DESC LIMIT ?"; params.append(limit)
+    return db.query(sql, params)
+
+def page_cursor(rows):
+    """Returns the keyset cursor for the page after `rows`, or None if `rows` is empty."""
+    return (rows[-1][2] or "", rows[-1][0]) if rows else None
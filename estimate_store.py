@@ -0,0 +1,124 @@
+# estimate_store.py
+import bisect
+from database import UTC_NOW_SQL
+
+# Columns compared when deciding whether a stored line item needs an UPDATE
+LINE_ITEM_FIELDS = (("name", "item_name"), ("category", "category_name"), ("qty", "quantity"), ("unit_price", "unit_price"), ("total", "line_total"), ("pricelist_id", "pricelist_id"))
+
+# Estimate statuses. Draft and open estimates follow price list changes (see repricing.py); closed ones keep their prices.
+ESTIMATE_STATUSES = ("draft", "open", "closed")
+REPRICEABLE_STATUSES = ("draft", "open")
+
+# Smallest gap allowed between neighbouring positions before the whole job is renumbered
+MIN_POSITION_GAP = 1e-6
+
+def load_line_items(db, job_id):
+    """Returns a job's line items, in order, as the dicts EstimateFrame works with (plus item_id and position)."""
+    rows = db.query("""SELECT item_id, item_name, category_name, quantity, unit_price, line_total, pricelist_id, position
+                       FROM estimate_line_items WHERE job_id = ? ORDER BY position, item_id""", (job_id,))
+    return [{"item_id": item_id, "name": name, "category": cat_name or "Write-in", "qty": qty, "unit_price": unit_p, "total": total_p, "pricelist_id": pricelist_id, "position": position}
+            for item_id, name, cat_name, qty, unit_p, total_p, pricelist_id, position in rows]
+
+def _longest_increasing_run(positions):
+    """Returns the indices of a longest strictly increasing subsequence of `positions`, skipping None entries."""
+    tails, tail_indices, parents = [], [], {}
+    for index, value in enumerate(positions):
+        if value is None: continue
+        slot = bisect.bisect_left(tails, value)
+        if slot == len(tails): tails.append(value); tail_indices.append(index)
+        else: tails[slot] = value; tail_indices[slot] = index
+        parents[index] = tail_indices[slot - 1] if slot > 0 else None
+    keep = set(); index = tail_indices[-1] if tail_indices else None
+    while index is not None: keep.add(index); index = parents[index]
+    return keep
+
+def assign_positions(stored_positions):
+    """
+    Given each item's stored position (None for new items), returns new positions that keep
+    as many stored values as possible and slot the rest in between their neighbours.
+    A move therefore rewrites one position, and a delete rewrites none.
+    """
+    keep = _longest_increasing_run(stored_positions)
+    positions = [stored_positions[i] if i in keep else None for i in range(len(stored_positions))]
+    index = 0
+    while index < len(positions):
+        if positions[index] is not None: index += 1; continue
+        run_end = index
+        while run_end < len(positions) and positions[run_end] is None: run_end += 1
+        before = positions[index - 1] if index > 0 else None; after = positions[run_end] if run_end < len(positions) else None
+        count = run_end - index
+        for offset in range(count):
+            if before is None and after is None: positions[index + offset] = float(offset)
+            elif after is None: positions[index + offset] = before + offset + 1
+            elif before is None: positions[index + offset] = after - (count - offset)
+            else: positions[index + offset] = before + (after - before) * (offset + 1) / (count + 1)
+        index = run_end
+    if any(b - a < MIN_POSITION_GAP for a, b in zip(positions, positions[1:])):
+        return [float(i) for i in range(len(positions))]
+    return positions
+
+def save_line_items(cursor, job_id, items):
+    """
+    Persists `items` for `job_id` by diffing against what is stored and applying only the needed
+    INSERTs, UPDATEs and DELETEs with executemany. Must run inside a write transaction.
+    Assigns item_id and position back onto the item dicts. Returns (inserted, updated, deleted) counts.
+    """
+    stored = {row[0]: row[1:] for row in cursor.execute(
+        "SELECT item_id, item_name, category_name, quantity, unit_price, line_total, pricelist_id, position FROM estimate_line_items WHERE job_id = ?", (job_id,))}
+    # Items loaded from another job (e.g. a duplicate) are treated as new
+    for item in items:
+        if item.get("item_id") not in stored: item["item_id"] = None
+    positions = assign_positions([stored[item["item_id"]][-1] if item["item_id"] is not None else None for item in items])
+
+    next_id = (cursor.execute("SELECT IFNULL(MAX(item_id), 0) FROM estimate_line_items").fetchone()[0]) + 1
+    inserts, updates = [], []
+    for item, position in zip(items, positions):
+        values = tuple(item.get(key) for key, _ in LINE_ITEM_FIELDS)
+        if item["item_id"] is None:
+            # The write transaction holds the lock, so ids can be allocated up front and executemany used for inserts too
+            item["item_id"] = next_id; next_id += 1
+            inserts.append((item["item_id"], job_id) + values + (position,))
+        elif stored[item["item_id"]] != values + (position,):
+            updates.append(values + (position, item["item_id"]))
+        item["position"] = position
+    current_ids = {item["item_id"] for item in items}
+    deletes = [(item_id,) for item_id in stored if item_id not in current_ids]
+
+    if deletes: cursor.executemany("DELETE FROM estimate_line_items WHERE item_id = ?", deletes)
+    if updates: cursor.executemany("UPDATE estimate_line_items SET item_name = ?, category_name = ?, quantity = ?, unit_price = ?, line_total = ?, pricelist_id = ?, position = ? WHERE item_id = ?", updates)
+    if inserts: cursor.executemany(f"INSERT INTO estimate_line_items (item_id, job_id, item_name, category_name, quantity, unit_price, line_total, pricelist_id, position, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, {UTC_NOW_SQL})", inserts)
+    return len(inserts), len(updates), len(deletes)
+
+def load_estimate_job(db, job_id):
+    """An estimate's saved header: (customer_id, job_name, install_total, markup_percent, misc_charge, install_qty, install_unit_price, status), or None."""
+    return db.query_one("SELECT customer_id, job_name, install_total, markup_percent, misc_charge, install_qty, install_unit_price, status FROM estimate_jobs WHERE job_id = ?", (job_id,))
+
+def save_estimate_job(cursor, job_id, customer_id, job_name, estimate_date, totals, status):
+    """
+    Inserts an estimate's estimate_jobs row (job_id None) or updates it from its pricing.EstimateTotals.
+    Must run inside a write transaction, together with save_line_items. Returns the job id.
+    """
+    values = (job_name, estimate_date, totals.grand_total, totals.install_total, totals.markup_percent, totals.misc_charge, totals.install_qty, totals.install_unit_price, status)
+    if job_id is None:
+        cursor.execute("""INSERT INTO estimate_jobs (job_name, estimate_date, total_amount, install_total, markup_percent, misc_charge, install_qty, install_unit_price, status, customer_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                       values + (customer_id,))
+        return cursor.lastrowid
+    cursor.execute("""UPDATE estimate_jobs SET job_name=?, estimate_date=?, total_amount=?, install_total=?, markup_percent=?, misc_charge=?, install_qty=?, install_unit_price=?, status=? WHERE job_id=?""",
+                   values + (job_id,))
+    return job_id
+
+def link_line_items(cursor):
+    """
+    Points every non-write-in line item at the price list row with the same category and name
+    (or NULL if there is none). Only rows whose link actually changes are written.
+    Needed after anything that renumbers price list ids, such as a CSV import.
+    """
+    cursor.execute("""
+        UPDATE estimate_line_items AS li SET pricelist_id = m.pricelist_id
+        FROM (SELECT l.item_id, MIN(p.id) AS pricelist_id FROM estimate_line_items l
+              LEFT JOIN categories c ON c.name = l.category_name
+              LEFT JOIN pricelist p ON p.category_id = c.id AND p.item_name = l.item_name
+              WHERE l.category_name IS NOT 'Write-in' GROUP BY l.item_id) AS m
+        WHERE li.item_id = m.item_id AND li.pricelist_id IS NOT m.pricelist_id
+    """)
+    return cursor.rowcount
@@ -0,0 +1,196 @@
+# exporter.py
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from background import TaskCancelled
+from database import Database, connect, get_db_path, with_retry, UTC_NOW_SQL
+from migrations import migrate
+
+EXPORT_BATCH_SIZE = 5000
+EXPORT_FORMATS = ("csv", "jsonl")
+LAST_EXPORT_SETTING = 'last_export_at'
+# How long an export waits for a running write transaction (e.g. a price list import) to finish before it starts
+EXPORT_LOCK_TIMEOUT_MS = 120000
+
+# name -> (SELECT list and FROM clause, column holding the change stamp, ORDER BY)
+# Every ORDER BY is served by an index, so rows stream straight from the cursor without a sort.
+# Incremental exports are ordered by the stamp instead, so its index finds the few changed rows.
+# Renaming a category or customer restamps the rows that show its name (migration 11).
+EXPORT_DATASETS = {
+    # The columns the price list import reads, so a full export can be imported again; Id matches the deleted dataset's row_id
+    "pricelist": ("""SELECT c.name AS Category, p.item_name AS ItemName, p.unit_price AS UnitPrice, p.id AS Id
+                     FROM pricelist p JOIN categories c ON p.category_id = c.id""", "p.updated_at", "c.sort_order, p.sort_order"),
+    "customers": ("""SELECT id, name, address, phone, email, updated_at FROM customers""", "updated_at", "name"),
+    "estimates": ("""SELECT j.job_id, j.customer_id, c.name AS customer_name, j.job_name, j.estimate_date, j.markup_percent, j.misc_charge,
+                            j.install_qty, j.install_unit_price, j.install_total, j.total_amount, j.status, j.updated_at
+                     FROM estimate_jobs j LEFT JOIN customers c ON j.customer_id = c.id""", "j.updated_at", "IFNULL(j.estimate_date, ''), j.job_id"),
+    "line_items": ("""SELECT item_id, job_id, position, category_name, item_name, quantity, unit_price, line_total, pricelist_id, updated_at
+                      FROM estimate_line_items""", "updated_at", "job_id, position"),
+    # Only meaningful for incremental exports: rows removed from the tables above
+    "deleted": ("""SELECT table_name, row_id, deleted_at FROM deleted_rows""", "deleted_at", "deleted_at"),
+}
+
+class ExportReport:
+    """What an export wrote: rows per dataset, the files, and the timestamp to pass as `since` next time."""
+    def __init__(self, since=None):
+        self.since = since
+        self.exported_at = None
+        self.row_counts = {}
+        self.files = []
+        self.seconds = 0.0
+
+    def summary(self):
+        total = sum(self.row_counts.values())
+        parts = ", ".join(f"{name}: {count:,}" for name, count in self.row_counts.items())
+        scope = f"changed since {self.since}" if self.since else "all rows"
+        return f"Exported {total:,} rows ({scope}) in {self.seconds:.1f}s.\n{parts}"
+
+def _dataset_query(name, since):
+    select_sql, stamp_column, order_sql = EXPORT_DATASETS[name]
+    if not since: return select_sql, order_sql, ()
+    return f"{select_sql} WHERE {stamp_column} >= ?", stamp_column, (since,)
+
+class _CsvWriter:
+    def __init__(self, f, columns):
+        self.writer = csv.writer(f); self.writer.writerow(columns)
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+class _JsonLinesWriter:
+    def __init__(self, f, columns):
+        self.f = f; self.columns = columns
+    def write_rows(self, rows):
+        columns = self.columns
+        self.f.write("".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows))
+
+_WRITERS = {"csv": _CsvWriter, "jsonl": _JsonLinesWriter}
+
+def export_dataset(conn, name, file_path, fmt="csv", since=None, batch_size=EXPORT_BATCH_SIZE, progress=None, cancel_event=None):
+    """
+    Streams one dataset to file_path, batch_size rows at a time, and returns the row count.
+    The file is written under a temporary name and only renamed into place once complete.
+    """
+    if fmt not in _WRITERS: raise ValueError(f"Unknown export format '{fmt}'; expected one of {', '.join(EXPORT_FORMATS)}")
+    base_sql, order_sql, params = _dataset_query(name, since)
+    total = conn.execute(f"SELECT COUNT(*) FROM ({base_sql})", params).fetchone()[0] if progress else 0
+    cursor = conn.execute(f"{base_sql} ORDER BY {order_sql}", params)
+    columns = [description[0] for description in cursor.description]
+    partial_path = file_path + ".part"; written = 0
+    try:
+        with open(partial_path, 'w', newline='', encoding='utf-8') as f:
+            writer = _WRITERS[fmt](f, columns)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows: break
+                writer.write_rows(rows); written += len(rows)
+                if cancel_event is not None and cancel_event.is_set(): raise TaskCancelled()
+                if progress: progress(written / max(total, 1), f"Exporting {name}: {written:,} of {total:,} rows...")
+        os.replace(partial_path, file_path)
+    except BaseException:
+        cursor.close()
+        if os.path.exists(partial_path): os.remove(partial_path)
+        raise
+    return written
+
+def _begin_snapshot(conn, db_path):
+    """
+    Starts a read snapshot on conn and returns the UTC time to export from next time.
+
+    Rows are stamped when they are written, not when their transaction commits, so a row written
+    by a transaction still open at the mark would be stamped before it yet missing from the
+    snapshot. The mark is therefore read, and the snapshot started, while a second connection
+    holds the write lock: no write transaction is open then, so every row stamped before the mark
+    is in the snapshot and every later one gets a stamp at or after it.
+    """
+    gate = connect(db_path)
+    try:
+        gate.execute(f"PRAGMA busy_timeout = {EXPORT_LOCK_TIMEOUT_MS}")
+        with_retry(gate.execute, "BEGIN IMMEDIATE")
+        exported_at = gate.execute(f"SELECT {UTC_NOW_SQL}").fetchone()[0]
+        conn.execute("BEGIN"); conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone() # The first read starts the snapshot
+        gate.rollback() # Writers may go on; the snapshot stays as it was
+    finally:
+        gate.close()
+    return exported_at
+
+def export_data(output_dir, datasets=None, fmt="csv", since=None, db_path=None, batch_size=EXPORT_BATCH_SIZE, progress=None, cancel_event=None):
+    """
+    Exports the named datasets (all of EXPORT_DATASETS by default) to <output_dir>/<name>.<fmt>.
+
+    All datasets are read from one snapshot on a connection of their own, so this is safe to run
+    on a worker thread while the app keeps writing (it waits for a write transaction that is open
+    when it starts). With `since`, only rows stamped at or after that UTC time are written; use the
+    returned report's exported_at as the next `since`.
+    """
+    datasets = list(datasets or EXPORT_DATASETS)
+    unknown = [name for name in datasets if name not in EXPORT_DATASETS]
+    if unknown: raise ValueError(f"Unknown export dataset(s): {', '.join(unknown)}")
+    os.makedirs(output_dir, exist_ok=True)
+    report = ExportReport(since); started = time.perf_counter()
+    conn = connect(db_path)
+    try:
+        report.exported_at = _begin_snapshot(conn, db_path)
+        for index, name in enumerate(datasets):
+            def dataset_progress(fraction, message, index=index):
+                progress((index + fraction) / len(datasets), message)
+            file_path = os.path.join(output_dir, f"{name}.{fmt}")
+            report.row_counts[name] = export_dataset(conn, name, file_path, fmt, since, batch_size, dataset_progress if progress else None, cancel_event)
+            report.files.append(file_path)
+        conn.rollback() # Read-only; just ends the snapshot
+    finally:
+        conn.close()
+    report.seconds = time.perf_counter() - started
+    return report
+
+def export_file(name, file_path, fmt="csv", since=None, db_path=None, progress=None, cancel_event=None):
+    """Exports a single dataset to file_path on a connection of its own. Returns the row count."""
+    if name not in EXPORT_DATASETS: raise ValueError(f"Unknown export dataset: {name}")
+    conn = connect(db_path)
+    try: return export_dataset(conn, name, file_path, fmt, since, progress=progress, cancel_event=cancel_event)
+    finally: conn.close()
+
+def _last_export_at(conn):
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (LAST_EXPORT_SETTING,)).fetchone()
+    return row[0] if row and row[0] else None
+
+def record_export(cursor, exported_at):
+    """Makes exported_at the mark `--changed` exports start from and prunes the deletions exported before it."""
+    cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (LAST_EXPORT_SETTING, exported_at))
+    prune_deleted_rows(cursor, exported_at)
+
+def prune_deleted_rows(cursor, exported_at):
+    """Drops deleted_rows entries older than the recorded export; incremental exports from that mark never read them."""
+    cursor.execute("DELETE FROM deleted_rows WHERE deleted_at < ?", (exported_at,))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Cabinet Estimator data to CSV or JSON Lines.")
+    parser.add_argument("output_dir", help="directory the <dataset>.<format> files are written to")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--datasets", help=f"comma separated subset of: {', '.join(EXPORT_DATASETS)}")
+    changes = parser.add_mutually_exclusive_group()
+    changes.add_argument("--since", help="only rows changed at or after this UTC time (YYYY-MM-DD[ HH:MM:SS])")
+    changes.add_argument("--changed", action="store_true", help="only rows changed since the last recorded export")
+    parser.add_argument("--db", default=None, help="database file (defaults to the application database)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    db = Database(args.db or get_db_path())
+    migrate(db) # Older databases need the updated_at columns before anything can be exported
+    since = args.since or (_last_export_at(db.connection) if args.changed else None)
+    datasets = [name.strip() for name in args.datasets.split(",")] if args.datasets else None
+    try:
+        report = export_data(args.output_dir, datasets, args.format, since, db.path, args.batch_size)
+    except ValueError as e:
+        db.close(); parser.error(str(e))
+    if datasets is None: # A partial export must not move the mark the other datasets are exported from
+        with db.transaction() as cursor: record_export(cursor, report.exported_at)
+    db.close()
+    print(report.summary())
+    for file_path in report.files: print(f"  {file_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
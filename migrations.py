@@ -0,0 +1,329 @@
+# migrations.py
+import sqlite3
+from database import UTC_NOW_SQL
+
+def _add_column_if_not_exists(cursor, table_name, column_name, column_type):
+    """Adds a column to a table if it doesn't already exist."""
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    columns = [info[1] for info in cursor.fetchall()]
+    if column_name not in columns:
+        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+
+def _migration_1_base_schema(cursor):
+    """Core tables. Written with IF NOT EXISTS so databases created before versioning (user_version 0) upgrade in place."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY, name TEXT NOT NULL, address TEXT, phone TEXT, email TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, sort_order INTEGER
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pricelist (
+            id INTEGER PRIMARY KEY, item_name TEXT NOT NULL, unit_price REAL NOT NULL, sort_order INTEGER,
+            category_id INTEGER, FOREIGN KEY (category_id) REFERENCES categories(id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estimate_jobs (
+            job_id INTEGER PRIMARY KEY, customer_id INTEGER, job_name TEXT, estimate_date TEXT, total_amount REAL,
+            install_total REAL, markup_percent REAL, misc_charge REAL,
+            FOREIGN KEY (customer_id) REFERENCES customers (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estimate_line_items (
+            item_id INTEGER PRIMARY KEY, job_id INTEGER, item_name TEXT, category_name TEXT, quantity INTEGER,
+            unit_price REAL, line_total REAL,
+            FOREIGN KEY (job_id) REFERENCES estimate_jobs (job_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY, value TEXT
+        )
+    """)
+    # Ensure 'Uncategorized' category exists
+    cursor.execute("INSERT OR IGNORE INTO categories (name, sort_order) VALUES ('Uncategorized', 9999)")
+    # Columns for saving individual install qty and price, added after the first release
+    _add_column_if_not_exists(cursor, "estimate_jobs", "install_qty", "REAL")
+    _add_column_if_not_exists(cursor, "estimate_jobs", "install_unit_price", "REAL")
+
+def _migration_2_search_index(cursor):
+    """
+    Full-text search tables for the customer, estimate and price list search boxes: external-content
+    FTS5 tables kept in sync by triggers, populated from their content tables. Skipped if this SQLite
+    build has no FTS5; search_index.py then falls back to LIKE.
+    """
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+        cursor.execute("DROP TABLE temp.fts5_probe")
+    except sqlite3.OperationalError:
+        return
+    # FTS5 table -> (content table, rowid column, indexed columns)
+    fts_tables = {
+        "customers_fts": ("customers", "id", ("name", "phone", "email", "address")),
+        "estimate_jobs_fts": ("estimate_jobs", "job_id", ("job_name",)),
+        "pricelist_fts": ("pricelist", "id", ("item_name",)),
+    }
+    for fts_name, (table, rowid, columns) in fts_tables.items():
+        exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_name,)).fetchone()
+        cols = ", ".join(columns)
+        new_vals = ", ".join(f"new.{c}" for c in columns); old_vals = ", ".join(f"old.{c}" for c in columns)
+        changed = " OR ".join(f"old.{c} IS NOT new.{c}" for c in columns)
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_name} USING fts5({cols}, content='{table}', content_rowid='{rowid}', prefix='2 3')")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts_name}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_name}(rowid, {cols}) VALUES (new.{rowid}, {new_vals}); END""")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts_name}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_name}({fts_name}, rowid, {cols}) VALUES ('delete', old.{rowid}, {old_vals}); END""")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts_name}_au AFTER UPDATE OF {cols} ON {table} WHEN {changed} BEGIN
+            INSERT INTO {fts_name}({fts_name}, rowid, {cols}) VALUES ('delete', old.{rowid}, {old_vals});
+            INSERT INTO {fts_name}(rowid, {cols}) VALUES (new.{rowid}, {new_vals}); END""")
+        if not exists: cursor.execute(f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')")
+
+def _migration_3_indexes(cursor):
+    """Indexes for the queries in app.py."""
+    # Loading, deleting and re-saving an estimate's line items
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_line_items_job ON estimate_line_items (job_id)")
+    # Deleting a customer's estimates
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_customer ON estimate_jobs (customer_id)")
+    # Estimate Manager keyset pagination: ORDER BY estimate_date DESC, job_id DESC
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_date ON estimate_jobs (estimate_date, job_id)")
+    # Price list per category in display order; covers the dropdown and export queries
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pricelist_category_order ON pricelist (category_id, sort_order, item_name, unit_price)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_categories_order ON categories (sort_order)")
+    # Customer lists and dropdowns ORDER BY name
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customers_name ON customers (name)")
+
+def _migration_4_line_item_positions(cursor):
+    """Stable ordering for line items so saves can diff against the stored rows instead of rewriting them."""
+    _add_column_if_not_exists(cursor, "estimate_line_items", "position", "REAL")
+    # Line items used to be re-inserted in display order on every save, so item_id order is the display order
+    cursor.execute("UPDATE estimate_line_items SET position = item_id WHERE position IS NULL")
+    cursor.execute("DROP INDEX IF EXISTS idx_line_items_job")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_line_items_job_position ON estimate_line_items (job_id, position)")
+
+# Tables that incremental exports track, with their primary key column
+CHANGE_TRACKED_TABLES = {"customers": "id", "pricelist": "id", "estimate_jobs": "job_id", "estimate_line_items": "item_id"}
+
+def _migration_5_change_tracking(cursor):
+    """updated_at stamps and a deletion log, so exports can be limited to rows changed since a given time."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS deleted_rows (
+            table_name TEXT NOT NULL, row_id INTEGER NOT NULL, deleted_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_deleted_rows_at ON deleted_rows (deleted_at)")
+    for table, key in CHANGE_TRACKED_TABLES.items():
+        # ALTER TABLE cannot add a column with a non-constant default, so triggers stamp the rows instead
+        _add_column_if_not_exists(cursor, table, "updated_at", "TEXT")
+        cursor.execute(f"UPDATE {table} SET updated_at = {UTC_NOW_SQL} WHERE updated_at IS NULL")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_updated ON {table} (updated_at)")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_stamp_insert AFTER INSERT ON {table} BEGIN
+            UPDATE {table} SET updated_at = {UTC_NOW_SQL} WHERE {key} = new.{key};
+        END""")
+        # The WHEN guard skips the trigger's own stamping UPDATE
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_stamp_update AFTER UPDATE ON {table} WHEN new.updated_at IS old.updated_at BEGIN
+            UPDATE {table} SET updated_at = {UTC_NOW_SQL} WHERE {key} = new.{key};
+        END""")
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_log_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO deleted_rows (table_name, row_id, deleted_at) VALUES ('{table}', old.{key}, {UTC_NOW_SQL});
+        END""")
+
+def _migration_6_estimate_status_and_price_links(cursor):
+    """Estimate status (draft/open/closed) and a link from each line item to the price list row it was picked from."""
+    # Estimates saved before statuses existed may still be pending, so they start out open (re-priceable)
+    _add_column_if_not_exists(cursor, "estimate_jobs", "status", "TEXT NOT NULL DEFAULT 'open'")
+    _add_column_if_not_exists(cursor, "estimate_line_items", "pricelist_id", "INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_line_items_pricelist ON estimate_line_items (pricelist_id)")
+    # Re-linking looks price list rows up by category and name
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pricelist_name ON pricelist (item_name, category_id)")
+    # Link existing line items by category and name; a copy of estimate_store.link_line_items() as it was when this shipped
+    cursor.execute("""
+        UPDATE estimate_line_items AS li SET pricelist_id = m.pricelist_id
+        FROM (SELECT l.item_id, MIN(p.id) AS pricelist_id FROM estimate_line_items l
+              LEFT JOIN categories c ON c.name = l.category_name
+              LEFT JOIN pricelist p ON p.category_id = c.id AND p.item_name = l.item_name
+              WHERE l.category_name IS NOT 'Write-in' GROUP BY l.item_id) AS m
+        WHERE li.item_id = m.item_id AND li.pricelist_id IS NOT m.pricelist_id
+    """)
+
+def _migration_7_fractional_sort_orders(cursor):
+    """
+    Categories and price list items are reordered by giving the moved row a key between its
+    neighbours (see sort_keys.py). The INTEGER columns keep fractional keys as REAL values, so only
+    the existing keys need normalizing: rows saved without a sort_order, or tied, get distinct ones.
+    """
+    # Renumber each list 1..n in its current order, ties broken by id; a copy of sort_keys.rebalance() as it was when this shipped
+    for table, partition_sql in (("categories", ""), ("pricelist", "PARTITION BY category_id ")):
+        cursor.execute(f"""
+            UPDATE {table} AS t SET sort_order = r.rank
+            FROM (SELECT id, ROW_NUMBER() OVER ({partition_sql}ORDER BY sort_order, id) AS rank FROM {table}) AS r
+            WHERE t.id = r.id AND t.sort_order IS NOT r.rank""")
+
+# Migration 8's trigger bodies. Frozen as shipped: a change to the summaries needs a new migration,
+# and analytics.rebuild_analytics() must stay in step with these.
+_M8_MONTH_SQL = "IFNULL(substr({row}.estimate_date, 1, 7), '')"
+_M8_WON_SQL = "({row}.status = 'closed')"
+
+def _m8_job_delta_sql(row, sign):
+    """Statements adding (sign 1) or removing (sign -1) one estimate_jobs row to the month and customer summaries."""
+    month = _M8_MONTH_SQL.format(row=row); won = _M8_WON_SQL.format(row=row); total = f"IFNULL({row}.total_amount, 0)"
+    values = f"{sign}, {sign} * {total}, {sign} * {won}, {sign} * IIF({won}, {total}, 0)"
+    return f"""
+        INSERT INTO analytics_monthly (month, estimates, quoted_total, won, won_total) VALUES ({month}, {values})
+        ON CONFLICT (month) DO UPDATE SET estimates = estimates + excluded.estimates, quoted_total = quoted_total + excluded.quoted_total,
+            won = won + excluded.won, won_total = won_total + excluded.won_total;
+        INSERT INTO analytics_customers (customer_id, estimates, quoted_total, won, won_total) VALUES (IFNULL({row}.customer_id, 0), {values})
+        ON CONFLICT (customer_id) DO UPDATE SET estimates = estimates + excluded.estimates, quoted_total = quoted_total + excluded.quoted_total,
+            won = won + excluded.won, won_total = won_total + excluded.won_total;
+        DELETE FROM analytics_monthly WHERE month = {month} AND estimates = 0;
+        DELETE FROM analytics_customers WHERE customer_id = IFNULL({row}.customer_id, 0) AND estimates = 0;"""
+
+def _m8_category_upsert_sql(select_sql):
+    return f"""
+        INSERT INTO analytics_categories (category_name, line_items, quantity, quoted_total, won_total) {select_sql}
+        ON CONFLICT (category_name) DO UPDATE SET line_items = line_items + excluded.line_items, quantity = quantity + excluded.quantity,
+            quoted_total = quoted_total + excluded.quoted_total, won_total = won_total + excluded.won_total;"""
+
+def _m8_job_lines_delta_sql(row, sign):
+    """Statements adding or removing all of an estimate's line items to the category summary, e.g. when the estimate itself comes or goes."""
+    won = _M8_WON_SQL.format(row=row)
+    select = f"""SELECT IFNULL(category_name, 'Write-in'), {sign} * COUNT(*), {sign} * TOTAL(quantity), {sign} * TOTAL(line_total), {sign} * IIF({won}, TOTAL(line_total), 0)
+        FROM estimate_line_items WHERE job_id = {row}.job_id GROUP BY 1"""
+    return _m8_category_upsert_sql(select) + f"\n        DELETE FROM analytics_categories WHERE line_items = 0 AND category_name IN (SELECT IFNULL(category_name, 'Write-in') FROM estimate_line_items WHERE job_id = {row}.job_id);"
+
+def _m8_line_delta_sql(row, sign):
+    """Statements adding or removing one line item to the category summary, if its estimate exists."""
+    category = f"IFNULL({row}.category_name, 'Write-in')"; total = f"IFNULL({row}.line_total, 0)"
+    select = f"""SELECT {category}, {sign}, {sign} * IFNULL({row}.quantity, 0), {sign} * {total}, {sign} * IIF(j.status = 'closed', {total}, 0)
+        FROM estimate_jobs j WHERE j.job_id = {row}.job_id"""
+    return _m8_category_upsert_sql(select) + f"\n        DELETE FROM analytics_categories WHERE category_name = {category} AND line_items = 0;"
+
+def _migration_8_analytics_summaries(cursor):
+    """Monthly, per-customer and per-category sales totals, kept current by triggers (see analytics.py)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_monthly (
+            month TEXT PRIMARY KEY, estimates INTEGER NOT NULL, quoted_total REAL NOT NULL, won INTEGER NOT NULL, won_total REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_customers (
+            customer_id INTEGER PRIMARY KEY, estimates INTEGER NOT NULL, quoted_total REAL NOT NULL, won INTEGER NOT NULL, won_total REAL NOT NULL
+        )
+    """)
+    # Top customers by won revenue
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_analytics_customers_won ON analytics_customers (won_total, quoted_total)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_categories (
+            category_name TEXT PRIMARY KEY, line_items INTEGER NOT NULL, quantity REAL NOT NULL, quoted_total REAL NOT NULL, won_total REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS analytics_job_insert AFTER INSERT ON estimate_jobs BEGIN
+        {_m8_job_delta_sql("new", 1)}
+        {_m8_job_lines_delta_sql("new", 1)}
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS analytics_job_delete AFTER DELETE ON estimate_jobs BEGIN
+        {_m8_job_delta_sql("old", -1)}
+        {_m8_job_lines_delta_sql("old", -1)}
+    END""")
+    # Re-saving an estimate rewrites every column; only changes that move a summary do any work
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS analytics_job_update AFTER UPDATE OF estimate_date, total_amount, status, customer_id ON estimate_jobs
+        WHEN old.estimate_date IS NOT new.estimate_date OR old.total_amount IS NOT new.total_amount OR old.status IS NOT new.status OR old.customer_id IS NOT new.customer_id BEGIN
+        {_m8_job_delta_sql("old", -1)}
+        {_m8_job_delta_sql("new", 1)}
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS analytics_job_status AFTER UPDATE OF status ON estimate_jobs
+        WHEN {_M8_WON_SQL.format(row="old")} IS NOT {_M8_WON_SQL.format(row="new")} BEGIN
+        {_m8_job_lines_delta_sql("old", -1)}
+        {_m8_job_lines_delta_sql("new", 1)}
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS analytics_line_insert AFTER INSERT ON estimate_line_items BEGIN
+        {_m8_line_delta_sql("new", 1)}
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS analytics_line_delete AFTER DELETE ON estimate_line_items BEGIN
+        {_m8_line_delta_sql("old", -1)}
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS analytics_line_update AFTER UPDATE OF job_id, category_name, quantity, line_total ON estimate_line_items
+        WHEN old.job_id IS NOT new.job_id OR old.category_name IS NOT new.category_name OR old.quantity IS NOT new.quantity OR old.line_total IS NOT new.line_total BEGIN
+        {_m8_line_delta_sql("old", -1)}
+        {_m8_line_delta_sql("new", 1)}
+    END""")
+    # Fill the summaries from the estimates already saved
+    for table in ("analytics_monthly", "analytics_customers", "analytics_categories"): cursor.execute(f"DELETE FROM {table}")
+    won = _M8_WON_SQL.format(row="j")
+    cursor.execute(f"""INSERT INTO analytics_monthly (month, estimates, quoted_total, won, won_total)
+        SELECT {_M8_MONTH_SQL.format(row="j")}, COUNT(*), TOTAL(j.total_amount), SUM({won}), TOTAL(IIF({won}, j.total_amount, 0)) FROM estimate_jobs j GROUP BY 1""")
+    cursor.execute(f"""INSERT INTO analytics_customers (customer_id, estimates, quoted_total, won, won_total)
+        SELECT IFNULL(j.customer_id, 0), COUNT(*), TOTAL(j.total_amount), SUM({won}), TOTAL(IIF({won}, j.total_amount, 0)) FROM estimate_jobs j GROUP BY 1""")
+    cursor.execute(f"""INSERT INTO analytics_categories (category_name, line_items, quantity, quoted_total, won_total)
+        SELECT IFNULL(l.category_name, 'Write-in'), COUNT(*), TOTAL(l.quantity), TOTAL(l.line_total), TOTAL(IIF({won}, l.line_total, 0))
+        FROM estimate_line_items l JOIN estimate_jobs j ON j.job_id = l.job_id GROUP BY 1""")
+
+def _migration_9_undated_estimate_order(cursor):
+    """Estimate Manager pages are ordered by IFNULL(estimate_date, ''), so undated estimates page like any other."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_date_order ON estimate_jobs (IFNULL(estimate_date, ''), job_id)")
+
+def _migration_10_stamp_only_unstamped_inserts(cursor):
+    """Bulk writers set updated_at in their INSERTs; the insert trigger now only stamps rows written without one."""
+    for table, key in CHANGE_TRACKED_TABLES.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_stamp_insert")
+        cursor.execute(f"""CREATE TRIGGER {table}_stamp_insert AFTER INSERT ON {table} WHEN new.updated_at IS NULL BEGIN
+            UPDATE {table} SET updated_at = {UTC_NOW_SQL} WHERE {key} = new.{key};
+        END""")
+
+def _migration_11_restamp_renamed_names(cursor):
+    """
+    Exports show each price list item's category name and each estimate's customer name, so renaming a
+    category or customer restamps the rows that show it and incremental exports send the new name.
+    """
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS categories_rename_restamp AFTER UPDATE OF name ON categories WHEN old.name IS NOT new.name BEGIN
+        UPDATE pricelist SET updated_at = {UTC_NOW_SQL} WHERE category_id = new.id;
+    END""")
+    cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS customers_rename_restamp AFTER UPDATE OF name ON customers WHEN old.name IS NOT new.name BEGIN
+        UPDATE estimate_jobs SET updated_at = {UTC_NOW_SQL} WHERE customer_id = new.id;
+    END""")
+
+def _migration_12_drop_plain_date_index(cursor):
+    """Every estimate_date query now uses IFNULL(estimate_date, ''), so idx_jobs_date_order (migration 9) replaces idx_jobs_date."""
+    cursor.execute("DROP INDEX IF EXISTS idx_jobs_date")
+
+# Append new migrations to the end; never edit or reorder one that has shipped.
+MIGRATIONS = [
+    _migration_1_base_schema,
+    _migration_2_search_index,
+    _migration_3_indexes,
+    _migration_4_line_item_positions,
+    _migration_5_change_tracking,
+    _migration_6_estimate_status_and_price_links,
+    _migration_7_fractional_sort_orders,
+    _migration_8_analytics_summaries,
+    _migration_9_undated_estimate_order,
+    _migration_10_stamp_only_unstamped_inserts,
+    _migration_11_restamp_renamed_names,
+    _migration_12_drop_plain_date_index,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_schema_version(db):
+    return db.query_one("PRAGMA user_version")[0]
+
+def migrate(db):
+    """
+    Brings the database up to SCHEMA_VERSION, tracked in PRAGMA user_version.
+    An up-to-date database costs a single integer check. Returns True if any migration ran.
+    """
+    version = get_schema_version(db)
+    if version >= SCHEMA_VERSION: return False
+    with db.transaction() as cursor:
+        for migration in MIGRATIONS[version:]:
+            migration(cursor)
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    # Refresh planner statistics once the new schema and indexes are in place.
+    db.execute("ANALYZE")
+    db.execute("PRAGMA optimize")
+    return True
@@ -0,0 +1,125 @@
+# pdf_pages.py
+import queue
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# PyMuPDF is imported by load_backend() on first use rather than at start-up. Pillow is not deferred:
+# customtkinter already imports it.
+fitz = None
+
+PIXMAP_CACHE_BYTES = 64 * 1024 * 1024
+# Placeholders are rendered at this fraction of the display width and scaled up until the full page arrives
+PREVIEW_SCALE = 0.25
+
+def load_backend():
+    """Imports PyMuPDF if that hasn't happened yet. Safe to call from a worker thread."""
+    global fitz
+    if fitz is None:
+        import fitz as pymupdf
+        fitz = pymupdf
+
+class PixmapCache:
+    """A least-recently-used cache of rendered page images keyed by (page, width), bounded by total pixel bytes."""
+    def __init__(self, max_bytes=PIXMAP_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._images = OrderedDict()
+
+    def get(self, key):
+        image = self._images.get(key)
+        if image is not None: self._images.move_to_end(key)
+        return image
+
+    def put(self, key, image):
+        if key in self._images: self.bytes -= self._size(self._images.pop(key))
+        self._images[key] = image; self.bytes += self._size(image)
+        # Never evict the image just added, even if it alone is over budget
+        while self.bytes > self.max_bytes and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False); self.bytes -= self._size(evicted)
+
+    def clear(self):
+        self._images.clear(); self.bytes = 0
+
+    @staticmethod
+    def _size(image):
+        return image.width * image.height * len(image.getbands())
+
+class PageRenderer:
+    """
+    Rasterizes the pages of one in-memory PDF on a worker thread that owns its own fitz document.
+
+    Call from the Tk thread only: request() returns a cached image or queues the render,
+    want() names the keys still worth rendering (anything else queued is skipped),
+    collect() moves finished renders into the cache and returns the keys that finished or
+    failed, and error() gives the reason a key failed to render.
+    """
+    def __init__(self, pdf_bytes, cache_bytes=PIXMAP_CACHE_BYTES):
+        self.pdf_bytes = pdf_bytes
+        self.cache = PixmapCache(cache_bytes)
+        load_backend()
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        self.page_sizes = [(page.rect.width, page.rect.height) for page in doc]
+        doc.close()
+        self._requests = queue.Queue(); self._results = queue.Queue()
+        self._pending = set(); self._failed = {}; self._wanted = frozenset()
+        self._thread = threading.Thread(target=self._run, daemon=True); self._thread.start()
+
+    @property
+    def page_count(self):
+        return len(self.page_sizes)
+
+    def page_height(self, page, width):
+        page_width, page_height = self.page_sizes[page]
+        return int(round(page_height * width / page_width))
+
+    def request(self, page, width):
+        key = (page, int(width))
+        image = self.cache.get(key)
+        if image is None and key not in self._pending and key not in self._failed:
+            self._pending.add(key); self._requests.put(key)
+        return image
+
+    def want(self, keys):
+        self._wanted = frozenset(keys) # Swapped as a whole, so the worker never sees a half-updated set
+
+    def collect(self):
+        ready = []
+        try:
+            while True:
+                key, image, error = self._results.get_nowait()
+                self._pending.discard(key)
+                if error: self._failed[key] = error; ready.append(key)
+                elif image is not None: self.cache.put(key, image); ready.append(key)
+        except queue.Empty:
+            pass
+        return ready
+
+    def error(self, key):
+        """Why the render of `key` failed, or None if it didn't."""
+        return self._failed.get(key)
+
+    @property
+    def busy(self):
+        return bool(self._pending)
+
+    def close(self):
+        self._requests.put(None)
+
+    def _run(self):
+        doc = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+        try:
+            while True:
+                key = self._requests.get()
+                if key is None: break
+                if key not in self._wanted: self._results.put((key, None, None)); continue # Scrolled away or re-zoomed meanwhile
+                page_num, width = key
+                try:
+                    page = doc.load_page(page_num); zoom = width / page.rect.width
+                    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                except Exception as e:
+                    self._results.put((key, None, str(e) or type(e).__name__)); continue
+                self._results.put((key, image, None))
+        finally:
+            doc.close()
@@ -0,0 +1,107 @@
+# pricelist_import.py
+import csv
+import math
+import os
+from background import TaskCancelled
+from database import connect, UTC_NOW_SQL
+from estimate_store import link_line_items
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+class ImportReport:
+    """Outcome of a price list import: counts plus the row-level problems that were skipped."""
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.categories_created = 0
+        self.errors = []  # (line_number, message)
+        self.error_count = 0
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS: self.errors.append((line_number, message))
+
+    def summary(self):
+        text = f"Imported {self.rows_imported:,} of {self.rows_read:,} rows"
+        if self.categories_created: text += f" ({self.categories_created} new categories)"
+        if self.error_count: text += f"; {self.error_count:,} rows skipped"
+        return text + "."
+
+    def error_text(self):
+        lines = [f"Line {line}: {message}" for line, message in self.errors]
+        if self.error_count > len(self.errors): lines.append(f"... and {self.error_count - len(self.errors):,} more")
+        return "\n".join(lines)
+
+def _parse_row(row):
+    """Validates one CSV row and returns (category, item_name, price) or raises ValueError with a readable reason."""
+    # A fourth column is the Id of an exported price list; rows get new ids on import, so it is ignored
+    if len(row) not in (3, 4): raise ValueError(f"expected 3 columns (Category, ItemName, UnitPrice) or 4 with Id, found {len(row)}")
+    cat_name, item_name, unit_price = (value.strip() for value in row[:3])
+    if not cat_name: raise ValueError("category is empty")
+    if not item_name: raise ValueError("item name is empty")
+    try: price = float(unit_price.replace("$", "").replace(",", ""))
+    except ValueError: raise ValueError(f"unit price '{unit_price}' is not a number")
+    if not math.isfinite(price) or price < 0: raise ValueError(f"unit price '{unit_price}' is out of range")
+    return cat_name, item_name, price
+
+def import_pricelist(file_path, db_path=None, progress=None, cancel_event=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Replaces the whole price list with the rows of a Category,ItemName,UnitPrice CSV file.
+
+    The file is streamed and inserted in executemany chunks inside one transaction on a
+    connection of its own, so it is safe to call from a worker thread. Sort orders are
+    counted in memory. Invalid rows are skipped and collected in the returned ImportReport.
+    Nothing is changed if the import is cancelled or no row is valid.
+    """
+    report = ImportReport()
+    total_bytes = max(os.path.getsize(file_path), 1); bytes_read = 0
+    conn = connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DELETE FROM pricelist")
+        categories = {name: cat_id for cat_id, name in cursor.execute("SELECT id, name FROM categories")}
+        next_category_order = (cursor.execute("SELECT IFNULL(MAX(sort_order), 0) FROM categories").fetchone()[0]) + 1
+        next_item_order = {}  # category_id -> next sort_order; the price list was just emptied, so every category starts at 1
+        batch = []
+
+        def flush():
+            cursor.executemany(f"INSERT INTO pricelist (category_id, item_name, unit_price, sort_order, updated_at) VALUES (?, ?, ?, ?, {UTC_NOW_SQL})", batch)
+            report.rows_imported += len(batch); batch.clear()
+            if progress: progress(min(bytes_read / total_bytes, 1.0), f"Imported {report.rows_imported:,} rows...")
+
+        with open(file_path, 'r', newline='', encoding='utf-8-sig') as f:
+            def counted_lines():
+                nonlocal bytes_read
+                for line in f:
+                    bytes_read += len(line); yield line
+            reader = csv.reader(counted_lines())
+            next(reader, None) # Header
+            for row in reader:
+                if not row or not any(value.strip() for value in row): continue
+                report.rows_read += 1
+                try: cat_name, item_name, price = _parse_row(row)
+                except ValueError as e: report.add_error(reader.line_num, str(e)); continue
+                cat_id = categories.get(cat_name)
+                if cat_id is None:
+                    cursor.execute("INSERT INTO categories (name, sort_order) VALUES (?, ?)", (cat_name, next_category_order))
+                    cat_id = categories[cat_name] = cursor.lastrowid; next_category_order += 1; report.categories_created += 1
+                sort_order = next_item_order.get(cat_id, 1); next_item_order[cat_id] = sort_order + 1
+                batch.append((cat_id, item_name, price, sort_order))
+                if len(batch) >= chunk_size:
+                    flush()
+                    if cancel_event is not None and cancel_event.is_set(): raise TaskCancelled()
+            if batch: flush()
+
+        if report.rows_imported == 0:
+            conn.rollback()
+            raise ValueError("The file contains no valid price list rows; the current price list was left unchanged.\n" + report.error_text())
+        link_line_items(cursor) # Every price list id was just renumbered
+        conn.commit()
+        return report
+    except BaseException:
+        if conn.in_transaction: conn.rollback()
+        raise
+    finally:
+        conn.close()
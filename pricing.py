@@ -0,0 +1,129 @@
+# pricing.py
+import argparse
+import sys
+import time
+from collections import namedtuple
+from database import Database, get_db_path
+from migrations import migrate
+
+# Stored totals within this of the recomputed value are treated as equal
+TOTAL_TOLERANCE = 0.005
+
+_numpy = None
+
+def _load_numpy():
+    """Returns the numpy module, or None if it isn't installed. Imported on first audit, not at start-up."""
+    global _numpy
+    if _numpy is None:
+        try: import numpy
+        except ImportError: numpy = False  # The bulk audit falls back to plain Python
+        _numpy = numpy
+    return _numpy or None
+
+EstimateTotals = namedtuple("EstimateTotals", "subtotal markup_percent markup_amount install_qty install_unit_price install_total misc_charge grand_total")
+
+def parse_amount(text):
+    """Parses a number typed into an entry; blank or invalid input counts as 0."""
+    try: return float(text or 0)
+    except (TypeError, ValueError): return 0.0
+
+def line_total(qty, unit_price):
+    return qty * unit_price
+
+def compute_totals(subtotal, markup_percent=0.0, install_qty=0.0, install_unit_price=0.0, misc_charge=0.0):
+    """The estimate total: line items plus markup on them, plus installation and the misc. charge."""
+    markup_amount = subtotal * (markup_percent / 100)
+    install_total = install_qty * install_unit_price
+    grand_total = subtotal + markup_amount + install_total + misc_charge
+    return EstimateTotals(subtotal, markup_percent, markup_amount, install_qty, install_unit_price, install_total, misc_charge, grand_total)
+
+def saved_install(install_qty, install_unit_price, install_total):
+    """(qty, unit price) for a saved job; older rows only stored the install total, which loads as 1 x total."""
+    if install_qty is not None and install_unit_price is not None and install_qty > 0: return install_qty, install_unit_price
+    if install_total and install_total > 0: return 1, install_total
+    return 0, 0
+
+def grand_total_sql(subtotal_sql, job="j"):
+    """compute_totals() and saved_install() as a SQL expression over an estimate_jobs row, for set-based updates."""
+    install = (f"CASE WHEN {job}.install_qty > 0 AND {job}.install_unit_price IS NOT NULL THEN {job}.install_qty * {job}.install_unit_price "
+               f"WHEN {job}.install_total > 0 THEN {job}.install_total ELSE 0 END")
+    return f"({subtotal_sql}) + ({subtotal_sql}) * (IFNULL({job}.markup_percent, 0) / 100.0) + {install} + IFNULL({job}.misc_charge, 0)"
+
+# --- Bulk audit ---
+
+AUDIT_QUERY = """
+    SELECT j.job_id, IFNULL(s.subtotal, 0), IFNULL(j.markup_percent, 0), IFNULL(j.install_qty, 0), j.install_unit_price IS NOT NULL,
+           IFNULL(j.install_unit_price, 0), IFNULL(j.install_total, 0), IFNULL(j.misc_charge, 0), IFNULL(j.total_amount, 0)
+    FROM estimate_jobs j LEFT JOIN (SELECT job_id, SUM(line_total) AS subtotal FROM estimate_line_items GROUP BY job_id) s ON s.job_id = j.job_id
+    ORDER BY j.job_id
+"""
+
+class AuditReport:
+    def __init__(self):
+        self.jobs_checked = 0
+        self.mismatches = []  # (job_id, stored_total, computed_total)
+        self.updated = 0
+        self.seconds = 0.0
+        self.engine = "python"
+
+    def summary(self):
+        text = f"Checked {self.jobs_checked:,} estimates in {self.seconds:.2f}s ({self.engine}): {len(self.mismatches):,} stored totals differ"
+        if self.updated: text += f", {self.updated:,} corrected"
+        return text + "."
+
+def _grand_totals_numpy(np, columns):
+    subtotal, markup, qty, has_unit, unit, legacy, misc = (np.asarray(column, dtype=float) for column in columns)
+    # Same rule as saved_install(), one column at a time
+    install = np.where((qty > 0) & (has_unit > 0), qty * unit, np.where(legacy > 0, legacy, 0.0))
+    return subtotal + subtotal * (markup / 100) + install + misc
+
+def _grand_totals_python(columns):
+    totals = []
+    for subtotal, markup, qty, has_unit, unit, legacy, misc in zip(*columns):
+        install_qty, install_unit_price = saved_install(qty, unit if has_unit else None, legacy)
+        totals.append(compute_totals(subtotal, markup, install_qty, install_unit_price, misc).grand_total)
+    return totals
+
+def audit_totals(db, fix=False, use_numpy=True):
+    """
+    Recomputes total_amount for every saved estimate from its line items in one pass: a single
+    grouped query loads the inputs as columns, and the totals are computed column-wise (with
+    NumPy when it is installed). With fix=True the differing rows are corrected with one executemany.
+    """
+    report = AuditReport(); started = time.perf_counter()
+    rows = db.query(AUDIT_QUERY)
+    report.jobs_checked = len(rows)
+    if rows:
+        job_ids, *inputs, stored = zip(*rows)
+        np = _load_numpy() if use_numpy else None
+        if np is not None:
+            report.engine = "numpy"
+            computed = _grand_totals_numpy(np, inputs); stored_array = np.asarray(stored, dtype=float)
+            differing = np.flatnonzero(np.abs(computed - stored_array) > TOTAL_TOLERANCE)
+            report.mismatches = [(job_ids[i], stored[i], float(computed[i])) for i in differing]
+        else:
+            computed = _grand_totals_python(inputs)
+            report.mismatches = [(job_id, old, new) for job_id, old, new in zip(job_ids, stored, computed) if abs(new - old) > TOTAL_TOLERANCE]
+    if fix and report.mismatches:
+        with db.transaction() as cursor:
+            cursor.executemany("UPDATE estimate_jobs SET total_amount = ? WHERE job_id = ?", [(new, job_id) for job_id, _, new in report.mismatches])
+        report.updated = len(report.mismatches)
+    report.seconds = time.perf_counter() - started
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check every saved estimate's total against its line items.")
+    parser.add_argument("--fix", action="store_true", help="write the recomputed totals back")
+    parser.add_argument("--python", action="store_true", help="use the plain Python engine even if NumPy is installed")
+    parser.add_argument("--db", default=None, help="database file (defaults to the application database)")
+    parser.add_argument("--show", type=int, default=20, help="how many differing estimates to list")
+    args = parser.parse_args(argv)
+    db = Database(args.db or get_db_path()); migrate(db)
+    report = audit_totals(db, fix=args.fix, use_numpy=not args.python)
+    db.close()
+    print(report.summary())
+    for job_id, old, new in report.mismatches[:args.show]: print(f"  job {job_id}: stored ${old:,.2f}, computed ${new:,.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+# query_profiler.py
+import itertools
+import json
+import os
+import platform
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+SLOW_QUERY_MS = 50.0
+SLOW_LOG_SIZE = 200
+# Upper bounds of the latency histogram buckets in ms; the last bucket takes everything slower
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+NORMALIZED_CACHE_SIZE = 2000
+
+# Frames from these files are the plumbing around a statement, not the code that asked for it
+_PLUMBING_FILES = frozenset({"database.py", "query_profiler.py", "contextlib.py"})
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN \(\?(?:, ?\?)+\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+_normalized = {}
+
+def normalize_sql(sql):
+    """The statement on one line with literals replaced by ? and IN lists collapsed, so each statement groups under one text."""
+    text = _normalized.get(sql)
+    if text is None:
+        if len(_normalized) >= NORMALIZED_CACHE_SIZE: _normalized.clear()
+        text = _normalized[sql] = _IN_LIST.sub("IN (?, ...)", _SPACE.sub(" ", _LITERAL.sub("?", sql)).strip())
+    return text
+
+def call_site():
+    """'file.py:line (function)' of the nearest caller outside the database plumbing."""
+    frame = sys._getframe(1)
+    while frame is not None and os.path.basename(frame.f_code.co_filename) in _PLUMBING_FILES: frame = frame.f_back
+    if frame is None: return "?"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+def _bucket(ms):
+    for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+        if ms <= bound: return index
+    return len(HISTOGRAM_BOUNDS_MS)
+
+def bucket_label(index):
+    return f"> {HISTOGRAM_BOUNDS_MS[-1]:g} ms" if index == len(HISTOGRAM_BOUNDS_MS) else f"<= {HISTOGRAM_BOUNDS_MS[index]:g} ms"
+
+def histogram_percentile(histogram, fraction):
+    """The upper bound (ms) of the bucket holding the given fraction of calls; None for an empty histogram."""
+    total = sum(histogram)
+    if not total: return None
+    needed = fraction * total; seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if seen >= needed: return HISTOGRAM_BOUNDS_MS[index] if index < len(HISTOGRAM_BOUNDS_MS) else float("inf")
+    return float("inf")
+
+class StatementStats:
+    """Totals for one normalized statement issued from one call site."""
+    def __init__(self, call_site, sql):
+        self.call_site = call_site
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.plan = None
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {"call_site": self.call_site, "sql": self.sql, "count": self.count, "rows": self.rows,
+                "total_ms": round(self.total_ms, 3), "mean_ms": round(self.mean_ms, 3), "max_ms": round(self.max_ms, 3),
+                "p50_ms": histogram_percentile(self.histogram, 0.5), "p95_ms": histogram_percentile(self.histogram, 0.95),
+                "histogram": list(self.histogram), "plan": self.plan}
+
+class QueryProfiler:
+    """
+    Collects per-statement latency, row counts and call sites while enabled, keeps a log of
+    statements slower than slow_ms and the EXPLAIN QUERY PLAN of each of them.
+
+    Only connections opened while profiling is enabled are instrumented (database.connect()
+    picks ProfiledConnection then), so it costs nothing while off. A statement's time is its
+    execute() plus any fetchone/fetchmany/fetchall of its rows; rows read by iterating the
+    cursor are not timed.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = SLOW_QUERY_MS
+        self._lock = threading.Lock()
+        self.reset()
+
+    def configure(self, enabled=None, slow_ms=None):
+        if enabled is not None: self.enabled = bool(enabled)
+        if slow_ms is not None and slow_ms > 0: self.slow_ms = float(slow_ms)
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._slow = deque(maxlen=SLOW_LOG_SIZE)
+            self.started_at = datetime.now()
+
+    def statements(self):
+        """Copies of the per-statement totals, slowest in total first."""
+        with self._lock: stats = [stat.as_dict() for stat in self._stats.values()]
+        return sorted(stats, key=lambda stat: stat["total_ms"], reverse=True)
+
+    def slow_queries(self):
+        """The slow-query log, newest first."""
+        with self._lock: return list(reversed(self._slow))
+
+    def histogram(self):
+        """Call counts per latency bucket over every statement."""
+        with self._lock: histograms = [stat.histogram for stat in self._stats.values()]
+        return [sum(counts) for counts in zip(*histograms)] if histograms else [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def export(self, path, extra=None):
+        """Writes everything collected so far, plus `extra` (e.g. database details), to a JSON file."""
+        report = {
+            "exported_at": datetime.now().isoformat(timespec="seconds"), "recording_since": self.started_at.isoformat(timespec="seconds"),
+            "enabled": self.enabled, "slow_query_ms": self.slow_ms,
+            "environment": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "platform": platform.platform()},
+            "histogram_bounds_ms": list(HISTOGRAM_BOUNDS_MS), "histogram": self.histogram(),
+            "statements": self.statements(), "slow_queries": self.slow_queries(),
+        }
+        if extra: report.update(extra)
+        with open(path, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+
+    # --- Recording, called by ProfilingCursor ---
+    def _record(self, cursor, sql, params, elapsed_ms, rows):
+        key = (call_site(), normalize_sql(sql))
+        with self._lock:
+            stat = self._stats.get(key)
+            if stat is None: stat = self._stats[key] = StatementStats(*key)
+            stat.count += 1; stat.total_ms += elapsed_ms; stat.rows += rows
+            stat.max_ms = max(stat.max_ms, elapsed_ms); stat.histogram[_bucket(elapsed_ms)] += 1
+        if elapsed_ms >= self.slow_ms: self._log_slow(cursor, stat, sql, params, elapsed_ms, rows)
+        return stat
+
+    def _record_fetch(self, cursor, stat, sql, params, before_ms, extra_ms, rows):
+        """Adds fetch time to the statement's last execution, moving it to its new latency bucket."""
+        after_ms = before_ms + extra_ms
+        with self._lock:
+            stat.total_ms += extra_ms; stat.rows += rows; stat.max_ms = max(stat.max_ms, after_ms)
+            old_bucket, new_bucket = _bucket(before_ms), _bucket(after_ms)
+            if old_bucket != new_bucket: stat.histogram[old_bucket] -= 1; stat.histogram[new_bucket] += 1
+        if after_ms >= self.slow_ms > before_ms: self._log_slow(cursor, stat, sql, params, after_ms, rows)
+
+    def _log_slow(self, cursor, stat, sql, params, elapsed_ms, rows):
+        if stat.plan is None: stat.plan = explain_query_plan(cursor.connection, sql, params)
+        entry = {"at": datetime.now().isoformat(timespec="milliseconds"), "ms": round(elapsed_ms, 3), "rows": rows,
+                 "call_site": stat.call_site, "sql": stat.sql, "thread": threading.current_thread().name, "plan": stat.plan}
+        with self._lock: self._slow.append(entry)
+
+def explain_query_plan(conn, sql, params=()):
+    """The EXPLAIN QUERY PLAN rows of a statement as indented lines; [] for statements that have no plan."""
+    if sql.lstrip().upper().startswith(("EXPLAIN", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "CREATE", "DROP", "ALTER", "VACUUM", "ANALYZE")): return []
+    try: rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except sqlite3.Error: return []
+    depth = {0: -1}; lines = []
+    for node_id, parent_id, _, detail in rows:
+        depth[node_id] = depth.get(parent_id, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+class ProfilingCursor(sqlite3.Cursor):
+    """A cursor that reports each statement it runs, and the fetches of its rows, to the profiler."""
+    _stat = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._executed(sql, parameters, started)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        # Only the first parameter set is kept, for the query plan of a slow statement
+        parameters = iter(seq_of_parameters); first = next(parameters, None)
+        started = time.perf_counter()
+        result = super().executemany(sql, parameters if first is None else itertools.chain((first,), parameters))
+        self._executed(sql, () if first is None else first, started)
+        return result
+
+    def _executed(self, sql, parameters, started):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not _profiler.enabled: self._stat = None; return
+        self._sql, self._parameters, self._elapsed_ms = sql, parameters, elapsed_ms
+        self._stat = _profiler._record(self, sql, parameters, elapsed_ms, max(self.rowcount, 0))
+
+    def _fetched(self, started, rows):
+        if self._stat is None or not _profiler.enabled: return
+        extra_ms = (time.perf_counter() - started) * 1000
+        _profiler._record_fetch(self, self._stat, self._sql, self._parameters, self._elapsed_ms, extra_ms, rows)
+        self._elapsed_ms += extra_ms
+
+    def fetchone(self):
+        started = time.perf_counter(); row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter(); rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter(); rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+class ProfiledConnection(sqlite3.Connection):
+    """A connection whose cursors, including the implicit ones of execute()/executemany(), are ProfilingCursors."""
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+_profiler = QueryProfiler()
+
+def get_profiler():
+    """Returns the application-wide QueryProfiler."""
+    return _profiler
+
+def connection_factory():
+    """The connection class database.connect() should use right now."""
+    return ProfiledConnection if _profiler.enabled else sqlite3.Connection
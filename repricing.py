@@ -0,0 +1,54 @@
+# repricing.py
+from estimate_store import REPRICEABLE_STATUSES
+from pricing import grand_total_sql
+
+_STATUS_LIST = ", ".join(f"'{status}'" for status in REPRICEABLE_STATUSES)
+
+# Line items of draft/open estimates whose linked price list row now has a different price
+STALE_LINES = f"""
+    FROM estimate_line_items li JOIN pricelist p ON p.id = li.pricelist_id JOIN estimate_jobs j ON j.job_id = li.job_id
+    WHERE j.status IN ({_STATUS_LIST}) AND li.unit_price IS NOT p.unit_price"""
+
+class RepricePreview:
+    """What apply_reprice() would change: one (job_id, customer, job_name, status, lines, old_total, new_total) row per estimate."""
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.line_count = sum(job[4] for job in jobs)
+        self.total_change = sum(job[6] - job[5] for job in jobs)
+
+    def summary(self):
+        if not self.jobs: return "All draft and open estimates already match the price list."
+        return (f"{self.line_count:,} line items in {len(self.jobs):,} draft or open estimates use outdated prices.\n"
+                f"Re-pricing changes their combined total by ${self.total_change:+,.2f}.")
+
+def preview_reprice(db):
+    """Computes the effect of a re-price without writing anything."""
+    rows = db.query(f"""
+        WITH changes AS (SELECT li.job_id, COUNT(*) AS lines, SUM(li.quantity * p.unit_price - li.line_total) AS delta {STALE_LINES} GROUP BY li.job_id),
+             subtotals AS (SELECT l.job_id, SUM(l.line_total) AS subtotal FROM estimate_line_items l JOIN changes USING (job_id) GROUP BY l.job_id)
+        SELECT j.job_id, c.name, j.job_name, j.status, ch.lines, IFNULL(j.total_amount, 0), {grand_total_sql("s.subtotal + ch.delta")}
+        FROM changes ch JOIN estimate_jobs j ON j.job_id = ch.job_id JOIN subtotals s ON s.job_id = ch.job_id LEFT JOIN customers c ON c.id = j.customer_id
+        ORDER BY j.estimate_date DESC, j.job_id DESC""")
+    return RepricePreview(rows)
+
+def apply_reprice(cursor):
+    """
+    Copies current price list prices onto every stale line item of draft and open estimates and
+    recomputes those estimates' totals: three set-based statements, no per-estimate round trips.
+    Must run inside a write transaction. Returns (lines_updated, estimates_updated).
+    """
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS reprice_jobs (job_id INTEGER PRIMARY KEY)")
+    cursor.execute("DELETE FROM temp.reprice_jobs")
+    cursor.execute(f"INSERT INTO temp.reprice_jobs SELECT DISTINCT li.job_id {STALE_LINES}")
+    cursor.execute(f"""
+        UPDATE estimate_line_items AS li SET unit_price = p.unit_price, line_total = li.quantity * p.unit_price
+        FROM pricelist p, estimate_jobs j
+        WHERE p.id = li.pricelist_id AND j.job_id = li.job_id AND j.status IN ({_STATUS_LIST}) AND li.unit_price IS NOT p.unit_price""")
+    lines_updated = cursor.rowcount
+    cursor.execute(f"""
+        UPDATE estimate_jobs AS j SET total_amount = {grand_total_sql("s.subtotal")}
+        FROM (SELECT l.job_id, SUM(l.line_total) AS subtotal FROM estimate_line_items l JOIN temp.reprice_jobs USING (job_id) GROUP BY l.job_id) AS s
+        WHERE j.job_id = s.job_id""")
+    estimates_updated = cursor.rowcount
+    cursor.execute("DROP TABLE temp.reprice_jobs")
+    return lines_updated, estimates_updated
@@ -0,0 +1,74 @@
+# search_index.py
+import re
+
+SEARCH_RESULT_LIMIT = 200
+
+def _has_index(db, fts_name):
+    return db.query_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_name,)) is not None
+
+def _tokens(text):
+    return re.findall(r"\w+", text.lower())
+
+def build_match_query(text):
+    """Turns free text into an FTS5 query where every word must match as a prefix, e.g. 'jo sm' -> '"jo"* "sm"*'."""
+    return " ".join(f'"{token}"*' for token in _tokens(text))
+
+def _prefix_pattern(text):
+    """LIKE pattern used to rank fields that start with the first search word ahead of other matches."""
+    tokens = _tokens(text)
+    return (tokens[0].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%") if tokens else "%"
+
+def _like_pattern(text):
+    return "%" + text.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def search_customers(db, text, limit=SEARCH_RESULT_LIMIT):
+    """Returns up to `limit` (id, name, phone, email, address) rows matching `text`, best matches first."""
+    match = build_match_query(text)
+    if not match: return []
+    if _has_index(db, "customers_fts"):
+        return db.query("""SELECT c.id, c.name, c.phone, c.email, c.address FROM customers_fts f JOIN customers c ON c.id = f.rowid
+                           WHERE customers_fts MATCH ? ORDER BY (c.name LIKE ? ESCAPE '\\') DESC, f.rank LIMIT ?""", (match, _prefix_pattern(text), limit))
+    like = _like_pattern(text)
+    return db.query("""SELECT id, name, phone, email, address FROM customers WHERE name LIKE ? ESCAPE '\\' OR phone LIKE ? ESCAPE '\\'
+                       ORDER BY name LIMIT ?""", (like, like, limit))
+
+def estimate_match_clause(db, text):
+    """
+    Returns (sql, params) for a WHERE fragment on estimate_jobs j / customers c that matches
+    `text` against the job name or the customer name, or (None, ()) if `text` has no words.
+    """
+    match = build_match_query(text)
+    if not match: return None, ()
+    if _has_index(db, "estimate_jobs_fts") and _has_index(db, "customers_fts"):
+        return ("""(j.job_id IN (SELECT rowid FROM estimate_jobs_fts WHERE estimate_jobs_fts MATCH ?)
+                    OR j.customer_id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?))""", (match, f"name : ({match})"))
+    like = _like_pattern(text)
+    return "(c.name LIKE ? ESCAPE '\\' OR j.job_name LIKE ? ESCAPE '\\')", (like, like)
+
+def customer_match_clause(db, text):
+    """Returns (sql, params) restricting estimate_jobs j to customers whose name matches `text`, or (None, ())."""
+    match = build_match_query(text)
+    if not match: return None, ()
+    if _has_index(db, "customers_fts"):
+        return "j.customer_id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)", (f"name : ({match})",)
+    return "c.name LIKE ? ESCAPE '\\'", (_like_pattern(text),)
+
+def search_estimates(db, text, limit=SEARCH_RESULT_LIMIT):
+    """Returns up to `limit` (job_id, customer_name, date, total, job_name) rows whose job or customer name matches `text`."""
+    clause, params = estimate_match_clause(db, text)
+    if clause is None: return []
+    prefix = _prefix_pattern(text)
+    return db.query(f"""SELECT j.job_id, c.name, j.estimate_date, j.total_amount, j.job_name FROM estimate_jobs j JOIN customers c ON j.customer_id = c.id
+                        WHERE {clause} ORDER BY (j.job_name LIKE ? ESCAPE '\\' OR c.name LIKE ? ESCAPE '\\') DESC, j.estimate_date DESC LIMIT ?""",
+                    params + (prefix, prefix, limit))
+
+def search_pricelist(db, text, limit=SEARCH_RESULT_LIMIT):
+    """Returns up to `limit` (id, item_name, unit_price, category_id, category_name) rows matching `text`."""
+    match = build_match_query(text)
+    if not match: return []
+    if _has_index(db, "pricelist_fts"):
+        return db.query("""SELECT p.id, p.item_name, p.unit_price, p.category_id, c.name FROM pricelist_fts f JOIN pricelist p ON p.id = f.rowid
+                           JOIN categories c ON p.category_id = c.id
+                           WHERE pricelist_fts MATCH ? ORDER BY (p.item_name LIKE ? ESCAPE '\\') DESC, f.rank LIMIT ?""", (match, _prefix_pattern(text), limit))
+    return db.query("""SELECT p.id, p.item_name, p.unit_price, p.category_id, c.name FROM pricelist p JOIN categories c ON p.category_id = c.id
+                       WHERE p.item_name LIKE ? ESCAPE '\\' ORDER BY p.item_name LIMIT ?""", (_like_pattern(text), limit))
@@ -0,0 +1,194 @@
+# seed_data.py
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from database import Database, UTC_NOW_SQL
+from migrations import migrate
+from pricing import compute_totals, line_total
+from sort_keys import next_sort_key
+
+# Row counts per scale; any of them can be overridden on the command line
+SEED_SCALES = {
+    "small": {"customers": 1_000, "items": 500, "estimates": 2_000, "line_items": 50_000},
+    "medium": {"customers": 10_000, "items": 5_000, "estimates": 20_000, "line_items": 500_000},
+    "large": {"customers": 100_000, "items": 20_000, "estimates": 200_000, "line_items": 5_000_000},
+}
+DEFAULT_SEED = 1234
+SEED_BATCH_SIZE = 10_000
+# Estimates are dated over the five years up to this day, so the same seed always gives the same database
+SEED_END_DATE = datetime(2025, 12, 31, 17, 0)
+SEED_YEARS = 5
+
+FIRST_NAMES = ("James", "Maria", "Robert", "Ana", "Michael", "Linda", "David", "Rosa", "John", "Patricia", "Daniel", "Elena", "Joseph", "Carmen",
+               "Thomas", "Laura", "Luis", "Susan", "Carlos", "Karen", "Mark", "Teresa", "Steven", "Angela", "Paul", "Lucia", "Kevin", "Sandra",
+               "Brian", "Gloria", "Jorge", "Nancy", "Eric", "Diane", "Frank", "Irene", "Scott", "Julia", "Ray", "Monica")
+LAST_NAMES = ("Smith", "Garcia", "Martinez", "Johnson", "Lopez", "Baca", "Chavez", "Brown", "Sanchez", "Romero", "Williams", "Gallegos", "Trujillo",
+              "Jones", "Montoya", "Miller", "Lucero", "Davis", "Vigil", "Wilson", "Archuleta", "Anderson", "Sandoval", "Taylor", "Gonzales",
+              "Thomas", "Maestas", "Moore", "Padilla", "Jackson", "Apodaca", "White", "Herrera", "Harris", "Armijo", "Clark", "Ortiz", "Lewis")
+STREETS = ("Main", "Central", "Rio Grande", "Juan Tabo", "Montgomery", "Menaul", "Lomas", "Candelaria", "Academy", "Tramway", "Coors", "Paseo del Norte")
+STREET_SUFFIXES = ("St", "Ave", "Blvd", "Rd", "Dr", "Ln", "Ct")
+CITIES = (("Albuquerque", "871"), ("Rio Rancho", "871"), ("Santa Fe", "875"), ("Los Lunas", "870"), ("Bernalillo", "870"), ("Corrales", "870"))
+JOB_NAMES = ("Kitchen Remodel", "Master Bath", "Guest Bath", "Laundry Room", "Garage Storage", "Pantry", "Wet Bar", "Home Office", "Mudroom",
+             "Kitchen Island", "Basement Bar", "Rental Unit Kitchen", "Powder Room", "Entertainment Center", "Built-in Bookcase")
+WRITE_INS = (("Delivery", 75.0, 250.0), ("Demo & Haul Away", 150.0, 900.0), ("Countertop Template", 100.0, 300.0), ("Touch-up & Adjustments", 50.0, 200.0))
+
+# (category, item kinds, code prefix, base price, price per inch of width)
+CABINET_CATEGORIES = (
+    ("Base Cabinets", ("Base", "Base Drawer", "Sink Base", "Corner Base"), "B", 180.0, 9.0),
+    ("Wall Cabinets", ("Wall", "Wall Diagonal", "Wall Glass Door"), "W", 120.0, 7.0),
+    ("Tall Cabinets", ("Pantry", "Oven", "Utility"), "T", 420.0, 14.0),
+    ("Vanities", ("Vanity", "Vanity Drawer", "Vanity Sink"), "V", 160.0, 8.0),
+    ("Fillers & Panels", ("Filler", "End Panel", "Dishwasher Panel"), "F", 25.0, 2.5),
+    ("Moldings", ("Crown Molding", "Light Rail", "Scribe Molding"), "M", 20.0, 1.5),
+    ("Hardware", ("Knob", "Pull", "Soft-Close Hinge"), "H", 4.0, 0.25),
+    ("Accessories", ("Lazy Susan", "Roll-Out Tray", "Trash Pull-Out"), "A", 90.0, 4.0),
+)
+DOOR_STYLES = ("Shaker", "Slab", "Raised Panel", "Beadboard", "Inset")
+FINISHES = (("Maple", 1.0), ("Oak", 0.95), ("Cherry", 1.2), ("Painted White", 1.1), ("Espresso", 1.05), ("Walnut", 1.35))
+WIDTHS = tuple(range(9, 49, 3))
+DEPTHS = ("", " 12D", " 15D", " 18D", " 24D")
+
+def _round_price(value):
+    return round(value * 2) / 2 # Whole or half dollars, like a printed price list
+
+def _customers(rng, count):
+    for customer_id in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES); city, zip_prefix = rng.choice(CITIES)
+        address = f"{rng.randint(100, 19999)} {rng.choice(STREETS)} {rng.choice(STREET_SUFFIXES)}, {city}, NM {zip_prefix}{rng.randint(0, 99):02d}"
+        email = f"{first}.{last}{customer_id}@example.com".lower() if rng.random() < 0.8 else None
+        yield customer_id, f"{first} {last}", address, f"505-{rng.randint(200, 999)}-{rng.randint(0, 9999):04d}", email
+
+def _price_items(rng, count):
+    """(category, item_name, unit_price) rows, spread evenly over CABINET_CATEGORIES, every name unique within its category."""
+    per_category = [count // len(CABINET_CATEGORIES) + (1 if index < count % len(CABINET_CATEGORIES) else 0) for index in range(len(CABINET_CATEGORIES))]
+    for (category, kinds, code, base_price, per_inch), wanted in zip(CABINET_CATEGORIES, per_category):
+        combos = list(itertools.product(kinds, DOOR_STYLES, FINISHES, WIDTHS, DEPTHS)); rng.shuffle(combos)
+        for index in range(wanted):
+            kind, style, (finish, factor), width, depth = combos[index % len(combos)]
+            name = f"{style} {finish} {kind} {code}{width}{depth}"
+            if index >= len(combos): name += f" #{index // len(combos) + 1}"
+            yield category, name, _round_price((base_price + per_inch * width) * factor * rng.uniform(0.95, 1.05))
+
+def _line_counts(rng, estimates, line_items):
+    """Line items per estimate: varied, at least one each, adding up to exactly line_items."""
+    average, remainder = divmod(line_items, estimates)
+    counts = [average + (1 if index < remainder else 0) for index in range(estimates)]
+    for index in range(0, estimates - 1, 2):
+        # Moving lines between neighbours keeps the total exact
+        shift = rng.randint(0, counts[index + 1] - 1) if rng.random() < 0.5 else -rng.randint(0, counts[index] - 1)
+        counts[index] += shift; counts[index + 1] -= shift
+    return counts
+
+def _estimate(rng, job_id, customer_count, items, line_count, next_item_id):
+    """One estimate: its estimate_jobs row and its line item rows, with totals that add up as the app computes them."""
+    estimate_date = SEED_END_DATE - timedelta(minutes=rng.randint(0, SEED_YEARS * 365 * 24 * 60))
+    age_days = (SEED_END_DATE - estimate_date).days
+    status = "closed" if age_days > 365 and rng.random() < 0.9 else rng.choice(("draft", "open", "open", "closed"))
+    # Closed estimates were priced from an older price list
+    price_factor = 1.0 if status != "closed" else 1.0 - 0.03 * (age_days / 365)
+    lines = []
+    for position in range(line_count):
+        if rng.random() < 0.03:
+            name, low, high = rng.choice(WRITE_INS); category, pricelist_id, price = "Write-in", None, _round_price(rng.uniform(low, high))
+        else:
+            pricelist_id, category, name, price = rng.choice(items); price = _round_price(price * price_factor)
+        qty = rng.choice((1, 1, 1, 1, 2, 2, 3, 4))
+        lines.append((next_item_id + position, job_id, name, category, qty, price, line_total(qty, price), pricelist_id, float(position)))
+    subtotal = sum(line[6] for line in lines)
+    install_qty, install_unit_price = (line_count, rng.choice((45.0, 60.0, 75.0))) if rng.random() < 0.7 else (0, 0.0)
+    totals = compute_totals(subtotal, rng.choice((0, 10, 15, 20, 25)), install_qty, install_unit_price, rng.choice((0.0, 0.0, 0.0, 150.0, 350.0)))
+    customer_id = min(int(rng.paretovariate(1.2)), customer_count) if rng.random() < 0.1 else rng.randint(1, customer_count) # A few repeat customers
+    job_name = rng.choice(JOB_NAMES) + (f" - Phase {rng.randint(2, 3)}" if rng.random() < 0.05 else "")
+    job = (job_id, customer_id, job_name, estimate_date.strftime('%Y-%m-%d %H:%M'), totals.grand_total, totals.install_total,
+           totals.markup_percent, totals.misc_charge, totals.install_qty, totals.install_unit_price, status)
+    return job, lines
+
+class SeedReport:
+    def __init__(self, seed):
+        self.seed = seed
+        self.counts = {}
+        self.seconds = 0.0
+
+    def summary(self):
+        parts = ", ".join(f"{count:,} {name.replace('_', ' ')}" for name, count in self.counts.items())
+        return f"Seeded {parts} in {self.seconds:.1f}s (seed {self.seed})."
+
+def seed_database(db, customers, items, estimates, line_items, seed=DEFAULT_SEED, batch_size=SEED_BATCH_SIZE, progress=None):
+    """
+    Fills an empty, migrated database with generated customers, price list items, estimates and line items.
+    The same counts and seed always produce the same rows. Rows are written through the normal schema
+    (search index and change-tracking triggers included) in executemany batches, one commit per batch.
+    """
+    if line_items < estimates: raise ValueError("every estimate needs at least one line item, so line_items must be at least estimates")
+    if db.query_one("SELECT EXISTS (SELECT 1 FROM customers) OR EXISTS (SELECT 1 FROM estimate_jobs)")[0]:
+        raise ValueError("the database already has data; seed a new one")
+    rng = random.Random(seed); report = SeedReport(seed); started = time.perf_counter()
+    def report_progress(message):
+        if progress: progress(f"{message} ({time.perf_counter() - started:.1f}s)")
+
+    rows = _customers(rng, customers)
+    while batch := list(itertools.islice(rows, batch_size)):
+        with db.transaction() as cursor: cursor.executemany(f"INSERT INTO customers (id, name, address, phone, email, updated_at) VALUES (?, ?, ?, ?, ?, {UTC_NOW_SQL})", batch)
+    report.counts["customers"] = customers; report_progress(f"{customers:,} customers")
+
+    price_rows = list(_price_items(rng, items))
+    with db.transaction() as cursor:
+        first_order = next_sort_key(cursor, "categories")
+        cursor.executemany("INSERT OR IGNORE INTO categories (name, sort_order) VALUES (?, ?)", [(category[0], first_order + index) for index, category in enumerate(CABINET_CATEGORIES)])
+        category_ids = dict(cursor.execute("SELECT name, id FROM categories"))
+        sort_orders = itertools.count(1)
+        cursor.executemany(f"INSERT INTO pricelist (category_id, item_name, unit_price, sort_order, updated_at) VALUES (?, ?, ?, ?, {UTC_NOW_SQL})",
+                           [(category_ids[category], name, price, next(sort_orders)) for category, name, price in price_rows])
+        picked = [(item_id, category, name, price) for item_id, category, name, price in cursor.execute(
+            "SELECT p.id, c.name, p.item_name, p.unit_price FROM pricelist p JOIN categories c ON c.id = p.category_id ORDER BY p.id")]
+    report.counts["items"] = items; report_progress(f"{items:,} price list items")
+    if estimates and not picked: raise ValueError("estimates need at least one price list item")
+
+    counts = _line_counts(rng, estimates, line_items) if estimates else []
+    next_item_id = 1; jobs, lines = [], []
+    def flush():
+        with db.transaction() as cursor:
+            cursor.executemany(f"""INSERT INTO estimate_jobs (job_id, customer_id, job_name, estimate_date, total_amount, install_total, markup_percent, misc_charge,
+                                  install_qty, install_unit_price, status, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {UTC_NOW_SQL})""", jobs)
+            cursor.executemany(f"""INSERT INTO estimate_line_items (item_id, job_id, item_name, category_name, quantity, unit_price, line_total, pricelist_id, position, updated_at)
+                                  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, {UTC_NOW_SQL})""", lines)
+        jobs.clear(); lines.clear()
+    for job_id, line_count in enumerate(counts, 1):
+        job, job_lines = _estimate(rng, job_id, customers, picked, line_count, next_item_id)
+        jobs.append(job); lines.extend(job_lines); next_item_id += line_count
+        if len(lines) >= batch_size * 5:
+            flush(); report_progress(f"{job_id:,} / {estimates:,} estimates")
+    if jobs: flush()
+    report.counts["estimates"] = estimates; report.counts["line_items"] = line_items
+    report.seconds = time.perf_counter() - started
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create a database filled with generated data, for measuring the app at scale.")
+    parser.add_argument("db_path", help="database file to create")
+    parser.add_argument("--scale", choices=SEED_SCALES, default="small", help="preset row counts (default: small)")
+    for name in SEED_SCALES["small"]:
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, type=int, default=None, help=f"number of {name.replace('_', ' ')} (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"random seed (default: {DEFAULT_SEED})")
+    parser.add_argument("--force", action="store_true", help="replace db_path if it exists")
+    args = parser.parse_args(argv)
+    counts = {name: getattr(args, name) if getattr(args, name) is not None else default for name, default in SEED_SCALES[args.scale].items()}
+
+    if os.path.exists(args.db_path):
+        if not args.force: parser.error(f"{args.db_path} already exists; pass --force to replace it")
+        for path in (args.db_path, args.db_path + "-wal", args.db_path + "-shm"):
+            if os.path.exists(path): os.remove(path)
+    db = Database(args.db_path, profile="fast") # Throwaway data, so no fsync per batch
+    migrate(db)
+    try: report = seed_database(db, seed=args.seed, progress=lambda message: print(f"  {message}"), **counts)
+    except ValueError as e: db.close(); parser.error(str(e))
+    db.close()
+    print(report.summary())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# settings_store.py
+from database import get_db
+
+class SettingsStore:
+    """
+    Loads the settings table once and serves typed reads from memory.
+    Writes go straight through to SQLite and notify subscribers of the keys that changed.
+    """
+    def __init__(self, db):
+        self._db = db
+        self._values = None
+        self._listeners = []
+
+    def _ensure_loaded(self):
+        if self._values is None:
+            self._values = dict(self._db.query("SELECT key, value FROM settings"))
+        return self._values
+
+    def reload(self):
+        """Re-reads the settings table (e.g. after a database restore) and notifies every subscriber."""
+        old_values = self._values or {}
+        self._values = None
+        values = self._ensure_loaded()
+        changed = {key: values.get(key) for key in set(old_values) | set(values) if old_values.get(key) != values.get(key)}
+        if changed: self._notify(changed)
+
+    def get(self, key, default=None):
+        return self._ensure_loaded().get(key, default)
+
+    def get_bool(self, key, default=False):
+        value = self.get(key)
+        return default if value is None else value == 'True'
+
+    def get_float(self, key, default=0.0):
+        try: return float(self.get(key) or default)
+        except ValueError: return default
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        """Writes every changed setting in a single transaction, then notifies subscribers."""
+        current = self._ensure_loaded()
+        changed = {key: str(value) for key, value in values.items() if current.get(key) != str(value)}
+        if not changed: return
+        with self._db.transaction() as cursor:
+            cursor.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", list(changed.items()))
+        current.update(changed)
+        self._notify(changed)
+
+    def subscribe(self, callback, keys=None):
+        """Calls callback(changed_dict) whenever one of `keys` (or any key, if None) changes. Returns an unsubscribe function."""
+        listener = (callback, frozenset(keys) if keys else None)
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener) if listener in self._listeners else None
+
+    def _notify(self, changed):
+        for callback, keys in list(self._listeners):
+            relevant = changed if keys is None else {k: v for k, v in changed.items() if k in keys}
+            if relevant: callback(relevant)
+
+_settings = None
+
+def get_settings():
+    """Returns the application-wide SettingsStore."""
+    global _settings
+    if _settings is None:
+        _settings = SettingsStore(get_db())
+    return _settings
@@ -0,0 +1,60 @@
+# sort_keys.py
+
+# Rows are ordered by a fractional sort_order. Moving a row rewrites only that row: its new key is the
+# midpoint of its new neighbours' keys. When repeated moves into the same spot squeeze two neighbours
+# closer than this, the scope is renumbered 1..n in one statement and the move proceeds.
+MIN_SORT_GAP = 1e-6
+
+# Ordered table -> column whose value scopes the order (None: the whole table is one list)
+ORDERED_TABLES = {"categories": None, "pricelist": "category_id"}
+
+def _scope_clause(table, scope_id):
+    scope_column = ORDERED_TABLES[table]
+    if scope_column is None or scope_id is None: return "1", ()
+    return f"{scope_column} = ?", (scope_id,)
+
+def next_sort_key(cursor, table, scope_id=None):
+    """The key that puts a new row at the end of its list."""
+    where_sql, params = _scope_clause(table, scope_id)
+    return cursor.execute(f"SELECT IFNULL(MAX(sort_order), 0) + 1 FROM {table} WHERE {where_sql}", params).fetchone()[0]
+
+def rebalance(cursor, table, scope_id=None):
+    """
+    Renumbers a list to 1..n in its current order (ties broken by id) with a single UPDATE.
+    With no scope_id every list in the table is renumbered. Returns the number of rows changed.
+    """
+    scope_column = ORDERED_TABLES[table]; where_sql, params = _scope_clause(table, scope_id)
+    partition_sql = f"PARTITION BY {scope_column} " if scope_column else ""
+    cursor.execute(f"""
+        UPDATE {table} AS t SET sort_order = r.rank
+        FROM (SELECT id, ROW_NUMBER() OVER ({partition_sql}ORDER BY sort_order, id) AS rank FROM {table} WHERE {where_sql}) AS r
+        WHERE t.id = r.id AND t.sort_order IS NOT r.rank""", params)
+    return cursor.rowcount
+
+def _key_between(before, after):
+    if before is None and after is None: return None
+    if before is None: return after - 1
+    if after is None: return before + 1
+    if after - before < MIN_SORT_GAP * 2: return None
+    return (before + after) / 2
+
+def move_row(cursor, table, row_id, prev_id=None, next_id=None):
+    """
+    Moves `row_id` to sit between `prev_id` and `next_id`, its neighbours after the move
+    (None at either end of the list). Must run inside a write transaction. Normally this is
+    one indexed read of the two neighbour keys and one single-row UPDATE. Returns the new key.
+    """
+    def neighbour_keys():
+        keys = dict(cursor.execute(f"SELECT id, sort_order FROM {table} WHERE id IN (?, ?)", (prev_id, next_id)).fetchall())
+        return keys.get(prev_id), keys.get(next_id)
+    before, after = neighbour_keys()
+    key = _key_between(before, after)
+    if key is None and (before is not None or after is not None):
+        # Neighbours too close together (or tied, for rows saved before keys were fractional)
+        scope_column = ORDERED_TABLES[table]
+        scope_id = cursor.execute(f"SELECT {scope_column} FROM {table} WHERE id = ?", (row_id,)).fetchone()[0] if scope_column else None
+        rebalance(cursor, table, scope_id)
+        before, after = neighbour_keys(); key = _key_between(before, after)
+    if key is None: return None
+    cursor.execute(f"UPDATE {table} SET sort_order = ? WHERE id = ?", (key, row_id))
+    return key
@@ -0,0 +1,182 @@
+# stall_watchdog.py
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+HEARTBEAT_MS = 50
+STALL_THRESHOLD_MS = 250
+# The Tk thread's stack is sampled this often once a heartbeat is half the stall threshold late
+SAMPLE_INTERVAL_MS = 10
+STACK_DEPTH = 40
+LATENCY_WINDOW = 1200  # Heartbeats kept for the latency percentiles, about a minute's worth
+RECENT_STALLS = 100
+STALL_LOG_FILENAME = "stalls.jsonl"
+STALL_LOG_KEEP = 500
+# The log is trimmed back to its last STALL_LOG_KEEP stalls once it grows past this size
+STALL_LOG_MAX_BYTES = 4 * 1024 * 1024
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_TK_IDLE = "Tk event processing (redraw or layout)"
+
+def _frame_label(frame):
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+def _is_app_frame(frame):
+    filename = os.path.abspath(frame.f_code.co_filename)
+    return os.path.dirname(filename) == _APP_DIR and os.path.basename(filename) != "stall_watchdog.py"
+
+def _sample(frame):
+    """(culprit, stack) for one sample: the innermost frame in the app's own code, and the stack innermost first."""
+    stack = []; culprit = None
+    innermost = frame
+    while frame is not None and len(stack) < STACK_DEPTH:
+        label = _frame_label(frame); stack.append(label)
+        if culprit is None and _is_app_frame(frame): culprit = label
+        frame = frame.f_back
+    # Sitting in mainloop() means Tk itself is busy, e.g. laying out or redrawing a large window
+    if innermost.f_code.co_name == "mainloop": culprit = _TK_IDLE
+    return culprit or stack[0], stack
+
+def percentile(values, fraction):
+    if not values: return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class StallWatchdog:
+    """
+    Measures how late a Tk after() heartbeat fires to find callbacks that block the event loop.
+
+    A daemon thread sleeps until the heartbeat is half threshold_ms overdue and only then samples
+    the Tk thread's stack, every SAMPLE_INTERVAL_MS, so it stays idle while the loop keeps up.
+    When the heartbeat fires at least threshold_ms late the stall is recorded with its duration
+    and culprit, the app frame seen in most samples, kept in a rolling summary and appended to
+    stalls.jsonl in log_dir (if given) by the watchdog thread.
+    """
+    def __init__(self, widget, threshold_ms=STALL_THRESHOLD_MS, heartbeat_ms=HEARTBEAT_MS, log_dir=None):
+        self.widget = widget
+        self.threshold_ms = threshold_ms
+        self.heartbeat_ms = heartbeat_ms
+        self.log_dir = log_dir
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._job = None
+        self._due = None
+        self._samples = []
+        self._unlogged = []
+        self.reset()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running: return self
+        # A fresh event per run, so a thread from a previous start() can't miss its stop
+        self._tk_thread_id = threading.get_ident(); self._stop = threading.Event()
+        self._due = time.perf_counter() + self.heartbeat_ms / 1000
+        self._job = self.widget.after(self.heartbeat_ms, self._beat)
+        self._thread = threading.Thread(target=self._watch, args=(self._stop,), name="stall-watchdog", daemon=True); self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._job is not None:
+            try: self.widget.after_cancel(self._job)
+            except Exception: pass # The widget is already gone
+            self._job = None
+        self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self.latencies = deque(maxlen=LATENCY_WINDOW)
+            self.stalls = deque(maxlen=RECENT_STALLS)
+            self.culprits = {}  # culprit -> [count, total_ms, max_ms]
+            self.started_at = datetime.now()
+
+    # --- Tk thread ---
+    def _beat(self):
+        now = time.perf_counter(); late_ms = max(0.0, (now - self._due) * 1000)
+        with self._lock: samples, self._samples = self._samples, []
+        self.latencies.append(late_ms)
+        if late_ms >= self.threshold_ms: self._record_stall(late_ms, samples)
+        if self._stop.is_set(): return
+        self._due = time.perf_counter() + self.heartbeat_ms / 1000
+        self._job = self.widget.after(self.heartbeat_ms, self._beat)
+
+    def _record_stall(self, duration_ms, samples):
+        if samples:
+            counts = Counter(culprit for culprit, _ in samples); culprit, hits = counts.most_common(1)[0]
+            stack = next(stack for sample_culprit, stack in samples if sample_culprit == culprit)
+        else: culprit, hits, stack = "unknown (no samples)", 0, []
+        stall = {"at": (datetime.now() - timedelta(milliseconds=duration_ms)).isoformat(timespec="milliseconds"), "duration_ms": round(duration_ms, 1),
+                 "culprit": culprit, "hits": hits, "samples": len(samples), "stack": stack}
+        with self._lock:
+            self.stalls.append(stall)
+            totals = self.culprits.setdefault(culprit, [0, 0.0, 0.0])
+            totals[0] += 1; totals[1] += duration_ms; totals[2] = max(totals[2], duration_ms)
+            if self.log_dir: self._unlogged.append(stall) # Written by the watchdog thread, off the Tk thread
+
+    # --- Watchdog thread ---
+    def _watch(self, stop):
+        interval = SAMPLE_INTERVAL_MS / 1000
+        while True:
+            # Heartbeats that arrive on time move _due on before this wakes, so an idle app costs a wake-up per heartbeat or so
+            grace = self.threshold_ms / 2000; due = self._due
+            if stop.wait(interval if due is None else max(due + grace - time.perf_counter(), interval)): break
+            self._write_log()
+            due = self._due
+            if due is None or time.perf_counter() - due < grace: continue
+            frame = sys._current_frames().get(self._tk_thread_id)
+            if frame is None: continue
+            sample = _sample(frame); del frame
+            with self._lock: self._samples.append(sample)
+        self._write_log()
+
+    def _write_log(self):
+        with self._lock: stalls, self._unlogged = self._unlogged, []
+        if not stalls: return
+        try: append_stall_log(self.log_dir, *stalls)
+        except OSError: pass
+
+    # --- Reporting ---
+    def summary(self):
+        """Event-loop latency over the last LATENCY_WINDOW heartbeats, plus stall totals by culprit and the recent stalls, newest first."""
+        with self._lock:
+            latencies = list(self.latencies); stalls = list(reversed(self.stalls))
+            culprits = sorted(((culprit, *totals) for culprit, totals in self.culprits.items()), key=lambda row: row[2], reverse=True)
+        return {"since": self.started_at.isoformat(timespec="seconds"), "running": self.running, "threshold_ms": self.threshold_ms, "heartbeat_ms": self.heartbeat_ms,
+                "latency_ms": {"p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95), "p99": percentile(latencies, 0.99), "max": max(latencies, default=None)},
+                "stall_count": sum(row[1] for row in culprits), "stalled_ms": round(sum(row[2] for row in culprits), 1),
+                "culprits": [{"culprit": c, "count": n, "total_ms": round(t, 1), "max_ms": round(m, 1)} for c, n, t, m in culprits],
+                "recent": stalls}
+
+    def format_summary(self, recent=20):
+        summary = self.summary(); latency = summary["latency_ms"]
+        def ms(value): return "-" if value is None else f"{value:.0f} ms"
+        lines = [f"Watching since {summary['since']} ({'running' if summary['running'] else 'stopped'}); stalls are heartbeats {self.threshold_ms:g} ms or more late.",
+                 f"Event loop latency (last {len(self.latencies)} heartbeats): p50 {ms(latency['p50'])}, p95 {ms(latency['p95'])}, p99 {ms(latency['p99'])}, max {ms(latency['max'])}",
+                 f"Stalls: {summary['stall_count']}, {summary['stalled_ms'] / 1000:.1f} s in total", ""]
+        if summary["culprits"]:
+            lines.append("By culprit:")
+            lines += [f"  {row['count']:>4} x  {row['total_ms']:>9.0f} ms total  {row['max_ms']:>7.0f} ms max   {row['culprit']}" for row in summary["culprits"]]
+            lines += ["", "Most recent:"]
+            for stall in summary["recent"][:recent]:
+                lines.append(f"  {stall['at']}  {stall['duration_ms']:.0f} ms  {stall['culprit']}  ({stall['hits']}/{stall['samples']} samples)")
+                lines += [f"      {frame}" for frame in stall["stack"][:8]]
+        return "\n".join(lines)
+
+def append_stall_log(directory, *stalls, keep=STALL_LOG_KEEP, max_bytes=STALL_LOG_MAX_BYTES):
+    """Appends stalls as JSON lines to <directory>/stalls.jsonl; past max_bytes only the last `keep` are kept."""
+    path = os.path.join(directory, STALL_LOG_FILENAME)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.writelines(json.dumps(stall) + "\n" for stall in stalls)
+        size = f.tell()
+    if size > max_bytes:
+        with open(path, 'r', encoding='utf-8') as f: lines = deque(f, maxlen=keep)
+        with open(path, 'w', encoding='utf-8') as f: f.writelines(lines)
+    return path
@@ -0,0 +1,58 @@
+# startup_timing.py
+import json
+import os
+import time
+from datetime import datetime
+
+STARTUP_LOG_FILENAME = "startup_times.jsonl"
+# The log is trimmed back to this many runs once it grows to twice that
+STARTUP_LOG_KEEP = 100
+
+class StartupTimer:
+    """
+    Records named milestones of one application start, in milliseconds since the timer was created.
+    Create it as early as possible (before the heavy imports) so the first mark includes them.
+    In a PyInstaller --onefile build the bootloader unpacks the bundle before Python starts,
+    so that extraction time is not included.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.marks = []  # (name, ms since start)
+
+    def mark(self, name):
+        self.marks.append((name, (time.perf_counter() - self.started) * 1000))
+
+    def elapsed(self, name):
+        for mark_name, ms in self.marks:
+            if mark_name == name: return ms
+        return None
+
+    def summary(self):
+        lines = ["Startup timings (ms since launch):"]; previous = 0.0
+        for name, ms in self.marks:
+            lines.append(f"  {name:<16} {ms:8.1f}  (+{ms - previous:.1f})"); previous = ms
+        return "\n".join(lines)
+
+    def as_record(self):
+        return {"started_at": self.started_at, **{name: round(ms, 1) for name, ms in self.marks}}
+
+    def append_to_log(self, directory, keep=STARTUP_LOG_KEEP):
+        """Appends this run as one JSON line to <directory>/startup_times.jsonl, trimming old runs."""
+        path = os.path.join(directory, STARTUP_LOG_FILENAME)
+        with open(path, 'a', encoding='utf-8') as f: f.write(json.dumps(self.as_record()) + "\n")
+        with open(path, 'r', encoding='utf-8') as f: lines = f.readlines()
+        if len(lines) > keep * 2:
+            with open(path, 'w', encoding='utf-8') as f: f.writelines(lines[-keep:])
+        return path
+
+def read_startup_log(directory):
+    """Returns the logged runs, oldest first, skipping any line that can't be parsed."""
+    path = os.path.join(directory, STARTUP_LOG_FILENAME)
+    if not os.path.exists(path): return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try: records.append(json.loads(line))
+            except ValueError: continue
+    return records